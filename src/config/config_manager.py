@@ -40,6 +40,8 @@ class ConfigManager:
             # Wymiary SVG
             'SVG_WIDTH': config.SVG_WIDTH,
             'SVG_HEIGHT': config.SVG_HEIGHT,
+            'SVG_RENDER_MODE': config.SVG_RENDER_MODE,
+            'INCREMENTAL_SVG_UPDATES': config.INCREMENTAL_SVG_UPDATES,
             
             # Parametry wyszukiwania i tolerancji
             'SEARCH_RADIUS': config.SEARCH_RADIUS,
@@ -83,6 +85,12 @@ class ConfigManager:
             'MPTT_HEIGHT': config.MPTT_HEIGHT,
             'SEGMENT_MIN_WIDTH': config.SEGMENT_MIN_WIDTH,
             
+            # Odczyt DXF
+            'DXF_READ_MODE': config.DXF_READ_MODE,
+            'EXTRACTION_CACHE_ENABLED': config.EXTRACTION_CACHE_ENABLED,
+            'EXTRACTION_CACHE_DIR': config.EXTRACTION_CACHE_DIR,
+            'EXTRACTION_CACHE_MAX_MB': config.EXTRACTION_CACHE_MAX_MB,
+            
             # Pliki
             'DEFAULT_DXF_FILE': 'input.dxf',
             'STRUCTURED_SVG_OUTPUT': 'output_structured.svg',
@@ -132,6 +140,7 @@ class ConfigManager:
                 if hasattr(cfg, key):
                     setattr(cfg, key, value)
                     logger.debug(f"Zaktualizowano globalną zmienną cfg.{key} = {value}")
+            cfg.bump_config_version()
             
             self.current_config_name = config_name
             logger.info(f"Załadowano konfigurację: {config_name}")
@@ -160,6 +169,8 @@ class ConfigManager:
             parser['SVG'] = {
                 'svg_width': str(self.config_data.get('SVG_WIDTH', 1600)),
                 'svg_height': str(self.config_data.get('SVG_HEIGHT', 800)),
+                'svg_render_mode': str(self.config_data.get('SVG_RENDER_MODE', 'thread')),
+                'incremental_svg_updates': str(self.config_data.get('INCREMENTAL_SVG_UPDATES', True)),
                 'margin': str(self.config_data.get('MARGIN', 2.0)),
             }
             
@@ -180,6 +191,14 @@ class ConfigManager:
                 'max_merge_distance': str(self.config_data.get('MAX_MERGE_DISTANCE', 5.0)),
             }
             
+            # Sekcja odczytu DXF
+            parser['EXTRACTION'] = {
+                'dxf_read_mode': str(self.config_data.get('DXF_READ_MODE', 'full')),
+                'extraction_cache_enabled': str(self.config_data.get('EXTRACTION_CACHE_ENABLED', True)),
+                'extraction_cache_dir': str(self.config_data.get('EXTRACTION_CACHE_DIR', '')),
+                'extraction_cache_max_mb': str(self.config_data.get('EXTRACTION_CACHE_MAX_MB', 512)),
+            }
+            
             # Sekcja kolorów
             parser['COLORS'] = {
                 'assigned_segment_color': str(self.config_data.get('ASSIGNED_SEGMENT_COLOR', '#00778B')),
@@ -301,6 +320,13 @@ class ConfigManager:
             if hasattr(config, key):
                 setattr(config, key, value)
                 logger.debug(f"Zastosowano do config.{key} = {value}")
+        config.bump_config_version()
+
+    def snapshot(self) -> config.ConfigSnapshot:
+        """Niezmienna migawka aktualnej konfiguracji (bez modyfikowania modułu config)"""
+        overrides = {key: value for key, value in self.config_data.items()
+                     if hasattr(config, key) and key not in ('CONFIG_VERSION',) and not callable(getattr(config, key))}
+        return config.snapshot_config(**overrides)
 
 
 class ConfigTab:
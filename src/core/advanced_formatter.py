@@ -3,10 +3,21 @@ Zaawansowany system formatowania tekstów z obsługą operacji matematycznych
 i konfigurowalnych formatów input/output
 """
 import re
+import ast
 import math
-from typing import Dict, Any, List, Tuple, Union
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple, Union, Callable, Optional
 from src.utils.console_logger import console, logger
 
+# Zmienna w formacie: {var} lub {var:padding}
+VARIABLE_PATTERN = re.compile(r'\{([^}:]+)(?::(\d+))?\}')
+# Dozwolone znaki wyrażenia po podstawieniu wartości (jak w _safe_eval)
+_SAFE_EXPRESSION_RE = re.compile(r'^[\d+\-*/%()]+$')
+# Dozwolone węzły AST skompilowanego wyrażenia
+_SAFE_AST_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Load,
+                   ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+                   ast.UAdd, ast.USub)
+
 
 class AdvancedFormatter:
     """
@@ -33,29 +44,14 @@ class AdvancedFormatter:
             Dict ze zmiennymi: {'name': 'STM2', 'inv': 6, 'str': 19}
         """
         try:
-            # Zamień format na regex pattern
-            pattern = self._format_to_regex(input_format)
-            logger.debug(f"Input format '{input_format}' -> regex: '{pattern}'")
+            # Skompilowany program (regex i nazwy zmiennych budowane raz na format)
+            program = compile_advanced_format(input_format)
+            logger.debug(f"Input format '{input_format}' -> regex: '{program.regex.pattern}'")
             
-            # Dopasuj pattern do tekstu
-            match = re.match(pattern, text)
-            if not match:
+            variables = program.parse(text)
+            if not variables:
                 logger.warning(f"Tekst '{text}' nie pasuje do formatu '{input_format}'")
                 return {}
-            
-            # Wyciągnij zmienne z dopasowania
-            variables = {}
-            var_names = self._extract_variable_names(input_format)
-            
-            for i, var_name in enumerate(var_names, 1):
-                value = match.group(i)
-                # Konwertuj na int jeśli to możliwe (oprócz 'name')
-                if var_name != 'name':
-                    try:
-                        value = int(value)
-                    except ValueError:
-                        pass
-                variables[var_name] = value
                 
             logger.debug(f"Sparsowane zmienne: {variables}")
             self.variables = variables
@@ -75,34 +71,11 @@ class AdvancedFormatter:
         Returns:
             Regex pattern: "([^/]+)/F(\\d{1,2})/STR(\\d{1,2})"
         """
-        pattern = format_str
-        
-        # Znajdź wszystkie zmienne w formacie {var} lub {var:padding}
-        var_pattern = r'\{([^}:]+)(?::(\d+))?\}'
-        variables = re.findall(var_pattern, pattern)
-        
-        # Zamień każdą zmienną na odpowiedni regex
-        for var_name, padding in variables:
-            var_regex = r'{' + var_name + (f':{padding}' if padding else '') + r'}'
-            
-            if var_name == 'name':
-                # name może zawierać litery i cyfry, ale nie /
-                replacement = r'([^/]+)'
-            else:
-                # Numery - 1 lub więcej cyfr (do max padding jeśli określony)
-                if padding:
-                    replacement = fr'(\d{{1,{padding}}})'
-                else:
-                    replacement = r'(\d+)'
-            
-            pattern = pattern.replace(var_regex, replacement)
-        
-        return f'^{pattern}$'
+        return format_to_regex(format_str)
     
     def _extract_variable_names(self, format_str: str) -> List[str]:
         """Wyciąga nazwy zmiennych w kolejności występowania"""
-        var_pattern = r'\{([^}:]+)(?::\d+)?\}'
-        return re.findall(var_pattern, format_str)
+        return extract_variable_names(format_str)
     
     def set_additional_variable(self, var_name: str, expression: str):
         """
@@ -126,34 +99,8 @@ class AdvancedFormatter:
         Returns:
             Wynik: 10 (19//2 + 19%2 = 9 + 1 = 10)
         """
-        try:
-            # Zamień zmienne na wartości
-            eval_expr = expression
-            for var_name, value in variables.items():
-                var_pattern = f'{{{var_name}}}'
-                eval_expr = eval_expr.replace(var_pattern, str(value))
-            
-            logger.debug(f"Wyrażenie '{expression}' -> '{eval_expr}'")
-            
-            # Bezpieczne operatory matematyczne
-            safe_operators = {
-                '+': lambda x, y: x + y,
-                '-': lambda x, y: x - y,
-                '*': lambda x, y: x * y,
-                '/': lambda x, y: x // y,  # Integer division
-                '%': lambda x, y: x % y,   # Modulo
-            }
-            
-            # Prosta evaluacja wyrażeń (obsługuje +, -, *, /, %)
-            # Dla bezpieczeństwa używamy ograniczonej evaluacji
-            result = self._safe_eval(eval_expr)
-            
-            logger.debug(f"Wynik wyrażenia: {result}")
-            return int(result) if isinstance(result, (int, float)) else result
-            
-        except Exception as e:
-            logger.error(f"Błąd ewaluacji wyrażenia '{expression}': {e}")
-            return 0
+        # Wyrażenie kompilowane raz (AST), potem tylko ewaluowane z wartościami
+        return compile_expression(expression)(variables)
     
     def _safe_eval(self, expression: str) -> Union[int, float]:
         """Bezpieczna evaluacja wyrażeń matematycznych"""
@@ -185,42 +132,8 @@ class AdvancedFormatter:
             Sformatowany string: "S10-19/06"
         """
         try:
-            # Połącz podstawowe zmienne z dodatkowymi
-            all_variables = self.variables.copy()
-            
-            # Oblicz dodatkowe zmienne
-            for var_name, expression in self.additional_variables.items():
-                result = self._evaluate_expression(expression, self.variables)
-                all_variables[var_name] = result
-                logger.debug(f"Obliczono {var_name} = {result}")
-            
-            # Zamień zmienne w formacie output
-            result = output_format
-            
-            # Znajdź wszystkie zmienne z formatowaniem
-            var_pattern = r'\{([^}:]+)(?::(\d+))?\}'
-            variables_in_format = re.findall(var_pattern, result)
-            
-            for var_name, padding in variables_in_format:
-                if var_name in all_variables:
-                    value = all_variables[var_name]
-                    
-                    # Formatuj wartość
-                    if padding and isinstance(value, int):
-                        formatted_value = str(value).zfill(int(padding))
-                    else:
-                        formatted_value = str(value)
-                    
-                    # Zamień w result
-                    var_regex = f'{{{var_name}' + (f':{padding}' if padding else '') + '}'
-                    result = result.replace(var_regex, formatted_value)
-                    
-                    logger.debug(f"Zastąpiono {var_regex} -> {formatted_value}")
-                else:
-                    logger.warning(f"Zmienna {var_name} nie została znaleziona")
-            
-            logger.debug(f"Output format '{output_format}' -> '{result}'")
-            return result
+            program = compile_advanced_format('', output_format, self.additional_variables)
+            return program.format_output(program.evaluate(self.variables))
             
         except Exception as e:
             logger.error(f"Błąd formatowania output: {e}")
@@ -273,6 +186,236 @@ Wynik:  S10-19/06
         """
 
 
+def format_to_regex(format_str: str) -> str:
+    """Konwertuje format ze zmiennymi na regex pattern (np. "{name}/F{inv:2}" -> "^([^/]+)/F(\\d{1,2})$")"""
+    pattern = format_str
+    
+    # Zamień każdą zmienną na odpowiedni regex
+    for var_name, padding in VARIABLE_PATTERN.findall(pattern):
+        var_regex = r'{' + var_name + (f':{padding}' if padding else '') + r'}'
+        
+        if var_name == 'name':
+            # name może zawierać litery i cyfry, ale nie /
+            replacement = r'([^/]+)'
+        else:
+            # Numery - 1 lub więcej cyfr (do max padding jeśli określony)
+            if padding:
+                replacement = fr'(\d{{1,{padding}}})'
+            else:
+                replacement = r'(\d+)'
+        
+        pattern = pattern.replace(var_regex, replacement)
+    
+    return f'^{pattern}$'
+
+
+def extract_variable_names(format_str: str) -> List[str]:
+    """Wyciąga nazwy zmiennych w kolejności występowania"""
+    return [var_name for var_name, _ in VARIABLE_PATTERN.findall(format_str)]
+
+
+def _evaluate_substituted(expression: str, variables: Dict[str, Any]) -> Union[int, str]:
+    """Ewaluacja przez podstawienie wartości w tekst wyrażenia (wyrażenia nie dające się skompilować)"""
+    try:
+        eval_expr = expression
+        for var_name, value in variables.items():
+            eval_expr = eval_expr.replace(f'{{{var_name}}}', str(value))
+        
+        logger.debug(f"Wyrażenie '{expression}' -> '{eval_expr}'")
+        result = AdvancedFormatter()._safe_eval(eval_expr)
+        return int(result) if isinstance(result, (int, float)) else result
+        
+    except Exception as e:
+        logger.error(f"Błąd ewaluacji wyrażenia '{expression}': {e}")
+        return 0
+
+
+@lru_cache(maxsize=256)
+def compile_expression(expression: str) -> Callable[[Dict[str, Any]], Union[int, str]]:
+    """
+    Kompiluje wyrażenie dodatkowej zmiennej (np. "{str}/2 + {str}%2") do funkcji(variables).
+    Zmienne stają się nazwami w AST, więc przy każdym tekście nie ma podstawiania
+    tekstu ani parsowania - wynik jak w podstawieniu wartości i eval (/ to dzielenie
+    z obcięciem do int).
+    """
+    if not isinstance(expression, str):
+        return lambda variables: _evaluate_substituted(expression, variables)
+    
+    # Części nieparzyste to zmienne {var}, parzyste - tekst stały wyrażenia
+    parts = re.split(r'(\{[^{}]*\})', expression.replace(' ', ''))
+    
+    # Zmienne sklejone z cyframi lub innymi zmiennymi (np. "1{x}", "{a}{b}") dają po
+    # podstawieniu inną liczbę - takie wyrażenia ewaluujemy po staremu
+    for i in range(1, len(parts), 2):
+        before, after = parts[i - 1], parts[i + 1]
+        if before[-1:].isdigit() or after[:1].isdigit() or (after == '' and i + 2 < len(parts)):
+            return lambda variables: _evaluate_substituted(expression, variables)
+    
+    literals = ''.join(parts[0::2])
+    if literals and not _SAFE_EXPRESSION_RE.match(literals):
+        return lambda variables: _evaluate_substituted(expression, variables)
+    
+    # Nazwy zmiennych w wyrażeniu -> bezpieczne identyfikatory Pythona
+    names = {}
+    source = []
+    for i, part in enumerate(parts):
+        if i % 2 == 1:
+            var_name = part[1:-1]
+            source.append(names.setdefault(var_name, f'_v{len(names)}'))
+        else:
+            source.append(part)
+    
+    try:
+        tree = ast.parse(''.join(source), mode='eval')
+        if not all(isinstance(node, _SAFE_AST_NODES) for node in ast.walk(tree)):
+            raise ValueError("niedozwolona konstrukcja")
+        code = compile(tree, '<advanced-format>', 'eval')
+    except (SyntaxError, ValueError):
+        return lambda variables: _evaluate_substituted(expression, variables)
+    
+    def evaluate(variables: Dict[str, Any]) -> Union[int, str]:
+        try:
+            scope = {}
+            for var_name, identifier in names.items():
+                value = variables[var_name]
+                if not isinstance(value, int) or value < 0:
+                    # Wartość nieliczbowa - zachowanie jak przy podstawieniu tekstu
+                    return _evaluate_substituted(expression, variables)
+                scope[identifier] = value
+            result = eval(code, {"__builtins__": {}}, scope)
+            return int(result) if isinstance(result, (int, float)) else result
+        except KeyError as e:
+            logger.error(f"Błąd ewaluacji wyrażenia '{expression}': brak zmiennej {e}")
+            return 0
+        except Exception as e:
+            logger.error(f"Błąd ewaluacji wyrażenia '{expression}': {e}")
+            return 0
+    
+    return evaluate
+
+
+class AdvancedFormatProgram:
+    """
+    Skompilowany program zaawansowanego formatowania:
+    - regex formatu input i nazwy zmiennych
+    - skompilowane wyrażenia dodatkowych zmiennych
+    - szablon formatu output (części stałe i zmienne z paddingiem)
+    """
+    
+    def __init__(self, input_format: str, output_format: str = '', additional_vars: Dict[str, str] = None):
+        self.input_format = input_format
+        self.output_format = output_format
+        self.additional_vars = dict(additional_vars or {})
+        
+        self.var_names = extract_variable_names(input_format)
+        self.regex = re.compile(format_to_regex(input_format))
+        self.expressions = [(var_name, compile_expression(expression))
+                            for var_name, expression in self.additional_vars.items()]
+        
+        # Szablon output: lista (tekst stały, None) lub (token, (nazwa zmiennej, padding))
+        self.output_template = []
+        position = 0
+        for match in VARIABLE_PATTERN.finditer(output_format):
+            if match.start() > position:
+                self.output_template.append((output_format[position:match.start()], None))
+            padding = int(match.group(2)) if match.group(2) else 0
+            self.output_template.append((match.group(0), (match.group(1), padding)))
+            position = match.end()
+        if position < len(output_format):
+            self.output_template.append((output_format[position:], None))
+    
+    def parse(self, text: str) -> Dict[str, Any]:
+        """Parsuje tekst - zwraca zmienne input (pusty dict jeśli tekst nie pasuje)"""
+        match = self.regex.match(text)
+        if not match:
+            return {}
+        
+        variables = {}
+        for var_name, value in zip(self.var_names, match.groups()):
+            # Konwertuj na int jeśli to możliwe (oprócz 'name')
+            if var_name != 'name':
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass
+            variables[var_name] = value
+        return variables
+    
+    def parse_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Parsuje wiele tekstów jednym programem - lista zmiennych (pusty dict dla niepasujących)"""
+        regex_match = self.regex.match
+        var_names = self.var_names
+        results = []
+        for text in texts:
+            match = regex_match(text)
+            if not match:
+                results.append({})
+                continue
+            variables = {}
+            for var_name, value in zip(var_names, match.groups()):
+                if var_name != 'name':
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        pass
+                variables[var_name] = value
+            results.append(variables)
+        return results
+    
+    def evaluate(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """Zwraca zmienne podstawowe uzupełnione o obliczone zmienne dodatkowe"""
+        all_variables = variables.copy()
+        for var_name, expression in self.expressions:
+            all_variables[var_name] = expression(variables)
+        return all_variables
+    
+    def format_output(self, all_variables: Dict[str, Any]) -> str:
+        """Wypełnia szablon output wartościami zmiennych"""
+        result = []
+        for text, variable in self.output_template:
+            if variable is None:
+                result.append(text)
+                continue
+            
+            var_name, padding = variable
+            if var_name not in all_variables:
+                logger.warning(f"Zmienna {var_name} nie została znaleziona")
+                result.append(text)
+                continue
+            
+            value = all_variables[var_name]
+            if padding and isinstance(value, int):
+                result.append(str(value).zfill(padding))
+            else:
+                result.append(str(value))
+        
+        return ''.join(result)
+    
+    def format_text(self, text: str) -> Optional[str]:
+        """Pełny przebieg: parsowanie tekstu, zmienne dodatkowe i output (None jeśli tekst nie pasuje)"""
+        variables = self.parse(text)
+        if not variables:
+            return None
+        return self.format_output(self.evaluate(variables))
+
+
+@lru_cache(maxsize=32)
+def _compile_advanced_format(input_format: str, output_format: str,
+                             additional_items: Tuple[Tuple[str, str], ...]) -> AdvancedFormatProgram:
+    logger.debug(f"Kompilacja programu formatowania: input='{input_format}', output='{output_format}'")
+    return AdvancedFormatProgram(input_format, output_format, dict(additional_items))
+
+
+def compile_advanced_format(input_format: str, output_format: str = '',
+                            additional_vars: Dict[str, str] = None) -> AdvancedFormatProgram:
+    """
+    Zwraca skompilowany (i zapamiętany) program dla konfiguracji
+    (ADVANCED_INPUT_FORMAT, ADVANCED_OUTPUT_FORMAT, ADVANCED_ADDITIONAL_VARS)
+    """
+    additional_items = tuple((additional_vars or {}).items())
+    return _compile_advanced_format(input_format, output_format, additional_items)
+
+
 # Globalna instancja formattera
 advanced_formatter = AdvancedFormatter()
 
@@ -290,25 +433,16 @@ def parse_text_with_advanced_format(text: str, input_format: str,
     Returns:
         Dict z wszystkimi zmiennymi
     """
-    formatter = AdvancedFormatter()
+    program = compile_advanced_format(input_format, '', additional_vars)
     
     # Parsuj input
-    variables = formatter.parse_input_format(text, input_format)
+    variables = program.parse(text)
     if not variables:
+        logger.warning(f"Tekst '{text}' nie pasuje do formatu '{input_format}'")
         return {}
     
-    # Dodaj dodatkowe zmienne
-    if additional_vars:
-        for var_name, expression in additional_vars.items():
-            formatter.set_additional_variable(var_name, expression)
-    
     # Zwróć wszystkie zmienne (podstawowe + dodatkowe)
-    all_vars = variables.copy()
-    for var_name, expression in (additional_vars or {}).items():
-        result = formatter._evaluate_expression(expression, variables)
-        all_vars[var_name] = result
-        
-    return all_vars
+    return program.evaluate(variables)
 
 
 def format_output_with_advanced_format(variables: Dict[str, Any], output_format: str) -> str:
@@ -322,6 +456,8 @@ def format_output_with_advanced_format(variables: Dict[str, Any], output_format:
     Returns:
         Sformatowany string
     """
-    formatter = AdvancedFormatter()
-    formatter.variables = variables
-    return formatter.format_output(output_format)
+    try:
+        return compile_advanced_format('', output_format).format_output(variables)
+    except Exception as e:
+        logger.error(f"Błąd formatowania output: {e}")
+        return "ERROR"
@@ -0,0 +1,374 @@
+"""
+Wsadowa konwersja DXF->SVG bez GUI i bez pytań - wiele plików równolegle (ProcessPoolExecutor)
+
+Użycie:
+    python -m src.core.batch ./archiwum_dxf --config configs/ZIEB.cfg --workers 8 --timeout 900
+    python -m src.core.batch "./archiwum/**/*.dxf" --config configs/ZIEB.cfg --output-dir ./svg --summary wynik.json
+"""
+import os
+import io
+import sys
+import glob
+import json
+import time
+import queue
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Optional
+
+from src.utils.console_logger import console, logger
+
+SVG_KINDS = ("structured", "interactive")
+
+# Parametry ustawiane w procesach roboczych przez _init_worker
+_worker_config_params = None
+_worker_config = None
+_worker_quiet = True
+_worker_started = None  # Kolejka (plik, czas rozpoczęcia) do procesu głównego - liczenie limitu czasu
+
+
+def find_input_files(inputs: List[str]) -> List[str]:
+    """Pliki DXF z katalogów (bez podkatalogów) i wzorców glob, bez duplikatów, w stałej kolejności"""
+    files = []
+    seen = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                          if name.lower().endswith('.dxf')]
+        else:
+            candidates = glob.glob(pattern, recursive=True)
+        for path in sorted(candidates):
+            key = os.path.abspath(path)
+            if os.path.isfile(path) and key not in seen:
+                seen.add(key)
+                files.append(path)
+    return files
+
+
+def output_dirs_for(files: List[str], output_dir: str) -> Dict[str, str]:
+    """
+    Katalog wyjściowy każdego pliku: output_dir + jego podkatalog względem wspólnego katalogu
+    wejść, więc pliki o tej samej nazwie z różnych katalogów (glob rekurencyjny) się nie nadpisują.
+    Pliki z jednego katalogu trafiają bezpośrednio do output_dir.
+    """
+    dirs = {path: os.path.dirname(os.path.abspath(path)) for path in files}
+    try:
+        base = os.path.commonpath(list(dirs.values())) if dirs else ''
+    except ValueError:
+        # Różne dyski (Windows) - odwzoruj pełną ścieżkę z literą dysku jako pierwszym katalogiem
+        base = None
+    result = {}
+    for path, directory in dirs.items():
+        if base is None:
+            drive, rest = os.path.splitdrive(directory)
+            relative = os.path.join(drive.rstrip(':'), rest.lstrip('\\/'))
+        else:
+            relative = os.path.relpath(directory, base)
+        result[path] = os.path.normpath(os.path.join(output_dir, relative))
+    return result
+
+
+def _load_config_manager(config_path: Optional[str]):
+    """Menedżer konfiguracji z wczytanym plikiem .cfg (jak w GUI); None - ustawienia domyślne z config.py"""
+    from src.config.config_manager import ConfigManager
+
+    manager = ConfigManager()
+    if config_path:
+        if not os.path.isfile(config_path):
+            raise FileNotFoundError(f"Plik konfiguracyjny nie istnieje: {config_path}")
+        manager.config_dir = os.path.dirname(os.path.abspath(config_path))
+        config_name = os.path.splitext(os.path.basename(config_path))[0]
+        if not manager.load_config(config_name):
+            raise ValueError(f"Nie można wczytać konfiguracji: {config_path}")
+    else:
+        manager.apply_to_config_module()
+    return manager
+
+
+def load_config_snapshot(config_path: Optional[str]):
+    """Niezmienna migawka konfiguracji z pliku .cfg (config_path=None - ustawienia domyślne)"""
+    return _load_config_manager(config_path).snapshot()
+
+
+def load_config_params(config_path: Optional[str]) -> Dict:
+    """
+    Wczytaj plik .cfg (jak GUI) do modułu config i zwróć parametry dla process_dxf.
+    config_path=None - ustawienia domyślne z config.py
+    """
+    return config_params_of(_load_config_manager(config_path))
+
+
+def config_params_of(manager) -> Dict:
+    """Parametry dla process_dxf z menedżera konfiguracji"""
+    return {
+        'LAYER_TEXT': manager.get('LAYER_TEXT', '@IDE_KABLE_DC_TXT_B'),
+        'LAYER_LINE': manager.get('LAYER_LINE', '@IDE_KABLE_DC_B'),
+        'STATION_ID': manager.get('STATION_ID', 'ZIEB'),
+        'Y_TOLERANCE': float(manager.get('Y_TOLERANCE', 0.01)),
+        'SEGMENT_MIN_WIDTH': float(manager.get('SEGMENT_MIN_WIDTH', 0)),
+        'SEARCH_RADIUS': float(manager.get('SEARCH_RADIUS', 6.0)),
+        'TEXT_LOCATION': manager.get('TEXT_LOCATION', 'above'),
+        'POLYLINE_PROCESSING_MODE': manager.get('POLYLINE_PROCESSING_MODE', 'individual_segments'),
+        'SEGMENT_MERGE_GAP_TOLERANCE': float(manager.get('SEGMENT_MERGE_GAP_TOLERANCE', 1.0)),
+        'MAX_MERGE_DISTANCE': float(manager.get('MAX_MERGE_DISTANCE', 5.0)),
+        'DXF_READ_MODE': manager.get('DXF_READ_MODE', 'full'),
+        'EXTRACTION_CACHE_ENABLED': manager.get('EXTRACTION_CACHE_ENABLED', True),
+        'EXTRACTION_CACHE_DIR': manager.get('EXTRACTION_CACHE_DIR', ''),
+        'EXTRACTION_CACHE_MAX_MB': float(manager.get('EXTRACTION_CACHE_MAX_MB', 512)),
+        'USE_ADVANCED_FORMATTING': manager.get('USE_ADVANCED_FORMATTING', False),
+    }
+
+
+def _init_worker(config_path: Optional[str], quiet: bool, started_queue=None):
+    """Inicjalizacja procesu roboczego - konfiguracja wczytywana raz na proces"""
+    global _worker_config_params, _worker_config, _worker_quiet, _worker_started
+    _worker_quiet = quiet
+    _worker_started = started_queue
+    with _maybe_quiet(quiet):
+        manager = _load_config_manager(config_path)
+        _worker_config_params = config_params_of(manager)
+        _worker_config = manager.snapshot()
+
+
+def _maybe_quiet(quiet: bool):
+    """Wycisz wyjście konsoli procesu roboczego (logi nadal trafiają do pliku)"""
+    return contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext()
+
+
+def convert_file(input_file: str, output_dir: str, kinds: tuple = SVG_KINDS,
+                 all_stations: bool = False, config_params: Dict = None, cfg=None) -> Dict:
+    """
+    Konwersja jednego pliku: przetwarzanie DXF + zapis SVG, bez interakcji z użytkownikiem.
+    cfg - migawka konfiguracji (ConfigSnapshot) przekazywana jawnie do parsowania i generatorów SVG.
+    Zwraca wpis podsumowania (czasy etapów, liczby przypisań, ścieżki wyjściowe).
+    """
+    from src.core.dxf2svg import process_dxf, process_dxf_stations, generate_station_svg, generate_station_svgs
+    from src.svg.scene import Scene
+
+    if config_params is None:
+        config_params = _worker_config_params
+    if config_params is None:
+        config_params = load_config_params(None)
+    if cfg is None:
+        cfg = _worker_config
+    if cfg is None:
+        from src.core.config import snapshot_config
+        cfg = snapshot_config()
+
+    entry = {
+        'file': input_file,
+        'status': 'ok',
+        'pid': os.getpid(),
+        'timings': {},
+        'stations': {},
+        'outputs': [],
+    }
+    file_start = time.perf_counter()
+    timings = entry['timings']
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+
+    with _maybe_quiet(_worker_quiet):
+        if all_stations:
+            results = process_dxf_stations(input_file, config_params, timings=timings, cfg=cfg)
+        else:
+            timings_single = {}
+            results = {config_params['STATION_ID']: process_dxf(input_file, config_params, timings_single, cfg)}
+            timings.update(timings_single)
+
+        stage_start = time.perf_counter()
+        if all_stations:
+            paths = generate_station_svgs(results, output_dir, stem, kinds, cfg=cfg)
+        else:
+            # Jedna stacja - nazwy plików bez identyfikatora stacji
+            os.makedirs(output_dir, exist_ok=True)
+            station_id = config_params['STATION_ID']
+            scene = Scene.from_result(results[station_id], station_id, cfg)
+            paths = {station_id: {kind: generate_station_svg(kind, results[station_id],
+                                                                os.path.join(output_dir, f"{stem}_{kind}.svg"),
+                                                                station_id, cfg, scene)
+                                  for kind in kinds}}
+        timings['svg'] = time.perf_counter() - stage_start
+
+    for station_id, (inverter_data, station_texts, unassigned_texts, _, unassigned_polylines) in results.items():
+        entry['stations'][station_id] = {
+            'texts': len(station_texts),
+            'assigned_strings': sum(len(strings) for strings in inverter_data.values()),
+            'inverters': len(inverter_data),
+            'unassigned_texts': len(unassigned_texts),
+            'unassigned_strings': len(unassigned_polylines),
+        }
+        entry['outputs'].extend(paths.get(station_id, {}).values())
+
+    timings['total'] = time.perf_counter() - file_start
+    return entry
+
+
+def _run_file(path: str, output_dir: str, kinds: tuple, all_stations: bool) -> Dict:
+    """
+    Zadanie puli: zgłoś rzeczywisty początek przetwarzania pliku i go skonwertuj.
+    future.running() jest ustawiane już przy przekazaniu zadania do kolejki wywołań puli
+    (do max_workers + 1 zadań), więc nie wskazuje, że proces roboczy zaczął plik.
+    """
+    if _worker_started is not None:
+        _worker_started.put((path, time.time()))
+    return convert_file(path, output_dir, kinds, all_stations)
+
+
+def _kill_pool_processes(executor: ProcessPoolExecutor):
+    """Zakończ procesy robocze puli (zablokowane zadania nie kończą się same)"""
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    if not processes:
+        processes = multiprocessing.active_children()
+    for process in processes:
+        try:
+            process.terminate()
+        except Exception:
+            pass
+    for process in processes:
+        process.join(5)
+        if process.is_alive():
+            process.kill()
+
+
+def run_batch(files: List[str], config_path: Optional[str], output_dir: str, workers: int = None,
+              timeout: float = None, kinds: tuple = SVG_KINDS, all_stations: bool = False,
+              quiet: bool = True) -> List[Dict]:
+    """
+    Konwersja plików w puli procesów. timeout - limit czasu na plik liczony od rozpoczęcia
+    jego przetwarzania; po przekroczeniu pula jest restartowana, a przerwane pliki
+    (inne niż ten, który przekroczył limit) przetwarzane są ponownie.
+    SVG zapisywane są w podkatalogach output_dir odpowiadających katalogom wejściowym (output_dirs_for).
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    output_dirs = output_dirs_for(files, output_dir)
+    entries = {}
+    pending = list(files)
+
+    while pending:
+        started_queue = multiprocessing.Queue() if timeout is not None else None
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                       initializer=_init_worker, initargs=(config_path, quiet, started_queue))
+        futures = {executor.submit(_run_file, path, output_dirs[path], kinds, all_stations): path for path in pending}
+        started = {}  # plik -> czas rozpoczęcia w procesie roboczym
+        timed_out = []
+
+        not_done = set(futures)
+        while not_done:
+            done, not_done = wait(not_done, timeout=0.5, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                path = futures[future]
+                try:
+                    entries[path] = future.result()
+                except Exception as e:
+                    logger.error(f"Błąd konwersji {path}: {e}")
+                    entries[path] = {'file': path, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+                _report(entries[path], len(entries), len(files))
+
+            if timeout is None:
+                continue
+            while True:
+                try:
+                    path, start = started_queue.get_nowait()
+                except queue.Empty:
+                    break
+                started[path] = start
+            now = time.time()
+            timed_out = [f for f in not_done if futures[f] in started and now - started[futures[f]] > timeout]
+            if timed_out:
+                break
+
+        if not timed_out:
+            executor.shutdown(wait=True)
+            break
+
+        # Przekroczony limit czasu - zakończ pulę, pozostałe pliki przetwórz w nowej
+        for future in timed_out:
+            path = futures[future]
+            logger.error(f"Przekroczono limit czasu ({timeout}s): {path}")
+            entries[path] = {'file': path, 'status': 'timeout', 'error': f"Przekroczono limit czasu {timeout}s"}
+            _report(entries[path], len(entries), len(files))
+        _kill_pool_processes(executor)
+        executor.shutdown(wait=False, cancel_futures=True)
+        pending = [path for path in pending if path not in entries]
+
+    return [entries[path] for path in files]
+
+
+def _report(entry: Dict, done_count: int, total: int):
+    """Postęp w konsoli procesu głównego"""
+    name = os.path.basename(entry['file'])
+    if entry['status'] == 'ok':
+        assigned = sum(s['assigned_strings'] for s in entry['stations'].values())
+        console.success(f"[{done_count}/{total}] {name} ({entry['timings']['total']:.1f}s, stringów: {assigned})")
+    else:
+        console.error(f"[{done_count}/{total}] {name}: {entry['error']}")
+
+
+def main(argv: List[str] = None) -> int:
+    """Punkt wejścia CLI - kod wyjścia 0 gdy wszystkie pliki przetworzone poprawnie"""
+    parser = argparse.ArgumentParser(description="Wsadowa konwersja DXF->SVG (bez GUI)")
+    parser.add_argument('inputs', nargs='+', help="katalogi z plikami .dxf lub wzorce glob")
+    parser.add_argument('--config', help="plik konfiguracyjny .cfg (domyślnie ustawienia z config.py)")
+    parser.add_argument('--output-dir', default='output_batch', help="katalog wyjściowy SVG")
+    parser.add_argument('--workers', type=int, default=None, help="liczba procesów (domyślnie liczba CPU)")
+    parser.add_argument('--timeout', type=float, default=None, help="limit czasu na plik w sekundach")
+    parser.add_argument('--kinds', default=",".join(SVG_KINDS),
+                        help="rodzaje SVG oddzielone przecinkami: structured,interactive")
+    parser.add_argument('--all-stations', action='store_true',
+                        help="osobne SVG dla każdej stacji wykrytej w pliku")
+    parser.add_argument('--summary', default=None,
+                        help="plik podsumowania JSON (domyślnie <output-dir>/batch_summary.json)")
+    parser.add_argument('--verbose', action='store_true', help="pokaż wyjście konsoli procesów roboczych")
+    args = parser.parse_args(argv)
+
+    kinds = tuple(k.strip() for k in args.kinds.split(',') if k.strip())
+    invalid = [k for k in kinds if k not in SVG_KINDS]
+    if invalid:
+        parser.error(f"Nieznany rodzaj SVG: {', '.join(invalid)}")
+
+    files = find_input_files(args.inputs)
+    if not files:
+        console.error("Nie znaleziono plików DXF")
+        return 1
+
+    # Sprawdź konfigurację przed uruchomieniem puli
+    try:
+        with _maybe_quiet(not args.verbose):
+            load_config_params(args.config)
+    except Exception as e:
+        console.error(f"Błąd konfiguracji: {e}")
+        return 1
+
+    console.header("KONWERSJA WSADOWA DXF -> SVG")
+    console.result("Plików do przetworzenia", len(files))
+    batch_start = time.perf_counter()
+    entries = run_batch(files, args.config, args.output_dir, args.workers, args.timeout, kinds,
+                        args.all_stations, quiet=not args.verbose)
+
+    summary = {
+        'config': args.config,
+        'output_dir': args.output_dir,
+        'workers': max(1, args.workers or os.cpu_count() or 1),
+        'timeout': args.timeout,
+        'total_seconds': time.perf_counter() - batch_start,
+        'files_ok': sum(1 for e in entries if e['status'] == 'ok'),
+        'files_failed': sum(1 for e in entries if e['status'] != 'ok'),
+        'files': entries,
+    }
+    summary_path = args.summary or os.path.join(args.output_dir, 'batch_summary.json')
+    os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+
+    console.result("Przetworzonych poprawnie", summary['files_ok'])
+    if summary['files_failed']:
+        console.warning("Plików z błędami", summary['files_failed'])
+    console.success("Podsumowanie zapisane", summary_path)
+    return 0 if summary['files_failed'] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
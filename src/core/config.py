@@ -2,7 +2,12 @@
 Konfiguracja formatów tekstów i parametrów systemu
 """
 import re
-from typing import Dict
+import copy
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
 from src.utils.console_logger import console, logger
 
 # ============================================================================
@@ -79,6 +84,7 @@ TEXT_FORMATS = {
         'substring_format': lambda: "S00"  # Zawsze string 0
     },
 }
+_DEFAULT_TEXT_FORMATS = TEXT_FORMATS  # Odtwarzanie migawek konfiguracji w innych procesach
 
 # WYBIERZ FORMAT DLA TEGO OBIEKTU
 CURRENT_TEXT_FORMAT = 'format_1'  # Ustaw na 'format_1', 'format_2', lub 'format_3'
@@ -93,6 +99,12 @@ LAYER_LINE = "@IDE_KABLE_DC_B"
 LAYER_TEXT = "@IDE_KABLE_DC_TXT_B"
 SVG_WIDTH = 1600
 SVG_HEIGHT = 800
+# Generowanie plików SVG jednej konwersji (podgląd + strukturalny) w main():
+# "thread" - w wątkach, "serial" - kolejno, "process" - w osobnych procesach
+# (start procesów kosztuje sekundy - opłaca się tylko przy bardzo dużych rysunkach)
+SVG_RENDER_MODE = "thread"
+# Edycja przypisań w GUI: łatki przyrostowe interaktywnego SVG zamiast pełnej regeneracji po każdej zmianie
+INCREMENTAL_SVG_UPDATES = True
 MPTT_HEIGHT = 1
 SEGMENT_MIN_WIDTH = 0
 ASSIGNED_SEGMENT_COLOR = "#00778B"  # Kolor przypisanych segmentów
@@ -111,6 +123,19 @@ X_TOLERANCE = 0.01
 SEARCH_RADIUS = 6.0 
 TEXT_LOCATION = "above"     # "above", "below", "any"
 
+# Tryb odczytu DXF: "full" - pełny dokument (ezdxf.readfile),
+# "streaming" - jednoprzebiegowy odczyt tylko MTEXT/LWPOLYLINE z warstw LAYER_TEXT/LAYER_LINE
+DXF_READ_MODE = "full"
+
+# Cache wyników ekstrakcji na dysku (klucz: hash pliku DXF + warstwy, Y_TOLERANCE,
+# SEGMENT_MIN_WIDTH, tryb łączenia) - kolejne konwersje tego samego rysunku pomijają parsowanie DXF.
+# Wyłączenie: EXTRACTION_CACHE_ENABLED = False
+EXTRACTION_CACHE_ENABLED = True
+# "" - katalog cache użytkownika (~/.cache/dxf2svg/extraction_cache, w Windows %LOCALAPPDATA%\dxf2svg\extraction_cache);
+# ścieżka względna liczona od katalogu pliku DXF, nie od bieżącego katalogu
+EXTRACTION_CACHE_DIR = ""
+EXTRACTION_CACHE_MAX_MB = 512
+
 # Parametry segmentacji polilinii
 POLYLINE_PROCESSING_MODE = "individual_segments"  # "individual_segments", "merge_segments" 
 SEGMENT_MERGE_GAP_TOLERANCE = 1.0  # Tolerancja przerw między segmentami do łączenia
@@ -143,6 +168,123 @@ SELECTED_TEXT_COLOR = "#00FFFF"  # Cyan dla zaznaczonego tekstu
 HOVER_SEGMENT_COLOR = "#FFB6C1"  # Jasny różowy dla segmentów w grupie (hover)
 HOVER_TEXT_COLOR = "#8B008B"  # Ciemny fioletowy dla tekstów w grupie (hover)
 
+# Wersja konfiguracji - zwiększana przy każdej zmianie parametrów przez ConfigManager
+# (unieważnia cache parsera tekstów)
+CONFIG_VERSION = 0
+
+def bump_config_version():
+    """Oznacz zmianę konfiguracji - parser tekstów przekompiluje wzorce i wyczyści cache"""
+    global CONFIG_VERSION
+    CONFIG_VERSION += 1
+    logger.debug(f"Nowa wersja konfiguracji: {CONFIG_VERSION}")
+
+# Nazwy pisane wielkimi literami, które nie są ustawieniami (stan modułu / tabele kodu)
+_SNAPSHOT_EXCLUDED = {'CONFIG_VERSION', 'PARSED_FIELD_BUILDERS'}
+
+class ConfigSnapshot:
+    """
+    Niezmienna migawka konfiguracji - wartości ustawień (nazwy pisane wielkimi literami)
+    w chwili utworzenia, z dostępem jak do atrybutów modułu: cfg.MPTT_HEIGHT, cfg.STATION_ID.
+    Przekazywana jawnie przez process_dxf i generatory SVG zamiast odczytu globalnych zmiennych,
+    dzięki czemu konwersje z różnymi konfiguracjami mogą działać równolegle w wątkach.
+    """
+    
+    __slots__ = ('_values', '_fingerprint')
+    
+    def __init__(self, values: Dict[str, Any]):
+        object.__setattr__(self, '_values', {name: copy.deepcopy(value) for name, value in values.items()})
+        object.__setattr__(self, '_fingerprint', None)
+    
+    def __getattr__(self, name: str):
+        try:
+            return self._values[name]
+        except KeyError:
+            raise AttributeError(f"Brak ustawienia konfiguracji: {name}") from None
+    
+    def __setattr__(self, name: str, value):
+        raise AttributeError("ConfigSnapshot jest niezmienny - użyj replace()")
+    
+    def __delattr__(self, name: str):
+        raise AttributeError("ConfigSnapshot jest niezmienny")
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self._values
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ConfigSnapshot) and self.fingerprint == other.fingerprint
+    
+    def __hash__(self) -> int:
+        return hash(self.fingerprint)
+    
+    def __repr__(self) -> str:
+        return f"ConfigSnapshot(STATION_ID={self._values.get('STATION_ID')!r}, fingerprint={self.fingerprint[:12]})"
+    
+    def __reduce__(self):
+        # Funkcje w TEXT_FORMATS nie dają się serializować - domyślne formaty odtwarzane są z modułu
+        values = dict(self._values)
+        if values.get('TEXT_FORMATS') == _DEFAULT_TEXT_FORMATS:
+            values['TEXT_FORMATS'] = _DEFAULT_TEXT_FORMATS_MARKER
+        return (_restore_snapshot, (values,))
+    
+    def get(self, name: str, default=None):
+        """Wartość ustawienia lub default"""
+        return self._values.get(name, default)
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Kopia wszystkich ustawień"""
+        return copy.deepcopy(self._values)
+    
+    def replace(self, **changes) -> 'ConfigSnapshot':
+        """Nowa migawka ze zmienionymi ustawieniami"""
+        values = dict(self._values)
+        values.update(changes)
+        return ConfigSnapshot(values)
+    
+    @property
+    def fingerprint(self) -> str:
+        """Deterministyczny odcisk ustawień (klucz cache niezależny od procesu)"""
+        if self._fingerprint is None:
+            encoded = json.dumps(self._values, sort_keys=True, default=_fingerprint_value)
+            object.__setattr__(self, '_fingerprint', hashlib.sha1(encoded.encode('utf-8')).hexdigest())
+        return self._fingerprint
+    
+    def dxf_params(self) -> Dict[str, Any]:
+        """Parametry przetwarzania w formacie config_params dla process_dxf"""
+        return {name: self._values[name] for name in DXF_PARAM_NAMES if name in self._values}
+
+# Ustawienia przekazywane do process_dxf jako config_params
+DXF_PARAM_NAMES = (
+    'LAYER_TEXT', 'LAYER_LINE', 'STATION_ID', 'Y_TOLERANCE', 'SEGMENT_MIN_WIDTH', 'SEARCH_RADIUS',
+    'TEXT_LOCATION', 'POLYLINE_PROCESSING_MODE', 'SEGMENT_MERGE_GAP_TOLERANCE', 'MAX_MERGE_DISTANCE',
+    'DXF_READ_MODE', 'EXTRACTION_CACHE_ENABLED', 'EXTRACTION_CACHE_DIR', 'EXTRACTION_CACHE_MAX_MB',
+    'USE_ADVANCED_FORMATTING',
+)
+
+_DEFAULT_TEXT_FORMATS_MARKER = '__module_text_formats__'
+
+def _restore_snapshot(values: Dict[str, Any]) -> ConfigSnapshot:
+    if values.get('TEXT_FORMATS') == _DEFAULT_TEXT_FORMATS_MARKER:
+        values = dict(values, TEXT_FORMATS=_DEFAULT_TEXT_FORMATS)
+    return ConfigSnapshot(values)
+
+def _fingerprint_value(value):
+    """Reprezentacja JSON wartości niestandardowych (np. funkcji formatów w TEXT_FORMATS)"""
+    code = getattr(value, '__code__', None)
+    if code is not None:
+        consts = [c for c in code.co_consts if isinstance(c, (str, int, float, type(None)))]
+        return f"{value.__module__}.{value.__qualname__}:{code.co_code.hex()}:{consts!r}"
+    if isinstance(value, (set, frozenset, tuple)):
+        return sorted(map(repr, value))
+    return repr(value)
+
+def snapshot_config(**overrides) -> ConfigSnapshot:
+    """Migawka bieżących ustawień modułu config (opcjonalnie ze zmienionymi wartościami)"""
+    values = {name: value for name, value in globals().items()
+              if name.isupper() and not name.startswith('_') and name not in _SNAPSHOT_EXCLUDED
+              and not callable(value)}
+    values.update(overrides)
+    return ConfigSnapshot(values)
+
 def print_format_info():
     """Wyświetl informacje o dostępnych formatach tekstu"""
     logger.info("Wyświetlanie informacji o formatach tekstów")
@@ -166,12 +308,18 @@ def print_format_info():
     console.result("OCZEKIWANE ID STACJI", STATION_ID, Colors.BRIGHT_YELLOW)
     console.separator()
 
+# Prekompilowane wzorce czyszczenia tekstu DXF
+_DXF_ESCAPED_BRACES_RE = re.compile(r'\\\{.*?\}')
+_DXF_FORMAT_CODES_RE = re.compile(r'\\[A-Za-z0-9]+\b')
+_DXF_BRACES_RE = re.compile(r'[\\{}]')
+_DXF_LEADING_JUNK_RE = re.compile(r'^[^a-zA-Z0-9]+')
+
 def clean_dxf_text(text: str) -> str:
     """Czyszczenie tekstu z formatowania DXF"""
-    text = re.sub(r'\\\{.*?\}', '', text)
-    text = re.sub(r'\\[A-Za-z0-9]+\b', '', text)
-    text = re.sub(r'[\\{}]', '', text)
-    text = re.sub(r'^[^a-zA-Z0-9]+', '', text)
+    text = _DXF_ESCAPED_BRACES_RE.sub('', text)
+    text = _DXF_FORMAT_CODES_RE.sub('', text)
+    text = _DXF_BRACES_RE.sub('', text)
+    text = _DXF_LEADING_JUNK_RE.sub('', text)
     text = text.replace(" ", "").strip()
     return text
 
@@ -186,25 +334,220 @@ def parse_string_name(text: str):
         logger.error(f"Błąd parsowania tekstu '{text}': {e}")
         return None
 
-def parse_text_to_dict(text: str, station_id: str = None) -> Dict:
-    """Uniwersalna funkcja parsowania tekstów wspierająca różne formaty - zwraca pełne dane"""
+class _FormatSet:
+    """
+    Skompilowane wzorce TEXT_FORMATS dla jednej konfiguracji: kolejność prób (aktualny format
+    pierwszy) i jeden połączony wzorzec alternatywy z nazwanymi grupami.
+    """
+    
+    def __init__(self, text_formats: Dict, current_format: str):
+        self.text_formats = text_formats
+        self.compiled = {}
+        for format_name, format_config in text_formats.items():
+            try:
+                self.compiled[format_name] = re.compile(format_config['pattern'])
+            except re.error as e:
+                logger.error(f"Nieprawidłowy wzorzec formatu {format_name}: {e}")
+        
+        # Kolejność prób: najpierw aktualny format, potem pozostałe
+        self.order = [name for name in text_formats if name == current_format]
+        self.order += [name for name in text_formats if name != current_format]
+        self._compile_combined()
+    
+    def _compile_combined(self):
+        """
+        Łączy wszystkie formaty w jeden wzorzec alternatywy z nazwanymi grupami.
+        Alternatywy są w kolejności prób, więc pierwsza pasująca to ten sam format,
+        który wybrałoby sprawdzanie formatów po kolei.
+        """
+        self.combined = None
+        self.combined_groups = {}
+        
+        names = [name for name in self.order if name in self.compiled]
+        if len(names) != len(self.order):
+            return  # Nieprawidłowy wzorzec - tylko sprawdzanie po kolei
+        
+        # Odwołania wsteczne (\1) zmieniłyby znaczenie po przenumerowaniu grup
+        if any(re.search(r'\\[1-9]|\(\?P=', self.text_formats[name]['pattern']) for name in names):
+            logger.debug("Wzorce formatów zawierają odwołania wsteczne - sprawdzanie formatów po kolei")
+            return
+        
+        alternatives = [f"(?P<_f{i}>{self.text_formats[name]['pattern']})" for i, name in enumerate(names)]
+        try:
+            combined = re.compile('|'.join(alternatives))
+        except re.error as e:
+            logger.debug(f"Nie można połączyć wzorców formatów ({e}) - sprawdzanie formatów po kolei")
+            return
+        
+        # Indeks grupy opakowującej -> (format, przesunięcie numeracji grup formatu)
+        for i, name in enumerate(names):
+            wrapper_index = combined.groupindex[f"_f{i}"]
+            self.combined_groups[wrapper_index] = (name, wrapper_index)
+        self.combined = combined
+    
+    def match(self, cleaned_text: str):
+        """Generator dopasowań (nazwa formatu, dopasowanie, przesunięcie grup) w kolejności prób"""
+        start = 0
+        if self.combined is not None:
+            match = self.combined.match(cleaned_text)
+            if match is None:
+                return
+            format_name, offset = self.combined_groups[match.lastindex]
+            yield format_name, match, offset
+            start = self.order.index(format_name) + 1
+        
+        for format_name in self.order[start:]:
+            pattern = self.compiled.get(format_name)
+            if pattern is None:
+                continue
+            match = pattern.match(cleaned_text)
+            if match:
+                yield format_name, match, 0
+
+class TextParser:
+    """
+    Parser tekstów z prekompilowanymi wzorcami TEXT_FORMATS i ograniczonym cache wyników.
+    Klucz cache: (surowy tekst, ID stacji, wersja konfiguracji) - zmiana konfiguracji
+    przez ConfigManager (bump_config_version) czyści cache i kompiluje wzorce od nowa.
+    Z migawką konfiguracji (cfg) wersją jest odcisk migawki, a wzorce kompilowane są osobno
+    dla każdej migawki - równoległe konwersje z różnymi konfiguracjami nie kolidują.
+    """
+    
+    _MISSING = object()
+    _MAX_SNAPSHOT_FORMATS = 16
+    
+    def __init__(self, max_cache_size: int = 100000):
+        self.max_cache_size = max_cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._formats = None
+        self._snapshot_formats = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+    
+    def _sync_version(self):
+        """Wyczyść cache i przekompiluj wzorce jeśli konfiguracja się zmieniła"""
+        if self._version == CONFIG_VERSION:
+            return
+        self._cache.clear()
+        self._formats = _FormatSet(TEXT_FORMATS, CURRENT_TEXT_FORMAT)
+        self._version = CONFIG_VERSION
+        logger.debug(f"Parser tekstów: skompilowano {len(self._formats.compiled)} wzorców (wersja {CONFIG_VERSION})")
+    
+    def _format_set(self, cfg: 'ConfigSnapshot' = None) -> _FormatSet:
+        """Wzorce dla migawki konfiguracji lub (cfg=None) dla bieżących wartości modułu"""
+        with self._lock:
+            if cfg is None:
+                self._sync_version()
+                return self._formats
+            
+            fingerprint = cfg.fingerprint
+            formats = self._snapshot_formats.get(fingerprint)
+            if formats is None:
+                formats = _FormatSet(cfg.TEXT_FORMATS, cfg.CURRENT_TEXT_FORMAT)
+                self._snapshot_formats[fingerprint] = formats
+                while len(self._snapshot_formats) > self._MAX_SNAPSHOT_FORMATS:
+                    self._snapshot_formats.popitem(last=False)
+            else:
+                self._snapshot_formats.move_to_end(fingerprint)
+            return formats
+    
+    def compiled_pattern(self, format_name: str, cfg: 'ConfigSnapshot' = None):
+        """Zwraca skompilowany wzorzec formatu (None jeśli wzorzec jest nieprawidłowy)"""
+        return self._format_set(cfg).compiled.get(format_name)
+    
+    def match_formats(self, cleaned_text: str, cfg: 'ConfigSnapshot' = None):
+        """
+        Generator dopasowań (nazwa formatu, dopasowanie, przesunięcie grup) w kolejności prób.
+        Pierwsze dopasowanie pochodzi z jednego skanowania połączonym wzorcem; kolejne
+        (gdy wywołujący odrzuci wynik) - ze sprawdzania dalszych formatów po kolei.
+        """
+        return self._format_set(cfg).match(cleaned_text)
+    
+    def clear(self):
+        """Wyczyść cache wyników"""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def parse(self, text: str, station_id: str = None, cfg: 'ConfigSnapshot' = None) -> Dict:
+        """Parsuje tekst z użyciem cache - zwraca kopię wyniku (wywołujący mogą go modyfikować)"""
+        if station_id is not None:
+            key_station = station_id
+        else:
+            key_station = STATION_ID if cfg is None else cfg.STATION_ID
+        
+        with self._lock:
+            if cfg is None:
+                self._sync_version()
+                key = (text, key_station, self._version)
+            else:
+                key = (text, key_station, ('cfg', cfg.fingerprint))
+            result = self._cache.get(key, self._MISSING)
+            if result is not self._MISSING:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return _copy_parsed(result)
+        
+        result = _parse_text_uncached(text, station_id, cfg)
+        
+        with self._lock:
+            self.misses += 1
+            if cfg is not None or key[2] == self._version:
+                self._cache[key] = result
+                while len(self._cache) > self.max_cache_size:
+                    self._cache.popitem(last=False)
+        
+        return _copy_parsed(result)
+
+def _copy_parsed(parsed: Dict) -> Dict:
+    """Płytka kopia wyniku parsowania (z kopią słownika zmiennych)"""
+    if parsed is None:
+        return None
+    copied = dict(parsed)
+    if 'variables' in copied:
+        copied['variables'] = dict(copied['variables'])
+    return copied
+
+# Globalna instancja parsera
+text_parser = TextParser()
+
+def parse_text_to_dict(text: str, station_id: str = None, cfg: 'ConfigSnapshot' = None) -> Dict:
+    """
+    Uniwersalna funkcja parsowania tekstów wspierająca różne formaty - zwraca pełne dane
+    cfg - migawka konfiguracji (None - bieżące wartości modułu config)
+    """
+    return text_parser.parse(text, station_id, cfg)
+
+def _config_value(cfg: 'ConfigSnapshot', name: str, default=None):
+    """Wartość z migawki konfiguracji (jeśli podana) albo z bieżących wartości modułu"""
+    if cfg is not None:
+        return cfg.get(name, default)
+    return globals().get(name, default)
+
+def _parse_text_uncached(text: str, station_id: str = None, cfg: 'ConfigSnapshot' = None) -> Dict:
+    """Parsowanie tekstu bez cache (wywoływane przez TextParser)"""
     try:
         cleaned = clean_dxf_text(text)
         logger.debug(f"Tekst oryginalny: '{text}' -> po czyszczeniu: '{cleaned}'")
         
         # SPRAWDŹ NAJPIERW ZAAWANSOWANE FORMATOWANIE
-        if globals().get('USE_ADVANCED_FORMATTING', False):
+        default_station_id = _config_value(cfg, 'STATION_ID')
+        if _config_value(cfg, 'USE_ADVANCED_FORMATTING', False):
             logger.debug("Próbuję zaawansowane formatowanie...")
             
-            from src.core.advanced_formatter import AdvancedFormatter
+            from src.core.advanced_formatter import compile_advanced_format
             
-            input_format = globals().get('ADVANCED_INPUT_FORMAT', '')
-            output_format = globals().get('ADVANCED_OUTPUT_FORMAT', '')
-            additional_vars = globals().get('ADVANCED_ADDITIONAL_VARS', {})
+            input_format = _config_value(cfg, 'ADVANCED_INPUT_FORMAT', '')
+            output_format = _config_value(cfg, 'ADVANCED_OUTPUT_FORMAT', '')
+            additional_vars = _config_value(cfg, 'ADVANCED_ADDITIONAL_VARS', {})
             
             if input_format and output_format:
-                formatter = AdvancedFormatter()
-                variables = formatter.parse_input_format(cleaned, input_format)
+                # Program kompilowany raz dla konfiguracji (regex, wyrażenia, szablon output)
+                program = compile_advanced_format(input_format, output_format, additional_vars)
+                variables = program.parse(cleaned)
                 
                 if variables:
                     logger.debug(f"Zaawansowane formatowanie rozpoznało: {variables}")
@@ -212,8 +555,8 @@ def parse_text_to_dict(text: str, station_id: str = None) -> Dict:
                     # Utwórz standardowy dict format dla kompatybilności z resztą systemu
                     # Mapuj zmienne zaawansowane na standardowe pola
                     result = {
-                        'station': variables.get('name', variables.get('st', station_id or STATION_ID)),
-                        'station_id': variables.get('name', variables.get('st', station_id or STATION_ID)),
+                        'station': variables.get('name', variables.get('st', station_id or default_station_id)),
+                        'station_id': variables.get('name', variables.get('st', station_id or default_station_id)),
                         'inverter': f"I{variables.get('inv', 0):02d}",
                         'mppt': f"MPPT{variables.get('mppt', 0)}",
                         'substring': f"STR{variables.get('str', variables.get('tr', 0))}",
@@ -225,6 +568,7 @@ def parse_text_to_dict(text: str, station_id: str = None) -> Dict:
                     logger.debug(f"Zwracam standardowy format: {result}")
                     return result
                 else:
+                    logger.warning(f"Tekst '{cleaned}' nie pasuje do formatu '{input_format}'")
                     logger.debug(f"Zaawansowane formatowanie nie rozpoznało tekstu '{cleaned}' z formatem '{input_format}'")
             else:
                 logger.warning("Zaawansowane formatowanie włączone ale brak formatów input/output")
@@ -234,21 +578,15 @@ def parse_text_to_dict(text: str, station_id: str = None) -> Dict:
         
         # Użyj przekazanego station_id lub domyślnego z config
         if station_id is None:
-            station_id = STATION_ID
+            station_id = default_station_id
         
-        # Próbuj najpierw aktualny format
-        if CURRENT_TEXT_FORMAT in TEXT_FORMATS:
-            result = try_parse_format(cleaned, CURRENT_TEXT_FORMAT, text, station_id)
+        # Jedno skanowanie połączonym wzorcem wszystkich formatów (aktualny format ma pierwszeństwo)
+        for format_name, match, offset in text_parser.match_formats(cleaned, cfg):
+            result = build_parsed_fields(format_name, match, station_id, offset, cfg)
             if result:
-                return result
-        
-        # Jeśli aktualny format nie zadziałał, próbuj wszystkie inne
-        for format_name in TEXT_FORMATS:
-            if format_name != CURRENT_TEXT_FORMAT:
-                result = try_parse_format(cleaned, format_name, text, station_id)
-                if result:
+                if format_name != _config_value(cfg, 'CURRENT_TEXT_FORMAT'):
                     logger.info(f"Tekst '{text}' rozpoznany jako format {format_name}")
-                    return result
+                return result
         
         # Jeśli żaden format nie pasuje
         logger.warning(f"Tekst '{text}' nie pasuje do żadnego znanego formatu")
@@ -258,114 +596,86 @@ def parse_text_to_dict(text: str, station_id: str = None) -> Dict:
         logger.error(f"Błąd parsowania tekstu '{text}': {e}")
         return None
 
-def try_parse_format(cleaned_text: str, format_name: str, original_text: str, station_id: str) -> Dict:
-    """Próbuje sparsować tekst używając określonego formatu"""
+def _field_station(format_config: Dict, values: Dict, station_id: str) -> str:
+    """Pole 'station' - format bez grupy stacji (np. INV01-02) używa przekazanego station_id"""
+    if 'station' not in values:
+        return station_id
+    station_format = format_config.get('station_format', lambda station: station)
+    if 'station_num' in values:
+        return station_format(values['station'], values['station_num'])
+    return station_format(values['station'])
+
+def _field_inverter(format_config: Dict, values: Dict, station_id: str) -> str:
+    """Pole 'inverter' - numer falownika w formacie I01"""
+    return format_config['inverter_format'](values['inverter'])
+
+def _field_mppt(format_config: Dict, values: Dict, station_id: str) -> str:
+    """Pole 'mppt' - surowa grupa albo wynik mppt_format (np. STR19 -> MPPT19)"""
+    if 'mppt_format' in format_config:
+        return format_config['mppt_format'](values['mppt'])
+    return values['mppt']
+
+def _field_substring(format_config: Dict, values: Dict, station_id: str) -> str:
+    """Pole 'substring' - surowa grupa albo stała z substring_format (np. S00)"""
+    if 'substring' in values:
+        return values['substring']
+    return format_config['substring_format']()
+
+# Tabela mapowania pól wyniku - wspólna dla wszystkich formatów z TEXT_FORMATS
+PARSED_FIELD_BUILDERS = (
+    ('station', _field_station),
+    ('inverter', _field_inverter),
+    ('mppt', _field_mppt),
+    ('substring', _field_substring),
+)
+
+def build_parsed_fields(format_name: str, match, station_id: str, group_offset: int = 0,
+                        cfg: 'ConfigSnapshot' = None) -> Dict:
+    """
+    Buduje słownik wyniku z dopasowania wzorca formatu.
+    group_offset - przesunięcie numeracji grup (dopasowanie z połączonego wzorca)
+    """
     try:
-        format_config = TEXT_FORMATS[format_name]
-        pattern = format_config['pattern']
-        groups = format_config['groups']
+        format_config = _config_value(cfg, 'TEXT_FORMATS')[format_name]
+        values = {name: match.group(index + group_offset) for name, index in format_config['groups'].items()}
         
-        logger.debug(f"Próbuję format {format_name} z wzorcem: {pattern}")
+        logger.debug(f"Dopasowane grupy dla {format_name}: {values}")
         
-        # Dopasuj wzorzec
-        match = re.match(pattern, cleaned_text)
-        if not match:
-            return None
+        result = {field: builder(format_config, values, station_id) for field, builder in PARSED_FIELD_BUILDERS}
         
-        logger.debug(f"Dopasowane grupy dla {format_name}: {match.groups()}")
+        logger.debug(f"Sparsowane dane ({format_name}): {result}")
+        return result
         
-        # Wyciągnij dane według formatu
-        result = {}
+    except Exception as e:
+        logger.debug(f"Błąd parsowania formatu {format_name}: {e}")
+        return None
+
+def try_parse_format(cleaned_text: str, format_name: str, original_text: str, station_id: str) -> Dict:
+    """Próbuje sparsować tekst używając określonego formatu"""
+    try:
+        pattern = text_parser.compiled_pattern(format_name)
+        logger.debug(f"Próbuję format {format_name} z wzorcem: {TEXT_FORMATS[format_name]['pattern']}")
         
-        if format_name == 'format_1':
-            # Format: STACJA/FALOWNIK/MPPT/STRING
-            station = match.group(groups['station'])
-            inverter_num = match.group(groups['inverter'])
-            mppt = match.group(groups['mppt'])
-            substring = match.group(groups['substring'])
-            
-            result = {
-                'station': format_config['station_format'](station),
-                'inverter': format_config['inverter_format'](inverter_num),
-                'mppt': mppt,
-                'substring': substring
-            }
-            logger.debug(f"Format 1 - Station: {station}, Inverter: {inverter_num}, MPPT: {mppt}, String: {substring}")
-            
-        elif format_name == 'format_2':
-            # Format: STACJA/ST/FALOWNIK/MPPT/STRING
-            station = match.group(groups['station'])
-            station_num = match.group(groups['station_num'])
-            inverter_num = match.group(groups['inverter'])
-            mppt = match.group(groups['mppt'])
-            substring = match.group(groups['substring'])
-            
-            result = {
-                'station': format_config['station_format'](station, station_num),
-                'inverter': format_config['inverter_format'](inverter_num),
-                'mppt': mppt,
-                'substring': substring
-            }
-            logger.debug(f"Format 2 - Station: {station}, ST: {station_num}, Inverter: {inverter_num}, MPPT: {mppt}, String: {substring}")
-            
-        elif format_name == 'format_3':
-            # Format z separatorem: PREFIX;STACJA/FALOWNIK/MPPT/STRING
-            station = match.group(groups['station'])
-            inverter_num = match.group(groups['inverter'])
-            mppt = match.group(groups['mppt'])
-            substring = match.group(groups['substring'])
-            
-            result = {
-                'station': format_config['station_format'](station),
-                'inverter': format_config['inverter_format'](inverter_num),
-                'mppt': mppt,
-                'substring': substring
-            }
-            logger.debug(f"Format 3 - Station: {station}, Inverter: {inverter_num}, MPPT: {mppt}, String: {substring}")
-            
-        elif format_name == 'format_4':
-            # Format INV01-02: INVERTER-MPPT (zawsze string 0)
-            inverter_num = match.group(groups['inverter'])
-            mppt_num = match.group(groups['mppt'])
-            
-            result = {
-                'station': station_id,  # Używaj przekazanego station_id
-                'inverter': format_config['inverter_format'](inverter_num),
-                'mppt': format_config['mppt_format'](mppt_num),
-                'substring': format_config['substring_format']()
-            }
-            logger.debug(f"Format 4 - Inverter: {inverter_num}, MPPT: {mppt_num}, String: 00 (auto), Station: {station_id}")
-            
-        elif format_name == 'format_5':
-            # Format: STACJA/F<INVERTER>/STR<MPPT> (zawsze string 0)
-            station = match.group(groups['station'])
-            inverter_num = match.group(groups['inverter'])
-            str_mppt = match.group(groups['mppt'])  # STR19
-            
-            result = {
-                'station': format_config['station_format'](station),
-                'inverter': format_config['inverter_format'](inverter_num),
-                'mppt': format_config['mppt_format'](str_mppt),  # STR19 -> MPPT19
-                'substring': format_config['substring_format']()  # S00
-            }
-            logger.debug(f"Format 5 - Station: {station}, Inverter: {inverter_num}, STR-MPPT: {str_mppt}, String: 00 (auto)")
+        # Dopasuj prekompilowany wzorzec
+        match = pattern.match(cleaned_text)
+        if not match:
+            return None
         
-        logger.debug(f"Sparsowane dane ({format_name}): {result}")
-        return result
+        return build_parsed_fields(format_name, match, station_id)
         
     except Exception as e:
         logger.debug(f"Błąd parsowania formatu {format_name}: {e}")
         return None
 
-def get_svg_id(parsed: Dict) -> str:
+def get_svg_id(parsed: Dict, cfg: 'ConfigSnapshot' = None) -> str:
     """Generuje SVG ID z sparsowanych danych zgodnie z aktualnym formatem ID"""
     try:
         # Sprawdź czy używamy zaawansowanego formatowania
-        if globals().get('USE_ADVANCED_FORMATTING', False):
-            return get_advanced_formatted_id(parsed)
+        if _config_value(cfg, 'USE_ADVANCED_FORMATTING', False):
+            return get_advanced_formatted_id(parsed, cfg)
         
         # Pobierz aktualny format ID z konfiguracji (legacy system)
-        current_format = ID_FORMAT
+        current_format = _config_value(cfg, 'ID_FORMAT')
         
         # Wyciągnij numer MPPT
         mppt = parsed['mppt'].replace("MPPT", "").zfill(2)
@@ -381,7 +691,7 @@ def get_svg_id(parsed: Dict) -> str:
             return f"{mppt}-{sub.zfill(2)}/{inverter}"
         elif current_format == "05-06/07":
             # Format: 05-Station, 06-MPPT, 07-Inverter
-            station_num = STATION_NUMBER.zfill(2)
+            station_num = _config_value(cfg, 'STATION_NUMBER').zfill(2)
             return f"{station_num}-{mppt}/{inverter}"
         else:
             # Fallback do starego formatu
@@ -392,19 +702,35 @@ def get_svg_id(parsed: Dict) -> str:
         return "unknown"
 
 
-def get_advanced_formatted_id(parsed: Dict) -> str:
+def get_structural_ids(text: str, station_id: str = None, cfg: 'ConfigSnapshot' = None) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Strukturalne ID stringa i ID falownika (część po "/") jak w grupowaniu strukturalnego SVG.
+    Zwraca None, gdy tekstu nie da się sparsować; ID falownika None, gdy strukturalne ID nie ma "/".
+    """
+    parsed_text = parse_text_to_dict(text, station_id, cfg)
+    if not parsed_text:
+        return None
+    # Jeśli używamy zaawansowanego formatowania, przekaż oryginalny tekst
+    if _config_value(cfg, 'USE_ADVANCED_FORMATTING', False):
+        parsed_text['original_text'] = text
+    structural_id = get_svg_id(parsed_text, cfg)
+    structural_inv_id = structural_id.split("/")[1] if "/" in structural_id else None
+    return structural_id, structural_inv_id
+
+
+def get_advanced_formatted_id(parsed: Dict, cfg: 'ConfigSnapshot' = None) -> str:
     """Generuje SVG ID używając zaawansowanego formatowania"""
     try:
-        from src.core.advanced_formatter import AdvancedFormatter
+        from src.core.advanced_formatter import compile_advanced_format
         
         # Pobierz konfigurację zaawansowanego formatowania
-        input_format = globals().get('ADVANCED_INPUT_FORMAT', '')
-        output_format = globals().get('ADVANCED_OUTPUT_FORMAT', '')
-        additional_vars = globals().get('ADVANCED_ADDITIONAL_VARS', {})
+        input_format = _config_value(cfg, 'ADVANCED_INPUT_FORMAT', '')
+        output_format = _config_value(cfg, 'ADVANCED_OUTPUT_FORMAT', '')
+        additional_vars = _config_value(cfg, 'ADVANCED_ADDITIONAL_VARS', {})
         
         if not input_format or not output_format:
             logger.warning("Brak skonfigurowanego zaawansowanego formatowania, używam legacy")
-            return get_legacy_formatted_id(parsed)
+            return get_legacy_formatted_id(parsed, cfg)
         
         # NOWE: Użyj zaawansowanego formatera do parsowania input
         # Jeśli parsed zawiera klucz 'original_text', użyj go do re-parsowania
@@ -430,30 +756,23 @@ def get_advanced_formatted_id(parsed: Dict) -> str:
         
         if not original_text:
             logger.warning(f"Nie można ustalić original_text z parsed: {parsed}")
-            return get_legacy_formatted_id(parsed)
+            return get_legacy_formatted_id(parsed, cfg)
         
         logger.debug(f"DEBUG: original_text = {original_text}")
         logger.debug(f"DEBUG: input_format = {input_format}")
         
-        # Użyj zaawansowanego formatera do parsowania
-        formatter = AdvancedFormatter()
-        variables = formatter.parse_input_format(original_text, input_format)
+        # Użyj skompilowanego programu zaawansowanego formatowania
+        program = compile_advanced_format(input_format, output_format, additional_vars)
+        variables = program.parse(original_text)
         
         if not variables:
             logger.warning(f"Zaawansowany formatter nie może sparsować '{original_text}' z formatem '{input_format}'")
-            return get_legacy_formatted_id(parsed)
+            return get_legacy_formatted_id(parsed, cfg)
         
         logger.debug(f"DEBUG: formatter variables = {variables}")
         
-        # Ustaw zmienne w formaterze
-        formatter.variables = variables
-        
-        # Ustaw dodatkowe zmienne
-        for var_name, expression in additional_vars.items():
-            formatter.set_additional_variable(var_name, expression)
-        
-        # Wygeneruj output
-        result = formatter.format_output(output_format)
+        # Oblicz dodatkowe zmienne i wygeneruj output
+        result = program.format_output(program.evaluate(variables))
         logger.debug(f"DEBUG: final result = {result}")
         
         return result
@@ -462,13 +781,13 @@ def get_advanced_formatted_id(parsed: Dict) -> str:
         logger.error(f"Błąd zaawansowanego formatowania: {e}")
         import traceback
         traceback.print_exc()
-        return get_legacy_formatted_id(parsed)
+        return get_legacy_formatted_id(parsed, cfg)
 
 
-def get_legacy_formatted_id(parsed: Dict) -> str:
+def get_legacy_formatted_id(parsed: Dict, cfg: 'ConfigSnapshot' = None) -> str:
     """Generuje SVG ID używając starego systemu (fallback)"""
     try:
-        current_format = ID_FORMAT
+        current_format = _config_value(cfg, 'ID_FORMAT')
         
         # Wyciągnij numer MPPT
         mppt = parsed['mppt'].replace("MPPT", "").zfill(2)
@@ -482,7 +801,7 @@ def get_legacy_formatted_id(parsed: Dict) -> str:
         if current_format == "01-02/03":
             return f"{mppt}-{sub.zfill(2)}/{inverter}"
         elif current_format == "05-06/07":
-            station_num = STATION_NUMBER.zfill(2)
+            station_num = _config_value(cfg, 'STATION_NUMBER').zfill(2)
             return f"{station_num}-{mppt}/{inverter}"
         else:
             return f"{mppt}-{sub}/{inverter}"
@@ -4,29 +4,62 @@ Bazowana na działającym systemie ZIEA, rozbudowana modularnie
 """
 
 import ezdxf
+from ezdxf.addons import iterdxf
 import svgwrite
 from collections import defaultdict
-from scipy.spatial import KDTree
+import numpy as np
 from typing import List, Dict, Tuple, Any
 import math
+import bisect
+import heapq
+import itertools
 import sys
 import os
+import time
 
 # Importy modułów własnych
 from src.utils.console_logger import console, logger
 from src.core.config import *
-from src.core.geometry_utils import calculate_distance, find_texts_by_location
+from src.core.geometry_utils import calculate_distance, TextSpatialIndex
+from src.core.extraction_cache import ExtractionCache, resolve_cache_dir
+from src.core.segment_table import SegmentTable
 from src.svg.svg_generator import generate_svg, generate_interactive_svg, generate_structured_svg
+from src.svg.scene import Scene
 from src.interactive.interactive_editor import interactive_assignment_menu
 
-def extract_texts_from_dxf(doc, layer_text) -> List[Dict[str, Any]]:
-    """Ekstraktuje teksty z pliku DXF z odpowiedniej warstwy"""
+def read_dxf_entities_streaming(input_file: str, layer_text: str, layer_line: str) -> Tuple[List, List]:
+    """
+    Strumieniowy odczyt DXF jednym przebiegiem (ezdxf.addons.iterdxf) bez ładowania
+    całego dokumentu - materializuje tylko MTEXT z warstwy tekstów i LWPOLYLINE
+    z warstwy linii, więc pamięć zależy od wyniku, a nie od rozmiaru pliku.
+    
+    Returns: (encje MTEXT, encje LWPOLYLINE)
+    """
+    text_entities = []
+    lwpolylines = []
+    
+    with open(input_file, 'rb') as stream:
+        for entity in iterdxf.single_pass_modelspace(stream, types=['MTEXT', 'LWPOLYLINE']):
+            layer = entity.dxf.layer
+            if layer == layer_text and entity.dxftype() == 'MTEXT':
+                text_entities.append(entity)
+            elif layer == layer_line and entity.dxftype() == 'LWPOLYLINE':
+                lwpolylines.append(entity)
+    
+    logger.info(f"Odczyt strumieniowy: {len(text_entities)} MTEXT, {len(lwpolylines)} LWPOLYLINE z pliku {input_file}")
+    return text_entities, lwpolylines
+
+def extract_texts_from_dxf(doc, layer_text, text_entities=None) -> List[Dict[str, Any]]:
+    """
+    Ekstraktuje teksty z pliku DXF z odpowiedniej warstwy
+    text_entities - encje MTEXT z odczytu strumieniowego (wtedy doc nie jest używany)
+    """
     console.processing("Ekstraktacja tekstów z DXF")
     texts = []
-    mspace = doc.modelspace()
     
     # Używaj MTEXT z odpowiedniej warstwy (jak w starym kodzie)
-    text_entities = list(mspace.query(f'MTEXT[layer=="{layer_text}"]'))
+    if text_entities is None:
+        text_entities = list(doc.modelspace().query(f'MTEXT[layer=="{layer_text}"]'))
     console.info(f"Tekstów na warstwie {layer_text}", len(text_entities))
     logger.info(f"Znaleziono {len(text_entities)} tekstów na warstwie {layer_text}")
     
@@ -36,6 +69,7 @@ def extract_texts_from_dxf(doc, layer_text) -> List[Dict[str, Any]]:
             if text_content:
                 position = (mtext.dxf.insert.x, mtext.dxf.insert.y)
                 texts.append({
+                    'idx': len(texts),  # Stały indeks tekstu nadawany przy ekstrakcji
                     'id': text_content,
                     'pos': position,
                     'raw_text': mtext.plain_text()
@@ -45,6 +79,103 @@ def extract_texts_from_dxf(doc, layer_text) -> List[Dict[str, Any]]:
     
     return texts
 
+def _merge_polyline_segments(segments: List, gap_tolerance: float, max_merge_distance: float) -> List[Dict]:
+    """
+    Łączy segmenty jednej polilinii metodą zamiatania (sweep-line) w kolejności X.
+    Wynik (kolejność, współrzędne, długości i merged_from) jest taki sam jak przy zachłannym
+    porównywaniu każdego segmentu z wszystkimi kolejnymi:
+    - segment początkowy (seed) rozszerzany jest kolejno o segmenty o podobnym Y
+      (|dY| <= gap_tolerance), których przerwa X mieści się w [-max_merge_distance, max_merge_distance],
+    - kandydaci brani są tylko z kubełków Y sąsiadujących z Y segmentu początkowego,
+    - przegląd kończy się, gdy lewy koniec kandydata jest dalej niż max_merge_distance od prawego końca.
+    """
+    n = len(segments)
+    left = [min(s['start'][0], s['end'][0]) for s in segments]
+    right = [max(s['start'][0], s['end'][0]) for s in segments]
+    mid_y = [(s['start'][1] + s['end'][1]) / 2 for s in segments]
+    
+    # Kolejność wg lewego końca X (sortowanie stabilne)
+    order = sorted(range(n), key=left.__getitem__)
+    # Przerwanie przeglądu wymaga rosnących lewych końców (NaN psuje uporządkowanie)
+    can_stop_early = all(x == x for x in left)
+    
+    # Kubełki Y: rangi (pozycje w kolejności X) segmentów w każdym kubełku, rosnąco
+    def y_bucket(y):
+        if not math.isfinite(y):
+            return None  # Segmenty z nieskończonym/NaN Y nigdy nie są łączone
+        if gap_tolerance > 0:
+            return math.floor(y / gap_tolerance)
+        return y
+    
+    bucket_of = [None] * n
+    buckets = defaultdict(list)
+    for rank, k in enumerate(order):
+        bucket = y_bucket(mid_y[k])
+        bucket_of[rank] = bucket
+        if bucket is not None:
+            buckets[bucket].append(rank)
+    
+    merged = [False] * n  # wg rangi
+    merged_segments = []
+    
+    for rank, k in enumerate(order):
+        if merged[rank]:
+            continue
+        
+        seed = segments[k]
+        current_segment = seed.copy()
+        current_segment['merged_from'] = [seed['id']]
+        current_y = mid_y[k]
+        current_left = left[k]
+        current_right = right[k]
+        current_length = seed['length']
+        merged_any = False
+        
+        bucket = bucket_of[rank]
+        if bucket is not None and gap_tolerance >= 0:
+            # Sąsiednie kubełki (z zapasem na błędy zaokrągleń dzielenia)
+            if gap_tolerance > 0:
+                neighbour_buckets = [bucket + d for d in (-2, -1, 0, 1, 2)]
+            else:
+                neighbour_buckets = [bucket]
+            
+            # Kandydaci z sąsiednich kubełków w kolejności X (po randze), za segmentem początkowym
+            candidate_lists = []
+            for b in neighbour_buckets:
+                ranks = buckets.get(b)
+                if ranks:
+                    pos = bisect.bisect_right(ranks, rank)
+                    candidate_lists.append(itertools.islice(ranks, pos, None))
+            
+            for cand_rank in heapq.merge(*candidate_lists):
+                if merged[cand_rank]:
+                    continue
+                c = order[cand_rank]
+                next_left = left[c]
+                x_gap = next_left - current_right
+                
+                if can_stop_early and x_gap > max_merge_distance:
+                    break
+                
+                if abs(current_y - mid_y[c]) <= gap_tolerance:
+                    if x_gap <= max_merge_distance and x_gap >= -max_merge_distance:
+                        # Połącz segmenty - rozszerz current_segment
+                        current_left = min(current_left, next_left)
+                        current_right = max(current_right, right[c])
+                        current_length += segments[c]['length'] + abs(x_gap)
+                        current_segment['merged_from'].append(segments[c]['id'])
+                        merged[cand_rank] = True
+                        merged_any = True
+        
+        if merged_any:
+            current_segment['start'] = (current_left, current_segment['start'][1])
+            current_segment['end'] = (current_right, current_segment['end'][1])
+            current_segment['length'] = current_length
+        
+        merged_segments.append(current_segment)
+    
+    return merged_segments
+
 def merge_segments_in_polylines(polylines: List[Dict], gap_tolerance: float = 1.0, max_merge_distance: float = 5.0) -> List[Dict]:
     """
     Łączy sąsiadujące poziome segmenty w każdej polilinii osobno w logiczne stringi.
@@ -66,66 +197,7 @@ def merge_segments_in_polylines(polylines: List[Dict], gap_tolerance: float = 1.
             continue
             
         # WAŻNE: Łącz segmenty tylko w ramach tej samej polilinii!
-        # Sortuj segmenty wg współrzędnej X (od lewej do prawej)
-        sorted_segments = sorted(segments, key=lambda s: min(s['start'][0], s['end'][0]))
-        
-        merged_segments = []
-        
-        # Iteracyjnie łącz segmenty - rozpocznij od pierwszego
-        i = 0
-        while i < len(sorted_segments):
-            current_segment = sorted_segments[i].copy()
-            current_segment['merged_from'] = [current_segment['id']]
-            
-            # Sprawdź czy możemy połączyć z kolejnymi segmentami
-            j = i + 1
-            while j < len(sorted_segments):
-                next_segment = sorted_segments[j]
-                
-                # Sprawdź czy segmenty mogą być połączone
-                can_merge = False
-                
-                # Sprawdź czy segmenty są w podobnej wysokości (Y)
-                current_y = (current_segment['start'][1] + current_segment['end'][1]) / 2
-                next_y = (next_segment['start'][1] + next_segment['end'][1]) / 2
-                y_diff = abs(current_y - next_y)
-                
-                if y_diff <= gap_tolerance:
-                    # Sprawdź odległość X między końcem current a początkiem next
-                    current_right = max(current_segment['start'][0], current_segment['end'][0])
-                    next_left = min(next_segment['start'][0], next_segment['end'][0])
-                    x_gap = next_left - current_right
-                    
-                    # Sprawdź też odwrotnie - może next jest przed current
-                    next_right = max(next_segment['start'][0], next_segment['end'][0])
-                    current_left = min(current_segment['start'][0], current_segment['end'][0])
-                    x_gap_reverse = current_left - next_right
-                    
-                    if x_gap <= max_merge_distance and x_gap >= -max_merge_distance:
-                        can_merge = True
-                
-                if can_merge:
-                    # Połącz segmenty - rozszerz current_segment
-                    new_left = min(current_segment['start'][0], current_segment['end'][0], 
-                                 next_segment['start'][0], next_segment['end'][0])
-                    new_right = max(current_segment['start'][0], current_segment['end'][0],
-                                  next_segment['start'][0], next_segment['end'][0])
-                    
-                    # Aktualizuj current_segment jako nowy połączony segment
-                    current_segment['start'] = (new_left, current_segment['start'][1])
-                    current_segment['end'] = (new_right, current_segment['end'][1])
-                    current_segment['length'] += next_segment['length'] + abs(x_gap)
-                    current_segment['merged_from'].append(next_segment['id'])
-                    
-                    # Usuń połączony segment z listy
-                    sorted_segments.pop(j)
-                    # Nie zwiększaj j, bo kolejny segment przesunął się w dół
-                else:
-                    j += 1
-            
-            # Dodaj aktualny segment (może połączony) do wyników
-            merged_segments.append(current_segment)
-            i += 1
+        merged_segments = _merge_polyline_segments(segments, gap_tolerance, max_merge_distance)
         
         # Stwórz nową polilinię z połączonymi segmentami
         merged_polyline = polyline.copy()
@@ -141,96 +213,132 @@ def merge_segments_in_polylines(polylines: List[Dict], gap_tolerance: float = 1.
         if merged_count != original_count:
             logger.debug(f"Polilinia {polyline['id']}: {original_count} → {merged_count} segmentów po łączeniu")
     
+    # Zamień połączone słowniki na wspólną tabelę segmentów (z pochodzeniem merged_from)
+    merged_records = [s for p in merged_polylines for s in p['segments']]
+    if merged_records:
+        segment_table = SegmentTable.from_records(merged_records)
+        row_start = 0
+        for merged_polyline in merged_polylines:
+            row_stop = row_start + len(merged_polyline['segments'])
+            merged_polyline['segments'] = segment_table.rows(row_start, row_stop)
+            row_start = row_stop
+    
     return merged_polylines
 
+def _polyline_points(lwpolyline) -> np.ndarray:
+    """Wierzchołki LWPOLYLINE jako tablica (n, 2) - bez iterowania po punktach, jeśli to możliwe"""
+    lwpoints = getattr(lwpolyline, 'lwpoints', None)
+    values = getattr(lwpoints, 'values', None)
+    if isinstance(values, np.ndarray) and values.ndim == 2 and values.shape[1] >= 2:
+        return values[:, :2]
+    return np.array(list(lwpolyline.vertices()), dtype=np.float64).reshape(-1, 2)
+
 def extract_polylines_from_dxf(doc, layer_line, y_tolerance=0.01, segment_min_width=0, 
                               polyline_processing_mode="individual_segments",
                               segment_merge_gap_tolerance=1.0,
-                              max_merge_distance=5.0) -> List[Dict[str, Any]]:
-    """Ekstraktuje polilinie z pliku DXF z odpowiedniej warstwy i konwertuje je na segmenty"""
-    polylines = []
-    polyline_id = 1
-    global_segment_id = 1  # Globalny licznik ID segmentów
-    
-    # Statystyki diagnostyczne
-    total_segments_found = 0
-    rejected_not_horizontal = 0
-    rejected_too_short = 0
-    
-    mspace = doc.modelspace()
-    
+                              max_merge_distance=5.0,
+                              lwpolylines=None) -> List[Dict[str, Any]]:
+    """
+    Ekstraktuje polilinie z pliku DXF z odpowiedniej warstwy i konwertuje je na segmenty
+    lwpolylines - encje LWPOLYLINE z odczytu strumieniowego (wtedy doc nie jest używany)
+    Filtrowanie poziomych segmentów i długości liczone są wektorowo dla wszystkich polilinii naraz.
+    """
     # Pobierz polilinie z odpowiedniej warstwy
-    lwpolylines = list(mspace.query(f'LWPOLYLINE[layer=="{layer_line}"]'))
+    if lwpolylines is None:
+        lwpolylines = list(doc.modelspace().query(f'LWPOLYLINE[layer=="{layer_line}"]'))
     console.info(f"Polilinii na warstwie {layer_line}", len(lwpolylines))
     logger.info(f"Znaleziono {len(lwpolylines)} polilinii na warstwie {layer_line}")
     
+    # Zbierz wierzchołki wszystkich polilinii (co najmniej 2 punkty) w jedną tablicę
+    point_blocks = []
     for lwpolyline in lwpolylines:
         try:
-            # Pobierz punkty polilinii
-            points = list(lwpolyline.vertices())
-            if len(points) < 2:
-                continue
-                
-            # Znajdź poziome segmenty
-            polyline_segments = []
-            
-            for i in range(len(points) - 1):
-                start = points[i]
-                end = points[i + 1]
-                total_segments_found += 1
-                
-                y_diff = abs(start[1] - end[1])
-                x_diff = abs(start[0] - end[0])
-                
-                # Sprawdź czy segment jest poziomy (różnica Y mniejsza niż tolerancja)
-                if y_diff <= y_tolerance:
-                    # Upewnij się, że segment ma minimalną szerokość
-                    if x_diff >= segment_min_width:
-                        # Określ długość segmentu
-                        length = calculate_distance(start, end)
-                        
-                        polyline_segments.append({
-                            'id': global_segment_id,  # Użyj globalnego ID
-                            'start': (start[0], start[1]),
-                            'end': (end[0], end[1]),
-                            'length': length,
-                            'polyline_idx': polyline_id
-                        })
-                        global_segment_id += 1  # Zwiększ globalny licznik
-                    else:
-                        rejected_too_short += 1
-                        logger.debug(f"Odrzucono segment za krótki: x_diff={x_diff:.4f} < {segment_min_width}")
-                else:
-                    rejected_not_horizontal += 1
-                    if rejected_not_horizontal <= 10:  # Loguj tylko pierwsze 10
-                        logger.debug(f"Odrzucono segment nie-poziomy: y_diff={y_diff:.4f} > {y_tolerance}, x_diff={x_diff:.2f}")
-            
-            if polyline_segments:  # Tylko jeśli ma poziome segmenty
-                # Oblicz centrum polilini
-                all_x = [p[0] for p in points]
-                all_y = [p[1] for p in points]
-                center = (sum(all_x) / len(all_x), sum(all_y) / len(all_y))
-                
-                # Oblicz długość
-                total_length = 0
-                for seg in polyline_segments:
-                    length = calculate_distance(seg['start'], seg['end'])
-                    total_length += length
-                
-                polylines.append({
-                    'id': polyline_id,
-                    'segments': polyline_segments,
-                    'center': center,
-                    'polyline_idx': polyline_id - 1,  # Dla kompatybilności ze starym kodem
-                    'segment_count': len(polyline_segments),
-                    'total_length': total_length
-                })
-                
+            points = _polyline_points(lwpolyline)
         except Exception as e:
             logger.error(f"Błąd przetwarzania polilinii: {e}")
             continue
-            
-        polyline_id += 1
+        if len(points) >= 2:
+            point_blocks.append(points)
+    
+    # Numer polilinii (polyline_id) dla każdego bloku punktów - kolejne od 1
+    block_sizes = np.array([len(points) for points in point_blocks], dtype=np.int64)
+    point_offsets = np.concatenate(([0], np.cumsum(block_sizes)))
+    points = (np.concatenate(point_blocks).astype(np.float64, copy=False)
+              if point_blocks else np.empty((0, 2), dtype=np.float64))
+    
+    # Pary kolejnych wierzchołków w obrębie tej samej polilinii
+    pair_block = np.repeat(np.arange(len(point_blocks), dtype=np.int64), block_sizes - 1)
+    pair_start = (np.arange(len(points) - len(point_blocks), dtype=np.int64)
+                  + pair_block) if len(point_blocks) else np.empty(0, dtype=np.int64)
+    starts = points[pair_start]
+    ends = points[pair_start + 1]
+    
+    y_diff = np.abs(starts[:, 1] - ends[:, 1])
+    x_diff = np.abs(starts[:, 0] - ends[:, 0])
+    
+    # Segment poziomy (różnica Y w tolerancji) o minimalnej szerokości
+    horizontal = y_diff <= y_tolerance
+    wide_enough = x_diff >= segment_min_width
+    accepted = horizontal & wide_enough
+    
+    # Statystyki diagnostyczne
+    total_segments_found = len(pair_start)
+    not_horizontal_idx = np.flatnonzero(~horizontal)
+    too_short_idx = np.flatnonzero(horizontal & ~wide_enough)
+    rejected_not_horizontal = len(not_horizontal_idx)
+    rejected_too_short = len(too_short_idx)
+    
+    for k in not_horizontal_idx[:10]:  # Loguj tylko pierwsze 10
+        logger.debug(f"Odrzucono segment nie-poziomy: y_diff={y_diff[k]:.4f} > {y_tolerance}, x_diff={x_diff[k]:.2f}")
+    for k in too_short_idx[:10]:
+        logger.debug(f"Odrzucono segment za krótki: x_diff={x_diff[k]:.4f} < {segment_min_width}")
+    
+    # Zaakceptowane segmenty - kolumny tabeli segmentów z globalnymi ID (od 1)
+    accepted_idx = np.flatnonzero(accepted)
+    seg_start = starts[accepted_idx]
+    seg_end = ends[accepted_idx]
+    # float_power liczy potęgę tak jak calculate_distance (pow z libm), więc długości są identyczne
+    seg_length = np.sqrt(np.float_power(seg_start[:, 0] - seg_end[:, 0], 2) +
+                         np.float_power(seg_start[:, 1] - seg_end[:, 1], 2))
+    seg_block = pair_block[accepted_idx]
+    
+    segment_table = SegmentTable(
+        ids=np.arange(1, len(accepted_idx) + 1, dtype=np.int64),
+        x1=seg_start[:, 0], y1=seg_start[:, 1],
+        x2=seg_end[:, 0], y2=seg_end[:, 1],
+        length=seg_length,
+        polyline_idx=seg_block + 1
+    )
+    
+    # Polilinie z co najmniej jednym poziomym segmentem
+    seg_counts = np.bincount(seg_block, minlength=len(point_blocks))
+    seg_offsets = np.concatenate(([0], np.cumsum(seg_counts))).tolist()
+    lengths = seg_length.tolist()
+    
+    polylines = []
+    for block in np.flatnonzero(seg_counts).tolist():
+        polyline_id = block + 1
+        row_start, row_stop = seg_offsets[block], seg_offsets[block + 1]
+        
+        # Oblicz centrum polilini
+        block_points = points[point_offsets[block]:point_offsets[block + 1]]
+        all_x = block_points[:, 0].tolist()
+        all_y = block_points[:, 1].tolist()
+        center = (sum(all_x) / len(all_x), sum(all_y) / len(all_y))
+        
+        # Oblicz długość
+        total_length = 0
+        for length in lengths[row_start:row_stop]:
+            total_length += length
+        
+        polylines.append({
+            'id': polyline_id,
+            'segments': segment_table.rows(row_start, row_stop),
+            'center': center,
+            'polyline_idx': polyline_id - 1,  # Dla kompatybilności ze starym kodem
+            'segment_count': row_stop - row_start,
+            'total_length': total_length
+        })
     
     accepted_segments = sum(len(p['segments']) for p in polylines)
     console.success("Segmentów poziomych znalezionych", accepted_segments)
@@ -260,22 +368,52 @@ def extract_polylines_from_dxf(doc, layer_line, y_tolerance=0.01, segment_min_wi
     
     return polylines
 
-def find_closest_texts_to_polylines(texts: List[Dict], polylines: List[Dict], station_id: str, search_radius: float = 6.0, text_location: str = "above", use_advanced_formatting: bool = False) -> List[Dict]:
-    """Znajdź najbliższe teksty do każdej polilinii - automatyczne przypisywanie z uwzględnieniem TEXT_LOCATION"""
-    console.processing("Rozpoczęcie automatycznego przypisywania na podstawie odległości")
-    logger.info("Rozpoczęcie algorytmu automatycznego przypisywania tekstów do polilinii")
-    
+def select_best_assignments(polyline_candidates: Dict[int, List[Dict]], text_location: str) -> List[Dict]:
+    """
+    Dla każdej polilinii wybierz najbliższy jeszcze nieużyty tekst.
+    polyline_candidates - kandydaci (text, text_idx, polyline, segment, distance) pogrupowani wg poly_idx
+    """
     assignments = []
     used_texts = set()
     used_polylines = set()
     
+    # Dla każdej polilinii wybierz najlepszy tekst
+    for poly_idx, candidates in polyline_candidates.items():
+        # Sortuj według odległości
+        candidates.sort(key=lambda x: x['distance'])
+        
+        # Znajdź pierwszy dostępny tekst
+        for candidate in candidates:
+            text_idx = candidate['text_idx']
+            
+            if text_idx not in used_texts and poly_idx not in used_polylines:
+                assignments.append({
+                    'text': candidate['text'],
+                    'polyline': candidate['polyline'],
+                    'distance': candidate['distance']
+                })
+                used_texts.add(text_idx)
+                used_polylines.add(poly_idx)
+                
+                logger.info(f"PRZYPISANO: Tekst '{candidate['text']['id']}' -> "
+                           f"String z polilinii {candidate['polyline']['polyline_idx']} "
+                           f"(odległość: {candidate['distance']:.2f}, położenie: {text_location})")
+                break
+    
+    return assignments
+
+def find_closest_texts_to_polylines(texts: List[Dict], polylines: List[Dict], station_id: str, search_radius: float = 6.0, text_location: str = "above", use_advanced_formatting: bool = False, cfg: ConfigSnapshot = None) -> List[Dict]:
+    """Znajdź najbliższe teksty do każdej polilinii - automatyczne przypisywanie z uwzględnieniem TEXT_LOCATION"""
+    console.processing("Rozpoczęcie automatycznego przypisywania na podstawie odległości")
+    logger.info("Rozpoczęcie algorytmu automatycznego przypisywania tekstów do polilinii")
+    
     # Przefiltruj teksty dla docelowej stacji
     if use_advanced_formatting:
         # W zaawansowanym formatowaniu filtrujemy po zmiennej 'name' z variables
         if station_id:
             station_texts = []
             for t in texts:
-                parsed = parse_text_to_dict(t['id'], station_id)
+                parsed = parse_text_to_dict(t['id'], station_id, cfg)
                 if parsed and parsed.get('variables', {}).get('name') == station_id:
                     station_texts.append(t)
             console.info(f"Tekstów dla stacji {station_id} (zaawansowane formatowanie)", len(station_texts))
@@ -285,7 +423,11 @@ def find_closest_texts_to_polylines(texts: List[Dict], polylines: List[Dict], st
             console.info(f"Wszystkich tekstów (zaawansowane formatowanie, brak filtra)", len(station_texts))
     else:
         # W formatowaniu legacy filtrujemy po station_id
-        station_texts = [t for t in texts if parse_text_to_dict(t['id'], station_id) and parse_text_to_dict(t['id'], station_id).get('station') == station_id]
+        station_texts = []
+        for t in texts:
+            parsed = parse_text_to_dict(t['id'], station_id, cfg)
+            if parsed and parsed.get('station') == station_id:
+                station_texts.append(t)
         console.info(f"Tekstów dla stacji {station_id}", len(station_texts))
     logger.info(f"Używany parametr TEXT_LOCATION: {text_location}")
     logger.info(f"Używany parametr SEARCH_RADIUS: {search_radius}")
@@ -300,20 +442,20 @@ def find_closest_texts_to_polylines(texts: List[Dict], polylines: List[Dict], st
     
     processed = 0
     
+    # Indeks przestrzenny tekstów - zapytania promieniowe zamiast skanowania wszystkich tekstów
+    text_index = TextSpatialIndex(station_texts)
+    
     for poly_idx, polyline in enumerate(polylines):
         for segment in polyline['segments']:
-            # Użyj find_texts_by_location z parametrem TEXT_LOCATION
-            nearby_texts = find_texts_by_location(segment, station_texts, search_radius, text_location)
+            # Zapytanie promieniowe z parametrem TEXT_LOCATION
+            nearby_texts = text_index.query_indices(segment, search_radius, text_location)
             
-            for text in nearby_texts:
-                text_idx = station_texts.index(text)
-                seg_center = ((segment['start'][0] + segment['end'][0]) / 2, 
-                             (segment['start'][1] + segment['end'][1]) / 2)
-                distance = calculate_distance(text['pos'], seg_center)
+            for position, distance in nearby_texts:
+                text = station_texts[position]
                 
                 distance_matrix.append({
                     'text': text,
-                    'text_idx': text_idx,
+                    'text_idx': text.get('idx', position),  # Stały indeks z ekstrakcji
                     'polyline': polyline,
                     'poly_idx': poly_idx,
                     'segment': segment,
@@ -326,7 +468,7 @@ def find_closest_texts_to_polylines(texts: List[Dict], polylines: List[Dict], st
                 progress = min(processed, total_combinations)
                 console.processing("Obliczanie odległości", progress, total_combinations)
     
-    logger.info(f"Obliczono {len(distance_matrix)} kombinacji odległości (z uwzględnieniem TEXT_LOCATION={TEXT_LOCATION})")
+    logger.info(f"Obliczono {len(distance_matrix)} kombinacji odległości (z uwzględnieniem TEXT_LOCATION={text_location})")
     
     # Grupuj według polilinii - przypisz najlepszy tekst do każdej polilinii
     console.processing("Grupowanie i wybór najlepszych przypisań")
@@ -335,62 +477,47 @@ def find_closest_texts_to_polylines(texts: List[Dict], polylines: List[Dict], st
     for entry in distance_matrix:
         polyline_candidates[entry['poly_idx']].append(entry)
     
-    # Dla każdej polilinii wybierz najlepszy tekst
-    for poly_idx, candidates in polyline_candidates.items():
-        # Sortuj według odległości
-        candidates.sort(key=lambda x: x['distance'])
-        
-        # Znajdź pierwszy dostępny tekst
-        for candidate in candidates:
-            text_idx = candidate['text_idx']
-            
-            if text_idx not in used_texts and poly_idx not in used_polylines:
-                assignments.append({
-                    'text': candidate['text'],
-                    'polyline': candidate['polyline'],
-                    'distance': candidate['distance']
-                })
-                used_texts.add(text_idx)
-                used_polylines.add(poly_idx)
-                
-                logger.info(f"PRZYPISANO: Tekst '{candidate['text']['id']}' -> "
-                           f"String z polilinii {candidate['polyline']['polyline_idx']} "
-                           f"(odległość: {candidate['distance']:.2f}, położenie: {text_location})")
-                break
+    assignments = select_best_assignments(polyline_candidates, text_location)
     
     console.processing("Przypisywanie", len(assignments), min(len(station_texts), len(polylines)))
     console.success("Automatyczne przypisywanie zakończone", len(assignments))
     return assignments
 
-def process_dxf(input_file: str, config_params: Dict = None) -> Tuple[Dict, List, List, List, List]:
-    """Główna funkcja przetwarzania pliku DXF"""
-    console.processing("Ładowanie pliku DXF")
+def extract_dxf(input_file: str, config_params: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """Odczyt pliku DXF i ekstrakcja tekstów oraz polilinii - zwraca (teksty, polilinie)"""
+    doc = None
+    text_entities = None
+    lwpolylines = None
+    read_mode = config_params.get('DXF_READ_MODE', 'full')
     
-    # Ustaw domyślne parametry jeśli nie przekazano konfiguracji
-    if config_params is None:
-        from src.core.config import LAYER_TEXT, LAYER_LINE, STATION_ID, Y_TOLERANCE, SEGMENT_MIN_WIDTH, SEARCH_RADIUS, TEXT_LOCATION
-        config_params = {
-            'LAYER_TEXT': LAYER_TEXT,
-            'LAYER_LINE': LAYER_LINE,
-            'STATION_ID': STATION_ID,
-            'Y_TOLERANCE': Y_TOLERANCE,
-            'SEGMENT_MIN_WIDTH': SEGMENT_MIN_WIDTH,
-            'SEARCH_RADIUS': SEARCH_RADIUS,
-            'TEXT_LOCATION': TEXT_LOCATION
-        }
+    if read_mode == "streaming":
+        # Odczyt strumieniowy - tylko potrzebne encje z dwóch warstw, jeden przebieg
+        try:
+            text_entities, lwpolylines = read_dxf_entities_streaming(input_file,
+                                                                     config_params['LAYER_TEXT'],
+                                                                     config_params['LAYER_LINE'])
+            console.success("Plik DXF odczytany strumieniowo")
+        except (FileNotFoundError, PermissionError):
+            raise
+        except Exception as e:
+            # Np. binarny DXF - wróć do pełnego ładowania dokumentu
+            console.warning(f"Odczyt strumieniowy nieudany ({e}) - ładowanie pełnego dokumentu")
+            logger.warning(f"Odczyt strumieniowy pliku {input_file} nieudany: {e}")
+            text_entities, lwpolylines = None, None
     
-    try:
-        doc = ezdxf.readfile(input_file)
-        console.success("Plik DXF załadowany")
-        logger.info(f"Pomyślnie załadowano plik DXF: {input_file}")
-    except Exception as e:
-        console.error(f"Błąd ładowania pliku DXF: {e}")
-        logger.error(f"Błąd ładowania pliku DXF {input_file}: {e}")
-        raise
+    if text_entities is None:
+        try:
+            doc = ezdxf.readfile(input_file)
+            console.success("Plik DXF załadowany")
+            logger.info(f"Pomyślnie załadowano plik DXF: {input_file}")
+        except Exception as e:
+            console.error(f"Błąd ładowania pliku DXF: {e}")
+            logger.error(f"Błąd ładowania pliku DXF {input_file}: {e}")
+            raise
     
     # Ekstraktuj teksty i polilinie z parametrami z konfiguracji
     console.step("Ekstraktacja tekstów", "📝")
-    all_texts = extract_texts_from_dxf(doc, config_params['LAYER_TEXT'])
+    all_texts = extract_texts_from_dxf(doc, config_params['LAYER_TEXT'], text_entities)
     console.result("Wszystkich tekstów znaleziono", len(all_texts))
     
     console.step("Ekstraktacja polilinii", "📏")
@@ -399,41 +526,75 @@ def process_dxf(input_file: str, config_params: Dict = None) -> Tuple[Dict, List
                                           config_params['SEGMENT_MIN_WIDTH'],
                                           config_params.get('POLYLINE_PROCESSING_MODE', 'individual_segments'),
                                           config_params.get('SEGMENT_MERGE_GAP_TOLERANCE', 1.0),
-                                          config_params.get('MAX_MERGE_DISTANCE', 5.0))
+                                          config_params.get('MAX_MERGE_DISTANCE', 5.0),
+                                          lwpolylines)
+    return all_texts, polylines
+
+def default_config_params(cfg: ConfigSnapshot = None) -> Dict:
+    """Parametry przetwarzania z migawki konfiguracji (domyślnie - z bieżących wartości modułu config)"""
+    if cfg is None:
+        cfg = snapshot_config()
+    return cfg.dxf_params()
+
+def load_dxf_extraction(input_file: str, config_params: Dict) -> Tuple[List[Dict], List[Dict]]:
+    """Ekstrakcja tekstów i polilinii - z cache (jeśli włączony) lub z pliku DXF"""
+    cache = None
+    cache_key = None
+    cached = None
+    if config_params.get('EXTRACTION_CACHE_ENABLED', False):
+        try:
+            cache = ExtractionCache(resolve_cache_dir(config_params.get('EXTRACTION_CACHE_DIR', ''), input_file),
+                                    config_params.get('EXTRACTION_CACHE_MAX_MB', 512))
+            cache_key = cache.make_key(input_file, config_params)
+            cached = cache.load(cache_key)
+        except (FileNotFoundError, PermissionError):
+            raise
+        except Exception as e:
+            logger.warning(f"Cache ekstrakcji niedostępny: {e}")
+            cache = None
+    
+    if cached is not None:
+        all_texts, polylines = cached
+        console.success("Ekstrakcja wczytana z cache (bez parsowania DXF)")
+        console.result("Wszystkich tekstów znaleziono", len(all_texts))
+    else:
+        all_texts, polylines = extract_dxf(input_file, config_params)
+        if cache is not None:
+            cache.store(cache_key, all_texts, polylines)
+    
     console.result("Segmentów znaleziono", sum(len(p['segments']) for p in polylines))
     console.result("Polilinii (stringów) znaleziono", len(polylines))
-    
-    # Parsuj teksty dla docelowej stacji
+    return all_texts, polylines
+
+def select_station_texts(all_texts: List[Dict], station_id: str, use_advanced_formatting: bool = False,
+                         copy_texts: bool = False, cfg: ConfigSnapshot = None) -> List[Dict]:
+    """
+    Teksty danej stacji uzupełnione o sparsowane pola.
+    copy_texts=False - sparsowane dane dopisywane są do tekstów z all_texts (jak dotychczas),
+    copy_texts=True - zwracane są kopie (teksty współdzielone przez kilka stacji pozostają bez zmian).
+    """
     station_texts = []
     
-    # Pobierz flagę zaawansowanego formatowania z parametrów lub użyj globalnej
-    use_advanced_formatting = config_params.get('USE_ADVANCED_FORMATTING', False)
-    
     for text in all_texts:
-        parsed = parse_text_to_dict(text['id'], config_params['STATION_ID'])
+        parsed = parse_text_to_dict(text['id'], station_id, cfg)
         if parsed:
-            # W zaawansowanym formatowaniu filtrujemy po zmiennej 'name'
+            # W zaawansowanym formatowaniu filtrujemy po zmiennej 'name', w legacy po station
             if use_advanced_formatting:
-                # Filtruj po 'name' ze zmiennych zaawansowanego formatowania
-                if parsed.get('variables', {}).get('name') == config_params['STATION_ID']:
-                    text.update(parsed)  # Dodaj sparsowane dane do tekstu
-                    station_texts.append(text)
+                matches = parsed.get('variables', {}).get('name') == station_id
             else:
-                # W legacy formatowaniu filtrujemy po station
-                if parsed.get('station') == config_params['STATION_ID']:
-                    text.update(parsed)  # Dodaj sparsowane dane do tekstu
-                    station_texts.append(text)
-    
-    console.result(f"Tekstów dla stacji {config_params['STATION_ID']} znaleziono", len(station_texts))
-    
-    # Automatyczne przypisywanie z parametrami z konfiguracji
-    console.step("Faza 1: Automatyczne przypisywanie na podstawie odległości", "🤖")
-    assignments = find_closest_texts_to_polylines(all_texts, polylines, 
-                                                 config_params['STATION_ID'],
-                                                 config_params['SEARCH_RADIUS'], 
-                                                 config_params['TEXT_LOCATION'],
-                                                 use_advanced_formatting)
+                matches = parsed.get('station') == station_id
+            
+            if matches:
+                if copy_texts:
+                    text = dict(text)
+                text.update(parsed)  # Dodaj sparsowane dane do tekstu
+                station_texts.append(text)
     
+    return station_texts
+
+def build_station_result(station_texts: List[Dict], polylines: List[Dict], assignments: List[Dict],
+                         station_id: str, cfg: ConfigSnapshot = None) -> Tuple[Dict, List, List, List, List]:
+    """Struktura invertera i nieprzypisane elementy dla przypisań jednej stacji"""
     # Buduj strukturę danych invertera
     inverter_data = defaultdict(lambda: defaultdict(list))
     assigned_text_ids = set()
@@ -444,7 +605,7 @@ def process_dxf(input_file: str, config_params: Dict = None) -> Tuple[Dict, List
         polyline = assignment['polyline']
         
         # Dodaj segmenty do odpowiedniego invertera
-        parsed_text = parse_text_to_dict(text['id'], config_params['STATION_ID'])
+        parsed_text = parse_text_to_dict(text['id'], station_id, cfg)
         if parsed_text:
             inverter_id = parsed_text.get('inverter', 'UNKNOWN')
             inverter_data[inverter_id][text['id']].extend(polyline['segments'])
@@ -467,6 +628,284 @@ def process_dxf(input_file: str, config_params: Dict = None) -> Tuple[Dict, List
     
     return dict(inverter_data), station_texts, unassigned_texts, unassigned_segments, unassigned_polylines
 
+def process_dxf(input_file: str, config_params: Dict = None, timings: Dict = None,
+                cfg: ConfigSnapshot = None) -> Tuple[Dict, List, List, List, List]:
+    """
+    Główna funkcja przetwarzania pliku DXF
+    timings - opcjonalny słownik, do którego dopisywane są czasy etapów w sekundach
+    cfg - migawka konfiguracji używana do parsowania tekstów (None - bieżące wartości modułu config);
+          bez config_params parametry przetwarzania również pochodzą z migawki
+    """
+    console.processing("Ładowanie pliku DXF")
+    if timings is None:
+        timings = {}
+    
+    # Ustaw domyślne parametry jeśli nie przekazano konfiguracji
+    if config_params is None:
+        config_params = default_config_params(cfg)
+    
+    # Ekstrakcja z cache (jeśli włączony i plik z tymi parametrami był już przetworzony)
+    stage_start = time.perf_counter()
+    all_texts, polylines = load_dxf_extraction(input_file, config_params)
+    timings['extraction'] = time.perf_counter() - stage_start
+    
+    # Pobierz flagę zaawansowanego formatowania z parametrów lub użyj globalnej
+    use_advanced_formatting = config_params.get('USE_ADVANCED_FORMATTING', False)
+    
+    # Parsuj teksty dla docelowej stacji
+    stage_start = time.perf_counter()
+    station_texts = select_station_texts(all_texts, config_params['STATION_ID'], use_advanced_formatting, cfg=cfg)
+    timings['text_parsing'] = time.perf_counter() - stage_start
+    
+    console.result(f"Tekstów dla stacji {config_params['STATION_ID']} znaleziono", len(station_texts))
+    
+    # Automatyczne przypisywanie z parametrami z konfiguracji
+    console.step("Faza 1: Automatyczne przypisywanie na podstawie odległości", "🤖")
+    stage_start = time.perf_counter()
+    assignments = find_closest_texts_to_polylines(all_texts, polylines, 
+                                                 config_params['STATION_ID'],
+                                                 config_params['SEARCH_RADIUS'], 
+                                                 config_params['TEXT_LOCATION'],
+                                                 use_advanced_formatting, cfg)
+    timings['assignment'] = time.perf_counter() - stage_start
+    
+    stage_start = time.perf_counter()
+    result = build_station_result(station_texts, polylines, assignments, config_params['STATION_ID'], cfg)
+    timings['result'] = time.perf_counter() - stage_start
+    return result
+
+def discover_station_ids(all_texts: List[Dict], use_advanced_formatting: bool = False,
+                         default_station_id: str = None, cfg: ConfigSnapshot = None) -> List[str]:
+    """
+    Identyfikatory stacji występujące w tekstach (kolejność pierwszego wystąpienia).
+    Legacy: pole 'station', zaawansowane formatowanie: zmienna 'name'.
+    """
+    station_ids = []
+    seen = set()
+    for text in all_texts:
+        parsed = parse_text_to_dict(text['id'], default_station_id, cfg)
+        if not parsed:
+            continue
+        if use_advanced_formatting:
+            station_id = parsed.get('variables', {}).get('name')
+        else:
+            station_id = parsed.get('station')
+        if station_id and station_id not in seen:
+            seen.add(station_id)
+            station_ids.append(station_id)
+    return station_ids
+
+def assign_stations(station_texts_by_id: Dict[str, List[Dict]], polylines: List[Dict],
+                    search_radius: float = 6.0, text_location: str = "above") -> Dict[str, List[Dict]]:
+    """
+    Automatyczne przypisywanie dla wielu stacji jednocześnie.
+    Jeden indeks przestrzenny obejmuje teksty wszystkich stacji, a każdy segment odpytywany jest raz;
+    kandydaci rozdzielani są na stacje i dla każdej stacji wybór przebiega jak w find_closest_texts_to_polylines.
+    Teksty muszą mieć stały indeks 'idx' z ekstrakcji - łączy ten sam tekst na listach różnych stacji.
+    """
+    # Wspólna lista tekstów (kolejność ekstrakcji) i przynależność tekstu do stacji
+    members_by_idx = defaultdict(list)
+    shared_texts = {}
+    for station_id, station_texts in station_texts_by_id.items():
+        for text in station_texts:
+            if 'idx' not in text:
+                # Pozycja na liście stacji nie identyfikuje tekstu - numeracja zaczyna się od 0 w każdej stacji
+                raise ValueError(f"Tekst '{text.get('id')}' stacji {station_id} nie ma indeksu 'idx' z ekstrakcji")
+            text_idx = text['idx']
+            members_by_idx[text_idx].append((station_id, text))
+            shared_texts.setdefault(text_idx, text)
+    
+    shared_idx = sorted(shared_texts)
+    text_index = TextSpatialIndex([shared_texts[i] for i in shared_idx])
+    
+    candidates_by_station = {station_id: defaultdict(list) for station_id in station_texts_by_id}
+    
+    console.processing("Obliczanie odległości dla wszystkich stacji")
+    for poly_idx, polyline in enumerate(polylines):
+        for segment in polyline['segments']:
+            for position, distance in text_index.query_indices(segment, search_radius, text_location):
+                text_idx = shared_idx[position]
+                for station_id, text in members_by_idx[text_idx]:
+                    candidates_by_station[station_id][poly_idx].append({
+                        'text': text,
+                        'text_idx': text_idx,
+                        'polyline': polyline,
+                        'poly_idx': poly_idx,
+                        'segment': segment,
+                        'distance': distance
+                    })
+    
+    return {station_id: select_best_assignments(candidates, text_location)
+            for station_id, candidates in candidates_by_station.items()}
+
+def process_dxf_stations(input_file: str, config_params: Dict = None, station_ids: List[str] = None,
+                         timings: Dict = None, cfg: ConfigSnapshot = None) -> Dict[str, Tuple[Dict, List, List, List, List]]:
+    """
+    Tryb wielu stacji: jedna ekstrakcja i jeden indeks przestrzenny dla wszystkich stacji w pliku.
+    station_ids=None - stacje wykrywane z tekstów (pole 'station' lub zmienna 'name').
+    timings - opcjonalny słownik na czasy etapów (jak w process_dxf)
+    Zwraca {station_id: wynik jak z process_dxf}.
+    """
+    console.processing("Ładowanie pliku DXF (tryb wielu stacji)")
+    if timings is None:
+        timings = {}
+    
+    if config_params is None:
+        config_params = default_config_params(cfg)
+    
+    stage_start = time.perf_counter()
+    all_texts, polylines = load_dxf_extraction(input_file, config_params)
+    timings['extraction'] = time.perf_counter() - stage_start
+    use_advanced_formatting = config_params.get('USE_ADVANCED_FORMATTING', False)
+    
+    if station_ids is None:
+        station_ids = discover_station_ids(all_texts, use_advanced_formatting, config_params.get('STATION_ID'), cfg)
+    console.result("Stacji w pliku", len(station_ids))
+    logger.info(f"Tryb wielu stacji: {', '.join(station_ids)}")
+    
+    # Kopie tekstów - każda stacja dopisuje własne sparsowane pola
+    stage_start = time.perf_counter()
+    station_texts_by_id = {}
+    for station_id in station_ids:
+        station_texts_by_id[station_id] = select_station_texts(all_texts, station_id, use_advanced_formatting,
+                                                               copy_texts=True, cfg=cfg)
+        console.result(f"Tekstów dla stacji {station_id} znaleziono", len(station_texts_by_id[station_id]))
+    timings['text_parsing'] = time.perf_counter() - stage_start
+    
+    console.step("Faza 1: Automatyczne przypisywanie dla wszystkich stacji", "🤖")
+    stage_start = time.perf_counter()
+    assignments_by_station = assign_stations(station_texts_by_id, polylines,
+                                             config_params['SEARCH_RADIUS'],
+                                             config_params['TEXT_LOCATION'])
+    timings['assignment'] = time.perf_counter() - stage_start
+    
+    stage_start = time.perf_counter()
+    results = {}
+    for station_id in station_ids:
+        console.step(f"Stacja {station_id}", "🏭")
+        results[station_id] = build_station_result(station_texts_by_id[station_id], polylines,
+                                                   assignments_by_station[station_id], station_id, cfg)
+    timings['result'] = time.perf_counter() - stage_start
+    return results
+
+# Generatory SVG według rodzaju
+SVG_GENERATORS = {
+    "basic": generate_svg,
+    "interactive": generate_interactive_svg,
+    "structured": generate_structured_svg,
+}
+
+def generate_station_svg(kind: str, result: Tuple, output_path: str, station_id: str,
+                         cfg: ConfigSnapshot = None, scene: Scene = None) -> str:
+    """
+    Generuje jeden plik SVG stacji: kind = "structured", "interactive" lub "basic" (funkcja modułu - ProcessPoolExecutor)
+    scene - wspólna scena stacji (Scene.from_result), aby kolejne rodzaje SVG nie liczyły granic od nowa
+    """
+    if kind not in SVG_GENERATORS:
+        raise ValueError(f"Nieznany rodzaj SVG: {kind}")
+    inverter_data, station_texts, unassigned_texts, unassigned_segments, _ = result
+    SVG_GENERATORS[kind](inverter_data, station_texts, unassigned_texts, unassigned_segments, output_path,
+                         station_id, cfg, scene)
+    return output_path
+
+def _timed_station_svg(kind: str, result: Tuple, output_path: str, station_id: str,
+                       cfg: ConfigSnapshot, scene: Scene) -> Tuple[str, float]:
+    """generate_station_svg z pomiarem czasu (funkcja modułu - ProcessPoolExecutor)"""
+    start = time.perf_counter()
+    generate_station_svg(kind, result, output_path, station_id, cfg, scene)
+    return output_path, time.perf_counter() - start
+
+def generate_svgs(result: Tuple, output_paths: Dict[str, str], station_id: str = None, cfg: ConfigSnapshot = None,
+                  scene: Scene = None, mode: str = None, max_workers: int = None) -> Dict[str, Dict]:
+    """
+    Generuje kilka rodzajów SVG jednego wyniku process_dxf naraz - pliki są niezależne,
+    a dane wejściowe tylko do odczytu.
+    output_paths - {rodzaj: ścieżka}, rodzaj = "basic" / "interactive" / "structured"
+    mode - "process" (osobne procesy), "thread" (wątki) lub "serial" (kolejno);
+    None - cfg.SVG_RENDER_MODE (migawka konfiguracji z chwili wywołania)
+    Zwraca {'paths': {rodzaj: ścieżka}, 'timings': {rodzaj: sekundy, 'total': sekundy}}.
+    """
+    # Migawka i scena liczone raz w procesie głównym - wspólne dla wszystkich rodzajów
+    if cfg is None:
+        cfg = snapshot_config()
+    if mode is None:
+        mode = cfg.SVG_RENDER_MODE
+    if mode not in ("process", "thread", "serial"):
+        raise ValueError(f"Nieznany tryb generowania SVG: {mode}")
+    unknown = [kind for kind in output_paths if kind not in SVG_GENERATORS]
+    if unknown:
+        raise ValueError(f"Nieznany rodzaj SVG: {', '.join(unknown)}")
+    
+    total_start = time.perf_counter()
+    if station_id is None:
+        station_id = cfg.STATION_ID
+    if scene is None:
+        scene = Scene.from_result(result, station_id, cfg)
+    
+    jobs = list(output_paths.items())
+    paths = {}
+    timings = {}
+    if mode == "serial" or len(jobs) < 2:
+        for kind, output_path in jobs:
+            paths[kind], timings[kind] = _timed_station_svg(kind, result, output_path, station_id, cfg, scene)
+    else:
+        if mode == "process":
+            from concurrent.futures import ProcessPoolExecutor as Executor
+        else:
+            from concurrent.futures import ThreadPoolExecutor as Executor
+        with Executor(max_workers=max_workers or len(jobs)) as executor:
+            futures = {kind: executor.submit(_timed_station_svg, kind, result, output_path, station_id, cfg, scene)
+                       for kind, output_path in jobs}
+            for kind, future in futures.items():
+                paths[kind], timings[kind] = future.result()
+    
+    timings['total'] = time.perf_counter() - total_start
+    logger.info(f"Wygenerowano SVG ({mode}): " +
+                ", ".join(f"{kind} {timings[kind]:.2f}s" for kind in paths) + f", razem {timings['total']:.2f}s")
+    return {'paths': paths, 'timings': timings}
+
+def generate_station_svgs(results: Dict[str, Tuple], output_dir: str = ".", file_prefix: str = "output",
+                          kinds: Tuple[str, ...] = ("structured", "interactive"),
+                          max_workers: int = 1, cfg: ConfigSnapshot = None) -> Dict[str, Dict[str, str]]:
+    """
+    Zapisuje pliki SVG każdej stacji: {output_dir}/{file_prefix}_{stacja}_{rodzaj}.svg
+    max_workers > 1 - generowanie równoległe w osobnych procesach.
+    Zwraca {station_id: {rodzaj: ścieżka}}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    for station_id, result in results.items():
+        safe_station = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(station_id))
+        for kind in kinds:
+            output_path = os.path.join(output_dir, f"{file_prefix}_{safe_station}_{kind}.svg")
+            jobs.append((station_id, kind, output_path))
+    
+    # Procesy robocze dostają migawkę zamiast polegać na stanie modułu config
+    if cfg is None:
+        cfg = snapshot_config()
+    
+    # Jedna scena na stację - wspólna dla wszystkich rodzajów SVG
+    scenes = {station_id: Scene.from_result(result, station_id, cfg) for station_id, result in results.items()}
+    
+    paths = defaultdict(dict)
+    if max_workers > 1 and len(jobs) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(generate_station_svg, kind, results[station_id], output_path, station_id, cfg,
+                                       scenes[station_id]):
+                       (station_id, kind) for station_id, kind, output_path in jobs}
+            for future, (station_id, kind) in futures.items():
+                paths[station_id][kind] = future.result()
+    else:
+        for station_id, kind, output_path in jobs:
+            paths[station_id][kind] = generate_station_svg(kind, results[station_id], output_path, station_id, cfg,
+                                                           scenes[station_id])
+    
+    for station_id, station_paths in paths.items():
+        for kind, output_path in station_paths.items():
+            console.success(f"SVG stacji {station_id} ({kind})", output_path)
+    return dict(paths)
+
 def main(input_file=None, config_params=None):
     """Główna funkcja programu"""
     try:
@@ -490,18 +929,18 @@ def main(input_file=None, config_params=None):
         # Przetwórz DXF z przekazanymi parametrami konfiguracji
         assigned_data, station_texts, unassigned_texts, unassigned_segments, unassigned_polylines = process_dxf(input_file, config_params)
         
-        console.step("Generowanie początkowego SVG (podgląd)", "🎨")  
+        console.step("Generowanie początkowego SVG (podgląd) i strukturalnego SVG", "🎨")
+        
+        # Wspólna scena (granice, outliers) dla podglądu i strukturalnego SVG - liczona ponownie tylko po edycji
+        scene = Scene(assigned_data, station_texts, unassigned_texts, unassigned_segments, config_params['STATION_ID'])
         
-        # Generuj interaktywny SVG z numeracją
+        # Interaktywny SVG z numeracją i strukturalny SVG - tryb z config.SVG_RENDER_MODE w chwili wywołania
         interactive_svg_path = "output_initial.svg"
-        generate_interactive_svg(
-            assigned_data, 
-            station_texts,
-            unassigned_texts, 
-            unassigned_segments,
-            interactive_svg_path,
-            config_params['STATION_ID']
-        )
+        structured_svg_path = "output_structured.svg"
+        result = (assigned_data, station_texts, unassigned_texts, unassigned_segments, unassigned_polylines)
+        generate_svgs(result, {'interactive': interactive_svg_path, 'structured': structured_svg_path},
+                      config_params['STATION_ID'], scene=scene)
+        console.success("Strukturalny SVG utworzony", structured_svg_path)
         
         # ========================================================================
         # KROK 8: INTERAKTYWNY TRYB EDYCJI (NOWA FUNKCJONALNOŚĆ!)
@@ -522,12 +961,15 @@ def main(input_file=None, config_params=None):
                     # Uruchom interaktywny tryb z parametrem station_id
                     changes = interactive_assignment_menu(unassigned_texts, unassigned_segments, assigned_data, station_texts, config_params['STATION_ID'])
                     
-                    # Po zmianach wygeneruj finalne SVG
+                    # Po zmianach wygeneruj finalne i strukturalne SVG (przypisania się zmieniły - nowa scena)
                     final_svg_path = "output_final.svg"
-                    console.step("Generowanie finalnego SVG po edycji", "🎨")
-                    generate_interactive_svg(assigned_data, station_texts, unassigned_texts, unassigned_segments, final_svg_path, config_params['STATION_ID'])
+                    console.step("Generowanie finalnego i strukturalnego SVG po edycji", "🎨")
+                    scene = Scene(assigned_data, station_texts, unassigned_texts, unassigned_segments, config_params['STATION_ID'])
+                    generate_svgs(result, {'interactive': final_svg_path, 'structured': structured_svg_path},
+                                  config_params['STATION_ID'], scene=scene)
                     
                     console.success(f"Finalne SVG zapisane: {final_svg_path}")
+                    console.success("Strukturalny SVG zaktualizowany", structured_svg_path)
                     
                     # Zaktualizowane statystyki
                     updated_unassigned = []
@@ -554,21 +996,6 @@ def main(input_file=None, config_params=None):
         else:
             console.success("Wszystkie teksty zostały automatycznie przypisane!", "🎉")
         
-        # ========================================================================
-        # GENEROWANIE STRUKTURALNEGO SVG (NOWA FUNKCJONALNOŚĆ!)
-        # ========================================================================
-        console.step("Generowanie strukturalnego SVG (format finalny)", "🏗️")
-        structured_svg_path = "output_structured.svg"
-        generate_structured_svg(
-            assigned_data, 
-            station_texts,
-            unassigned_texts, 
-            unassigned_segments,
-            structured_svg_path,
-            config_params['STATION_ID']
-        )
-        console.success("Strukturalny SVG utworzony", structured_svg_path)
-        
         # Podsumowanie końcowe
         console.header("RAPORT KOŃCOWY")
         
@@ -0,0 +1,265 @@
+"""
+Trwały cache wyników ekstrakcji DXF (teksty + polilinie z segmentami)
+Klucz: hash zawartości pliku DXF + parametry ekstrakcji, zapis w plikach .npz
+"""
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from typing import List, Dict, Tuple, Optional, Any
+from src.utils.console_logger import console, logger
+from src.core.segment_table import SegmentTable, segment_table_of
+
+# Zmień przy każdej zmianie wyniku ekstrakcji lub układu danych w pliku cache
+CACHE_FORMAT_VERSION = 2
+
+# Parametry wpływające na wynik extract_texts_from_dxf / extract_polylines_from_dxf
+CACHE_KEY_PARAMS = (
+    'LAYER_TEXT',
+    'LAYER_LINE',
+    'Y_TOLERANCE',
+    'SEGMENT_MIN_WIDTH',
+    'POLYLINE_PROCESSING_MODE',
+    'SEGMENT_MERGE_GAP_TOLERANCE',
+    'MAX_MERGE_DISTANCE',
+)
+
+_HASH_INDEX_FILE = 'file_hashes.json'
+_HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """
+    Katalog cache użytkownika: %LOCALAPPDATA%\\dxf2svg\\extraction_cache (Windows),
+    $XDG_CACHE_HOME/dxf2svg/extraction_cache lub ~/.cache/dxf2svg/extraction_cache
+    """
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dxf2svg', 'extraction_cache')
+
+
+def resolve_cache_dir(cache_dir: Optional[str], input_file: str) -> str:
+    """
+    Katalog cache dla pliku DXF (EXTRACTION_CACHE_DIR): pusty - katalog cache użytkownika,
+    ścieżka względna - względem katalogu pliku DXF (nie bieżącego katalogu), bezwzględna - bez zmian
+    """
+    if not cache_dir:
+        return default_cache_dir()
+    cache_dir = os.path.expanduser(cache_dir)
+    if os.path.isabs(cache_dir):
+        return cache_dir
+    return os.path.join(os.path.dirname(os.path.abspath(input_file)), cache_dir)
+
+
+class ExtractionCache:
+    """Cache wyników ekstrakcji na dysku z usuwaniem najstarszych wpisów po przekroczeniu rozmiaru"""
+
+    def __init__(self, cache_dir: str = None, max_size_mb: float = 512):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+
+    def file_hash(self, input_file: str) -> str:
+        """
+        Hash zawartości pliku DXF (BLAKE2b).
+        Wynik jest zapamiętywany dla (ścieżka, rozmiar, mtime), więc kolejne uruchomienia
+        na niezmienionym pliku nie czytają go ponownie.
+        """
+        stat = os.stat(input_file)
+        stat_key = f"{os.path.abspath(input_file)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+        index_path = os.path.join(self.cache_dir, _HASH_INDEX_FILE)
+        index = {}
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        if stat_key in index:
+            return index[stat_key]
+
+        hasher = hashlib.blake2b(digest_size=20)
+        with open(input_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+        # Zachowaj tylko wpisy dla innych plików (stare wersje tego pliku są bezużyteczne)
+        path_prefix = stat_key.rsplit('|', 2)[0] + '|'
+        index = {k: v for k, v in index.items() if not k.startswith(path_prefix)}
+        index[stat_key] = digest
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._atomic_write(index_path, json.dumps(index).encode('utf-8'))
+        except OSError as e:
+            logger.debug(f"Nie można zapisać indeksu hashy plików: {e}")
+
+        return digest
+
+    def make_key(self, input_file: str, config_params: Dict) -> str:
+        """Klucz cache z hasha pliku i parametrów ekstrakcji"""
+        key_data = {
+            'version': CACHE_FORMAT_VERSION,
+            'file': self.file_hash(input_file),
+        }
+        for name in CACHE_KEY_PARAMS:
+            key_data[name] = config_params.get(name)
+
+        # Parametry łączenia mają znaczenie tylko w trybie merge_segments
+        if key_data['POLYLINE_PROCESSING_MODE'] != 'merge_segments':
+            key_data['SEGMENT_MERGE_GAP_TOLERANCE'] = None
+            key_data['MAX_MERGE_DISTANCE'] = None
+
+        encoded = json.dumps(key_data, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def load(self, key: str) -> Optional[Tuple[List[Dict], List[Dict]]]:
+        """Wczytaj (teksty, polilinie) z cache - None jeśli brak wpisu lub wpis uszkodzony"""
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                texts = _texts_from_arrays(data)
+                polylines = _polylines_from_arrays(data)
+
+            # Oznacz wpis jako używany (usuwanie najstarszych po czasie modyfikacji)
+            os.utime(path, None)
+            logger.info(f"Ekstrakcja z cache: {path} ({len(texts)} tekstów, {len(polylines)} polilinii)")
+            return texts, polylines
+
+        except Exception as e:
+            logger.warning(f"Uszkodzony wpis cache ekstrakcji {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def store(self, key: str, texts: List[Dict], polylines: List[Dict]):
+        """Zapisz wynik ekstrakcji i usuń najstarsze wpisy po przekroczeniu limitu rozmiaru"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            arrays = _texts_to_arrays(texts)
+            arrays.update(_polylines_to_arrays(polylines))
+
+            path = self._entry_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+            logger.info(f"Zapisano ekstrakcję do cache: {path} ({os.path.getsize(path)} B)")
+
+            self.evict()
+
+        except Exception as e:
+            logger.warning(f"Nie można zapisać cache ekstrakcji: {e}")
+
+    def evict(self):
+        """Usuń najdawniej używane wpisy, aż rozmiar cache zmieści się w limicie"""
+        try:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.npz'):
+                    path = os.path.join(self.cache_dir, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        except OSError:
+            return
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.remove(path)
+                total_size -= size
+                logger.info(f"Usunięto wpis cache ekstrakcji (limit rozmiaru): {path}")
+            except OSError:
+                pass
+
+    def clear(self):
+        """Usuń wszystkie wpisy cache"""
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz') or name == _HASH_INDEX_FILE:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _atomic_write(path: str, payload: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{time.time_ns()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+
+def _texts_to_arrays(texts: List[Dict]) -> Dict[str, np.ndarray]:
+    return {
+        'text_id': np.array([t['id'] for t in texts], dtype=str),
+        'text_raw': np.array([t['raw_text'] for t in texts], dtype=str),
+        'text_pos': np.array([t['pos'] for t in texts], dtype=np.float64).reshape(-1, 2),
+    }
+
+
+def _texts_from_arrays(data) -> List[Dict]:
+    texts = []
+    for idx, (text_id, raw_text, pos) in enumerate(zip(data['text_id'].tolist(),
+                                                        data['text_raw'].tolist(),
+                                                        data['text_pos'].tolist())):
+        texts.append({
+            'idx': idx,
+            'id': text_id,
+            'pos': (pos[0], pos[1]),
+            'raw_text': raw_text
+        })
+    return texts
+
+
+def _polylines_to_arrays(polylines: List[Dict]) -> Dict[str, np.ndarray]:
+    segments = [seg for p in polylines for seg in p['segments']]
+    seg_offsets = np.cumsum([0] + [len(p['segments']) for p in polylines], dtype=np.int64)
+
+    arrays = {
+        'poly_id': np.array([p['id'] for p in polylines], dtype=np.int64),
+        'poly_idx': np.array([p['polyline_idx'] for p in polylines], dtype=np.int64),
+        'poly_center': np.array([p['center'] for p in polylines], dtype=np.float64).reshape(-1, 2),
+        'poly_total_length': np.array([p['total_length'] for p in polylines], dtype=np.float64),
+        'poly_seg_offsets': seg_offsets,
+    }
+    # Kolumny segmentów (wraz z pochodzeniem merged_from w trybie merge_segments)
+    arrays.update(segment_table_of(segments).to_arrays('seg_'))
+
+    return arrays
+
+
+def _polylines_from_arrays(data) -> List[Dict]:
+    segment_table = SegmentTable.from_arrays(data, 'seg_')
+
+    polylines = []
+    offsets = data['poly_seg_offsets'].tolist()
+    for i, (poly_id, poly_idx, center, total_length) in enumerate(zip(data['poly_id'].tolist(),
+                                                                     data['poly_idx'].tolist(),
+                                                                     data['poly_center'].tolist(),
+                                                                     data['poly_total_length'].tolist())):
+        polyline_segments = segment_table.rows(offsets[i], offsets[i + 1])
+        polylines.append({
+            'id': poly_id,
+            'segments': polyline_segments,
+            'center': (center[0], center[1]),
+            'polyline_idx': poly_idx,
+            'segment_count': len(polyline_segments),
+            'total_length': total_length
+        })
+
+    return polylines
@@ -2,9 +2,11 @@
 Narzędzia geometryczne i matematyczne
 """
 import math
+import numpy as np
+from scipy.spatial import KDTree
 from typing import List, Dict, Tuple
 from src.utils.console_logger import console, logger
-from src.core.config import STATION_ID
+import src.core.config as config
 
 def calculate_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
     """Oblicz odległość euklidesową między dwoma punktami"""
@@ -48,11 +50,67 @@ def find_texts_by_location(segment: Dict, texts: List[Dict], search_radius: floa
     candidates.sort(key=lambda x: x['distance'])
     return [c['text'] for c in candidates]
 
-def find_nearby_assigned_strings(target_text: Dict, inverter_data: Dict, texts: List, max_distance: float = 50.0) -> List[Dict]:
+class TextSpatialIndex:
+    """
+    Indeks przestrzenny (KD-tree) pozycji tekstów.
+    Odpowiada na zapytania promieniowe z tą samą semantyką położenia
+    ("above", "below", "any") co find_texts_by_location, ale bez liczenia
+    odległości do wszystkich tekstów dla każdego segmentu.
+    """
+    
+    def __init__(self, texts: List[Dict]):
+        self.texts = texts
+        self.positions = np.array([text['pos'] for text in texts], dtype=float).reshape(-1, 2)
+        self.tree = KDTree(self.positions) if len(texts) > 0 else None
+    
+    def query_indices(self, segment: Dict, search_radius: float, location_mode: str = "any") -> List[Tuple[int, float]]:
+        """
+        Znajdź teksty w promieniu od środka segmentu
+        Returns: Lista (pozycja tekstu na liście indeksu, odległość) posortowana według odległości
+        """
+        if self.tree is None:
+            return []
+        
+        seg_start = segment['start']
+        seg_end = segment['end']
+        seg_center = ((seg_start[0] + seg_end[0]) / 2, (seg_start[1] + seg_end[1]) / 2)
+        seg_y = seg_center[1]
+        
+        # Lekki zapas promienia - dokładny warunek sprawdzamy poniżej tą samą formułą co wcześniej
+        indices = self.tree.query_ball_point(seg_center, search_radius * (1 + 1e-9) + 1e-12)
+        
+        candidates = []
+        for idx in indices:
+            text_pos = self.texts[idx]['pos']
+            distance = calculate_distance(seg_center, text_pos)
+            if distance > search_radius:
+                continue
+            
+            text_y = text_pos[1]
+            if location_mode == "above" and text_y <= seg_y:
+                continue  # Tekst jest poniżej segmentu
+            elif location_mode == "below" and text_y >= seg_y:
+                continue  # Tekst jest powyżej segmentu
+            
+            candidates.append((distance, idx))
+        
+        # Sortuj według odległości (przy remisie - kolejność jak na liście tekstów)
+        candidates.sort()
+        return [(idx, distance) for distance, idx in candidates]
+    
+    def query(self, segment: Dict, search_radius: float, location_mode: str = "any") -> List[Dict]:
+        """Znajdź teksty w promieniu od środka segmentu - wynik jak find_texts_by_location"""
+        return [self.texts[idx] for idx, _ in self.query_indices(segment, search_radius, location_mode)]
+
+def find_nearby_assigned_strings(target_text: Dict, inverter_data: Dict, texts: List, max_distance: float = 50.0,
+                                 station_id: str = None) -> List[Dict]:
     """
     Znajdź już przypisane stringi w pobliżu nieprzypisanego tekstu
     Returns: Lista stringów posortowana według odległości
     """
+    # Bieżąca stacja odczytywana w chwili wywołania, a nie przy imporcie modułu
+    if station_id is None:
+        station_id = config.STATION_ID
     nearby_strings = []
     target_pos = target_text['pos']
     
@@ -64,7 +122,7 @@ def find_nearby_assigned_strings(target_text: Dict, inverter_data: Dict, texts:
             # Znajdź tekst przypisany do tego stringa
             assigned_text = None
             for text in texts:
-                if text.get('station') == STATION_ID and text['id'] == str_id:
+                if text.get('station') == station_id and text['id'] == str_id:
                     assigned_text = text
                     break
             
@@ -170,11 +228,13 @@ def swap_string_assignments(inverter_data: Dict, text1_id: str, text2_id: str) -
         logger.error(f"Błąd podczas zamiany przypisań: {e}")
         return False
 
-def validate_final_assignments(inverter_data: Dict, texts: List) -> Tuple[List, List]:
+def validate_final_assignments(inverter_data: Dict, texts: List, station_id: str = None) -> Tuple[List, List]:
     """
     Sprawdza, które teksty i stringi są finalnie osierocone
     Returns: (orphaned_texts, orphaned_strings)
     """
+    if station_id is None:
+        station_id = config.STATION_ID
     # Zbierz wszystkie teksty które finalnie mają przypisane stringi
     assigned_text_ids = set()
     assigned_polyline_indices = set()
@@ -184,7 +244,7 @@ def validate_final_assignments(inverter_data: Dict, texts: List) -> Tuple[List,
             if segments:  # Jeśli string ma segmenty
                 # Znajdź tekst odpowiadający temu string ID
                 for text in texts:
-                    if text.get('station') == STATION_ID and text['id'] == str_id:
+                    if text.get('station') == station_id and text['id'] == str_id:
                         assigned_text_ids.add(text['id'])
                         # Zapisz indeksy polilinii używanych przez ten string
                         for seg in segments:
@@ -194,7 +254,7 @@ def validate_final_assignments(inverter_data: Dict, texts: List) -> Tuple[List,
     # Znajdź osierocone teksty (stacji docelowej, które nie mają finalnie stringów)
     orphaned_texts = []
     for text in texts:
-        if text.get('station') == STATION_ID and text['id'] not in assigned_text_ids:
+        if text.get('station') == station_id and text['id'] not in assigned_text_ids:
             orphaned_texts.append(text)
     
     logger.info(f"Walidacja finalna: {len(assigned_text_ids)} tekstów ma przypisane stringi")
@@ -202,30 +262,30 @@ def validate_final_assignments(inverter_data: Dict, texts: List) -> Tuple[List,
     
     return orphaned_texts, list(assigned_polyline_indices)
 
-def find_main_cluster(points: List[Tuple[float, float]], distance_threshold: float = 100.0) -> Tuple[float, float]:
-    """Znajdź środek głównej grupy punktów (usuwa odstające) - zwraca współrzędne środka"""
-    if not points:
+def find_main_cluster(points, distance_threshold: float = 100.0) -> Tuple[float, float]:
+    """
+    Znajdź środek głównej grupy punktów (usuwa odstające) - zwraca współrzędne środka.
+    points - lista krotek (x, y) lub tablica NumPy (n, 2); obliczenia wektorowe
+    """
+    if len(points) == 0:
         return (0.0, 0.0)
     
     if len(points) == 1:
         return points[0]
-        
-    sorted_x = sorted(p[0] for p in points)
-    sorted_y = sorted(p[1] for p in points)
-    median_x = sorted_x[len(sorted_x)//2]
-    median_y = sorted_y[len(sorted_y)//2]
-    
-    cluster = []
-    for point in points:
-        distance = math.sqrt((point[0]-median_x)**2 + (point[1]-median_y)**2)
-        if distance < distance_threshold:
-            cluster.append(point)
-    
-    if not cluster:
-        cluster = points  # Jeśli żaden punkt nie jest w klastrze, użyj wszystkich
-    
-    # Zwróć średnią pozycję klastra
-    avg_x = sum(p[0] for p in cluster) / len(cluster)
-    avg_y = sum(p[1] for p in cluster) / len(cluster)
+    
+    coords = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    middle = len(coords) // 2
+    median_x = np.partition(coords[:, 0], middle)[middle]
+    median_y = np.partition(coords[:, 1], middle)[middle]
+    
+    # float_power - te same wyniki co math.sqrt((dx)**2 + (dy)**2)
+    distance = np.sqrt(np.float_power(coords[:, 0] - median_x, 2) + np.float_power(coords[:, 1] - median_y, 2))
+    in_cluster = distance < distance_threshold
+    # Jeśli żaden punkt nie jest w klastrze, użyj wszystkich
+    cluster = coords[in_cluster] if in_cluster.any() else coords
+    
+    # Zwróć średnią pozycję klastra (sumowanie sekwencyjne, jak wcześniej)
+    avg_x = sum(cluster[:, 0].tolist()) / len(cluster)
+    avg_y = sum(cluster[:, 1].tolist()) / len(cluster)
     
     return (avg_x, avg_y)
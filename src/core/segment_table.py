@@ -0,0 +1,237 @@
+"""
+Kolumnowa tabela segmentów (struct-of-arrays) z lekkimi widokami wierszy
+"""
+from array import array
+from collections.abc import Mapping
+from typing import List, Dict, Iterable, Optional, Any
+import numpy as np
+
+# Klucze widoku wiersza - te same co w dawnych słownikach segmentów
+SEGMENT_KEYS = ('id', 'start', 'end', 'length', 'polyline_idx')
+
+
+class SegmentTable:
+    """
+    Segmenty przechowywane kolumnowo w array.array (id, x1, y1, x2, y2, length, polyline_idx).
+    Kolumny są dostępne jako tablice NumPy bez kopiowania (column()), a istniejący kod
+    korzysta z widoków wierszy (row()/rows()), które zachowują się jak dawne słowniki.
+    Opcjonalnie tabela przechowuje pochodzenie połączonych segmentów (merged_from).
+    """
+
+    __slots__ = ('ids', 'x1', 'y1', 'x2', 'y2', 'length', 'polyline_idx',
+                 'merged_offsets', 'merged_ids', '_row_by_id', '__weakref__')
+
+    def __init__(self, ids: Iterable[int] = (), x1: Iterable[float] = (), y1: Iterable[float] = (),
+                 x2: Iterable[float] = (), y2: Iterable[float] = (), length: Iterable[float] = (),
+                 polyline_idx: Iterable[int] = (), merged_offsets: Optional[Iterable[int]] = None,
+                 merged_ids: Optional[Iterable[int]] = None):
+        self.ids = _int_array(ids)
+        self.x1 = _float_array(x1)
+        self.y1 = _float_array(y1)
+        self.x2 = _float_array(x2)
+        self.y2 = _float_array(y2)
+        self.length = _float_array(length)
+        self.polyline_idx = _int_array(polyline_idx)
+        self.merged_offsets = _int_array(merged_offsets) if merged_offsets is not None else None
+        self.merged_ids = _int_array(merged_ids) if merged_ids is not None else None
+        self._row_by_id = None
+
+        n = len(self.ids)
+        if any(len(column) != n for column in (self.x1, self.y1, self.x2, self.y2, self.length, self.polyline_idx)):
+            raise ValueError("Kolumny tabeli segmentów mają różne długości")
+        if self.merged_offsets is not None and len(self.merged_offsets) != n + 1:
+            raise ValueError("Nieprawidłowe przesunięcia merged_from")
+
+    @classmethod
+    def from_records(cls, segments: List[Any]) -> 'SegmentTable':
+        """Buduje tabelę z listy słowników/widoków segmentów (merged_from jeśli mają go wszystkie)"""
+        has_merged = bool(segments) and all('merged_from' in s for s in segments)
+        merged_offsets = None
+        merged_ids = None
+        if has_merged:
+            merged_offsets = [0]
+            merged_ids = []
+            for s in segments:
+                merged_ids.extend(s['merged_from'])
+                merged_offsets.append(len(merged_ids))
+
+        return cls(
+            ids=[s['id'] for s in segments],
+            x1=[s['start'][0] for s in segments],
+            y1=[s['start'][1] for s in segments],
+            x2=[s['end'][0] for s in segments],
+            y2=[s['end'][1] for s in segments],
+            length=[s['length'] for s in segments],
+            polyline_idx=[s['polyline_idx'] for s in segments],
+            merged_offsets=merged_offsets,
+            merged_ids=merged_ids,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name not in ('_row_by_id', '__weakref__')}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._row_by_id = None
+
+    @property
+    def has_merged_from(self) -> bool:
+        return self.merged_offsets is not None
+
+    def column(self, name: str) -> np.ndarray:
+        """Kolumna jako tablica NumPy (widok bez kopiowania, tylko do odczytu)"""
+        values = getattr(self, name)
+        dtype = np.int64 if values.typecode == 'q' else np.float64
+        result = np.frombuffer(values, dtype=dtype) if len(values) else np.empty(0, dtype=dtype)
+        result.flags.writeable = False
+        return result
+
+    def centers(self) -> np.ndarray:
+        """Środki segmentów (n, 2)"""
+        x = (self.column('x1') + self.column('x2')) / 2
+        y = (self.column('y1') + self.column('y2')) / 2
+        return np.column_stack((x, y))
+
+    def row(self, index: int) -> 'SegmentView':
+        """Widok wiersza zachowujący się jak słownik segmentu"""
+        if index < 0:
+            index += len(self.ids)
+        if not 0 <= index < len(self.ids):
+            raise IndexError(index)
+        return SegmentView(self, index)
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List['SegmentView']:
+        """Lista widoków wierszy z zakresu [start, stop)"""
+        if stop is None:
+            stop = len(self.ids)
+        return [SegmentView(self, i) for i in range(start, stop)]
+
+    def find_row(self, segment_id: int) -> Optional[int]:
+        """Indeks wiersza segmentu o danym ID (None jeśli brak)"""
+        if self._row_by_id is None:
+            self._row_by_id = {segment_id: i for i, segment_id in enumerate(self.ids)}
+        return self._row_by_id.get(segment_id)
+
+    def merged_from(self, index: int) -> List[int]:
+        """ID segmentów źródłowych połączonego segmentu"""
+        if self.merged_offsets is None:
+            raise KeyError('merged_from')
+        return self.merged_ids[self.merged_offsets[index]:self.merged_offsets[index + 1]].tolist()
+
+    def to_arrays(self, prefix: str = 'seg_') -> Dict[str, np.ndarray]:
+        """Kolumny jako tablice NumPy (np. do zapisu .npz)"""
+        arrays = {f"{prefix}{name}": np.array(self.column(name))
+                  for name in ('ids', 'x1', 'y1', 'x2', 'y2', 'length', 'polyline_idx')}
+        if self.merged_offsets is not None:
+            arrays[f"{prefix}merged_offsets"] = np.array(self.column('merged_offsets'))
+            arrays[f"{prefix}merged_ids"] = np.array(self.column('merged_ids'))
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, data, prefix: str = 'seg_') -> 'SegmentTable':
+        """Odtwarza tabelę z tablic zapisanych przez to_arrays()"""
+        merged = f"{prefix}merged_offsets" in data
+        return cls(
+            ids=data[f"{prefix}ids"], x1=data[f"{prefix}x1"], y1=data[f"{prefix}y1"],
+            x2=data[f"{prefix}x2"], y2=data[f"{prefix}y2"], length=data[f"{prefix}length"],
+            polyline_idx=data[f"{prefix}polyline_idx"],
+            merged_offsets=data[f"{prefix}merged_offsets"] if merged else None,
+            merged_ids=data[f"{prefix}merged_ids"] if merged else None,
+        )
+
+
+class SegmentView(Mapping):
+    """
+    Widok jednego wiersza SegmentTable z interfejsem słownika segmentu:
+    seg['id'], seg['start'], seg['end'], seg['length'], seg['polyline_idx'] (+ 'merged_from').
+    copy() zwraca zwykły słownik, który wywołujący mogą dowolnie modyfikować.
+    """
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: SegmentTable, index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key: str) -> Any:
+        table = self.table
+        i = self.index
+        if key == 'start':
+            return (table.x1[i], table.y1[i])
+        if key == 'end':
+            return (table.x2[i], table.y2[i])
+        if key == 'id':
+            return table.ids[i]
+        if key == 'length':
+            return table.length[i]
+        if key == 'polyline_idx':
+            return table.polyline_idx[i]
+        if key == 'merged_from' and table.merged_offsets is not None:
+            return table.merged_from(i)
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from SEGMENT_KEYS
+        if self.table.merged_offsets is not None:
+            yield 'merged_from'
+
+    def __len__(self) -> int:
+        return len(SEGMENT_KEYS) + (1 if self.table.merged_offsets is not None else 0)
+
+    def __contains__(self, key) -> bool:
+        return key in SEGMENT_KEYS or (key == 'merged_from' and self.table.merged_offsets is not None)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SegmentView):
+            if other.table is self.table:
+                return other.index == self.index
+            return dict(self) == dict(other)
+        if isinstance(other, Mapping):
+            return dict(self) == dict(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Spójne z __eq__: równe widoki (także z różnych tabel) mają tę samą treść
+        return hash(tuple((key, tuple(value) if key == 'merged_from' else value)
+                          for key, value in self.items()))
+
+    def __repr__(self) -> str:
+        return f"SegmentView({dict(self)!r})"
+
+    def copy(self) -> Dict[str, Any]:
+        """Kopia wiersza jako zwykły słownik"""
+        return dict(self)
+
+
+def segment_table_of(segments: List[Any]) -> SegmentTable:
+    """
+    Tabela zawierająca dokładnie podane segmenty w tej samej kolejności.
+    Jeśli są to kolejne widoki wierszy jednej tabeli (typowy wynik ekstrakcji),
+    zwraca tę tabelę bez kopiowania.
+    """
+    if segments and all(isinstance(s, SegmentView) for s in segments):
+        table = segments[0].table
+        if (len(table) == len(segments) and
+                all(s.table is table and s.index == i for i, s in enumerate(segments))):
+            return table
+    return SegmentTable.from_records(segments)
+
+
+def _float_array(values) -> array:
+    if isinstance(values, array) and values.typecode == 'd':
+        return values
+    if isinstance(values, np.ndarray):
+        return array('d', np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return array('d', values)
+
+
+def _int_array(values) -> array:
+    if isinstance(values, array) and values.typecode == 'q':
+        return values
+    if isinstance(values, np.ndarray):
+        return array('q', np.ascontiguousarray(values, dtype=np.int64).tobytes())
+    return array('q', values)
@@ -12,8 +12,14 @@ import tkinter as tk
 from tkinter import ttk
 import os
 import xml.etree.ElementTree as ET
+from src.svg.svg_stream import latest_document, wait_for_write
+from src.gui.svg_scene_model import (SvgSceneModel, SvgPrimitive, RENDER_ORDER,
+                                     LOD_FULL, LOD_STRINGS, LOD_INVERTERS)
+from src.gui.svg_tile_cache import SvgTileRenderer, TILE_SIZE, zoom_level, level_scale
+from PIL import ImageTk
 import math
-from typing import Optional, Tuple, List, Callable, Dict, Any
+import time
+from typing import Optional, Tuple, List, Callable, Dict, Any, Iterator
 
 # ============================================================================
 # GLOBALNE STAŁE DLA ZAOKRĄGLEŃ (zsynchronizowane z interactive_gui_new.py)
@@ -23,6 +29,37 @@ LAYER_SPACING = 0           # Odstęp między warstwami
 ELEMENT_SPACING = 16        # Odstęp content od krawędzi (połowa CORNER_RADIUS)
 # ============================================================================
 
+# Tag elementów sceny na canvasie (zoom/przesunięcie przekształcają je canvas.scale/canvas.move)
+SCENE_TAG = "interactive"
+
+# Trafienie kursorem: najbliższy element w promieniu HIT_HALO pikseli, szukany kolejno w HIT_RADII
+HIT_RADII = (3, 10)
+HIT_HALO = 15
+
+# Poziomy szczegółów (LOD) oddalonych widoków (LOD_FULL / LOD_STRINGS / LOD_INVERTERS z modelu sceny)
+LOD_TAG = "lod"
+LOD_SEGMENT_PX = 4          # Mediana długości segmentu na ekranie poniżej - stringi jako jeden element
+LOD_STRING_PX = 8           # Mediana rozmiaru stringa na ekranie poniżej - prostokąty falowników
+LOD_MIN_TEXT_PX = 4         # Teksty o czcionce mniejszej na ekranie nie są rysowane
+LOD_MIN_DOT_PX = 1          # Kropki o mniejszym promieniu nie są rysowane w uproszczonych poziomach
+LOD_INVERTER_LABEL_PX = 24  # Minimalna szerokość prostokąta falownika z etykietą
+
+# Opóźnienie pełnego przerysowania po zoomie/przesunięciu (ms) - seria zdarzeń daje jedno przerysowanie
+RERENDER_DELAY_MS = 150
+
+# Klatka harmonogramu zdarzeń widoku (ms) - zdarzenia kółka/przeciągania/zmiany rozmiaru z jednej klatki
+# są łączone w jedno przekształcenie widoku
+FRAME_MS = 16
+
+# Renderowanie stopniowe: czas rysowania w jednej porcji (ms) - reszta w kolejnych porcjach after_idle,
+# więc okno obsługuje zdarzenia co najwyżej po jednej klatce
+FRAME_BUDGET_MS = 10
+
+# Rastrowe kafelki (svg_tile_cache) zamiast elementów wektorowych dla scen od tylu prymitywów
+TILE_TAG = "tile"
+TILE_MODE_MIN_PRIMITIVES = 50000
+OVERLAY_LIMIT = 200         # Nakładki wektorowe trybu kafelków ponad limit są usuwane (poza zaznaczonymi)
+
 
 class InteractiveElement:
     """Represents an interactive SVG element"""
@@ -49,6 +86,11 @@ class EnhancedSVGViewer:
         self.pan_x = 0
         self.pan_y = 0
         self.svg_content = None
+        self.svg_root = None  # Drzewo SVG parsowane raz przy wczytaniu (łatki przyrostowe zmieniają je w miejscu)
+        self.svg_model: Optional[SvgSceneModel] = None  # Prymitywy drzewa z granicami (renderowanie bez parsowania)
+        self.svg_modified = False  # Drzewo zmienione łatkami względem pliku
+        self.svg_file_mtime = None  # st_mtime_ns wczytanego pliku
+        self.svg_document = None  # Dokument w pamięci z generatora (load_svg_document)
         self.original_size = (800, 600)
         self.svg_bounds = (0, 0, 800, 600)  # Actual content bounds
         
@@ -58,9 +100,28 @@ class EnhancedSVGViewer:
         self.render_cache = {}
         self.last_render_params = None
         self.needs_full_render = True
+        self.rendered_scale = None  # Skala ostatniego pełnego renderowania (grubości linii, rozmiary czcionek)
+        self.rendered_region = None  # Obszar SVG (z buforem) narysowany przy ostatnim pełnym renderowaniu
+        self.rerender_after_id = None  # Zaplanowane przerysowanie po przekształceniu widoku
+        self.lod_enabled = True  # Uproszczone rysowanie oddalonych widoków
+        self.detail_level = LOD_FULL  # Poziom szczegółów ostatniego renderowania
+        self.lod_hidden_selection = None  # Zaznaczenie elementów niewidocznych w uproszczonym poziomie
+        self.tile_mode = None  # Rastrowe kafelki: None - automatycznie dla dużych scen, True/False - wymuszone
+        self.tile_renderer: Optional[SvgTileRenderer] = None  # Kafelki z pamięcią podręczną LRU
+        self.tile_items = {}  # (wersja, poziom, tx, ty) -> (canvas_id, obraz) kafelków na canvasie
+        self.progressive_steps: Optional[Iterator[int]] = None  # Niedokończone renderowanie stopniowe
+        self.progressive_after_id = None  # Zaplanowana kolejna porcja renderowania
+        self.progressive_count = 0  # Elementy narysowane przez bieżące renderowanie stopniowe
+        self.pending_selection = None  # (grupa tekstu, ID segmentu) zaznaczenia przywracanego w kolejnych porcjach
+        self.view_target = None  # (skala, pan_x, pan_y) ze zdarzeń czekających na kolejną klatkę
+        self.frame_render_pending = False  # Pełne renderowanie w kolejnej klatce (zmiana rozmiaru)
+        self.frame_after_id = None  # Zaplanowana klatka harmonogramu
+        self.frame_events = 0  # Zdarzenia połączone w zaplanowanej klatce
+        self.scheduler_stats = {'events': 0, 'frames': 0, 'coalesced': 0, 'dropped': 0}
         
         # Interactive elements
         self.interactive_elements: Dict[int, InteractiveElement] = {}
+        self.primitive_elements: Dict[SvgPrimitive, InteractiveElement] = {}  # Narysowane klikalne prymitywy
         self.selected_elements: List[InteractiveElement] = []
         self.hover_element: Optional[InteractiveElement] = None
         
@@ -452,39 +513,84 @@ class EnhancedSVGViewer:
             preserve_viewport: If True, don't reset viewport position
         """
         try:
+            # Zapisz łatki przyrostowe poprzedniego pliku, o ile nie został w międzyczasie wygenerowany od nowa
+            # (przed oczekiwaniem - zapis łatek może dotyczyć tego samego pliku)
+            self.flush_svg_patches()
+            
+            # Plik może być jeszcze zapisywany w tle (SvgDocument.write_async)
+            wait_for_write(svg_path)
             if not os.path.exists(svg_path):
                 self.display_message("SVG file not found", "error")
                 return
                 
             self.current_svg_file = svg_path
+            self.svg_file_mtime = os.stat(svg_path).st_mtime_ns
+            self.svg_document = None
             
             # Read and parse SVG
             with open(svg_path, 'r', encoding='utf-8') as f:
                 self.svg_content = f.read()
+            self.svg_root = None
+            self.svg_model = None
+            self.svg_modified = False
             
             # Parse SVG dimensions and content bounds
             self.parse_svg_metadata()
+            self._reset_loaded_view(preserve_viewport)
             
-            # Clear cache and interactive elements
-            self.render_cache.clear()
-            self.interactive_elements.clear()
-            self.selected_elements.clear()
-            self.needs_full_render = True
+        except Exception as e:
+            self.display_message(f"Error loading SVG: {str(e)}", "error")
+    
+    def load_svg_document(self, document, svg_path: Optional[str] = None, preserve_viewport: bool = False):
+        """Load an in-memory SVG document (SvgDocument from the generator) without the file round trip
+        
+        Args:
+            document: SvgDocument (e.g. generate_interactive_svg(..., return_document=True))
+            svg_path: File the document is written to in the background (None = not written)
+            preserve_viewport: If True, don't reset viewport position
+        """
+        try:
+            self.flush_svg_patches()
             
-            # Only fit to window if we're not preserving viewport
-            if not preserve_viewport:
-                self.fit_to_window()
-            else:
-                # Just render without changing viewport
-                self.render_svg()
+            self.current_svg_file = svg_path
+            self.svg_file_mtime = None
+            self.svg_document = document
+            self.svg_content = None
+            self.svg_root = document.root
+            self.svg_model = None
+            self.svg_modified = False
+            
+            self.parse_svg_metadata(document.root)
+            self._reset_loaded_view(preserve_viewport)
             
         except Exception as e:
             self.display_message(f"Error loading SVG: {str(e)}", "error")
     
-    def parse_svg_metadata(self):
+    def _reset_loaded_view(self, preserve_viewport: bool):
+        """Clear state of the previous document and render the loaded one"""
+        # Clear cache and interactive elements
+        self.cancel_progressive_render()
+        self.cancel_scheduled_frame()
+        self.render_cache.clear()
+        self.interactive_elements.clear()
+        self.primitive_elements.clear()
+        self.lod_hidden_selection = None
+        self.selected_elements.clear()
+        self.needs_full_render = True
+        
+        # Only fit to window if we're not preserving viewport
+        if not preserve_viewport:
+            self.fit_to_window()
+        else:
+            # Just render without changing viewport
+            self.render_svg()
+    
+    def parse_svg_metadata(self, root=None):
         """Parse SVG metadata to get dimensions and bounds"""
         try:
-            root = ET.fromstring(self.svg_content)
+            if root is None:
+                root = ET.fromstring(self.svg_content)
+            self.svg_root = root
             
             # Get SVG dimensions
             width = root.get('width', '800')
@@ -499,6 +605,9 @@ class EnhancedSVGViewer:
             # Calculate actual content bounds by examining all elements
             self.calculate_content_bounds(root)
             
+            # Retained model of primitives (renders reuse it instead of walking the tree)
+            self.svg_model = SvgSceneModel(root)
+            
         except Exception as e:
             print(f"Error parsing SVG metadata: {e}")
             self.original_size = (800, 600)
@@ -560,8 +669,8 @@ class EnhancedSVGViewer:
         else:
             self.svg_bounds = (0, 0, self.original_size[0], self.original_size[1])
     
-    def get_viewport_bounds(self) -> Tuple[float, float, float, float]:
-        """Get current viewport bounds in SVG coordinates with generous buffer"""
+    def get_visible_bounds(self) -> Tuple[float, float, float, float]:
+        """Get the visible part of the canvas in SVG coordinates (no buffer)"""
         canvas_width = max(self.canvas.winfo_width(), 100)  # Minimum width
         canvas_height = max(self.canvas.winfo_height(), 100)  # Minimum height
         
@@ -570,6 +679,11 @@ class EnhancedSVGViewer:
         y1 = (-self.pan_y) / self.scale
         x2 = (canvas_width - self.pan_x) / self.scale
         y2 = (canvas_height - self.pan_y) / self.scale
+        return (x1, y1, x2, y2)
+    
+    def get_viewport_bounds(self) -> Tuple[float, float, float, float]:
+        """Get current viewport bounds in SVG coordinates with generous buffer"""
+        x1, y1, x2, y2 = self.get_visible_bounds()
         
         # Dodaj BARDZO DUŻY bufor (100%) aby zawsze renderować wszystkie elementy w pobliżu
         # To zapobiega znikaniu elementów podczas zoom/pan
@@ -603,7 +717,7 @@ class EnhancedSVGViewer:
     
     def render_svg(self):
         """Render SVG with performance optimizations"""
-        if not self.svg_content:
+        if self.svg_root is None and not self.svg_content:
             return
         
         try:
@@ -615,8 +729,10 @@ class EnhancedSVGViewer:
                 not self.needs_full_render):
                 return
             
+            self.cancel_scheduled_rerender()
             self.render_svg_elements()
-            self.last_render_params = current_params
+            # Skala mogła zostać dopasowana do poziomu kafelków
+            self.last_render_params = (self.scale, self.pan_x, self.pan_y) + current_params[3:]
             self.needs_full_render = False
             
             # Update UI
@@ -627,7 +743,7 @@ class EnhancedSVGViewer:
     
     def render_svg_elements(self):
         """Render SVG elements with viewport culling"""
-        if not self.svg_content:
+        if self.svg_root is None and not self.svg_content:
             return
         
         # Save current selection state BEFORE clearing
@@ -645,81 +761,50 @@ class EnhancedSVGViewer:
             attrs = self.selected_line_element.svg_data.get('attributes', {})
             selected_line_segment_id = attrs.get('data-segment-id') or attrs.get('data-svg-number')
         
-        # Parse SVG
-        try:
-            root = ET.fromstring(self.svg_content)
-        except ET.ParseError as e:
-            self.display_message(f"SVG parse error: {str(e)}", "error")
-            return
+        self.pending_selection = None
+        
+        # Zaznaczenie ukryte przez uproszczony poziom szczegółów wraca po przybliżeniu
+        if self.lod_hidden_selection and not (selected_text_group or selected_line_segment_id):
+            selected_text_group, selected_line_segment_id = self.lod_hidden_selection
+        self.lod_hidden_selection = None
+        
+        # Model sceny (parsowany raz - kolejne renderowania używają gotowych prymitywów)
+        if self.svg_model is None:
+            try:
+                if self.svg_root is None:
+                    self.svg_root = ET.fromstring(self.svg_content)
+                self.svg_model = SvgSceneModel(self.svg_root)
+            except ET.ParseError as e:
+                self.display_message(f"SVG parse error: {str(e)}", "error")
+                return
         
         # Clear canvas and interactive elements
         self.canvas.delete("all")
         self.interactive_elements.clear()
+        self.primitive_elements.clear()
+        self.tile_items.clear()
+        
+        # Kafelki są rysowane na dyskretnych poziomach zoomu - skala widoku dopasowana do poziomu
+        use_tiles = self.use_tiles()
+        if use_tiles:
+            canvas_width = self.canvas.winfo_width() or 800
+            canvas_height = self.canvas.winfo_height() or 600
+            self.scale, self.pan_x, self.pan_y = self.snap_to_tile_level(
+                self.scale, self.pan_x, self.pan_y, (canvas_width / 2, canvas_height / 2))
         
         # Get viewport for culling
-        viewport = self.get_viewport_bounds()
-        elements_rendered = 0
+        view_x1, view_y1, view_x2, view_y2 = self.get_viewport_bounds()
+        self.rendered_scale = self.scale
+        self.rendered_region = (view_x1, view_y1, view_x2, view_y2)
         
-        # Render elements by type with priority
-        element_types = [
-            ('rect', self.render_rectangle),
-            ('line', self.render_line),
-            ('circle', self.render_circle),
-            ('text', self.render_text),
-            ('polyline', self.render_polyline)
-        ]
-        
-        for element_type, render_func in element_types:
-            if elements_rendered >= self.max_elements_per_frame:
-                break
-                
-            elements = self.find_elements(root, element_type)
-            for elem in elements:
-                if elements_rendered >= self.max_elements_per_frame:
-                    break
-                
-                try:
-                    bounds = self.get_element_bounds(elem, element_type)
-                    if bounds and self.is_element_in_viewport(bounds):
-                        canvas_id = render_func(elem)
-                        if canvas_id:
-                            # Parse assignment group from data-assignment-group attribute
-                            assignment_group = elem.get('data-assignment-group', None)
-                            
-                            # TYLKO line, polyline, rect i text są klikalne (segmenty i teksty)
-                            # rect dla structured SVG, circle (kropki, trójkąty) są renderowane ale NIE dodawane do interactive_elements
-                            # Wykluczamy również text elementy z class='segment-label' lub class='text-marker'
-                            is_clickable = element_type in ['line', 'polyline', 'rect', 'text']
-                            
-                            # Dodatkowe filtrowanie dla text - wykluczaj etykiety
-                            if element_type == 'text':
-                                elem_class = elem.get('class', '')
-                                if 'segment-label' in elem_class or 'text-marker' in elem_class:
-                                    is_clickable = False
-                            
-                            if is_clickable:
-                                # Create interactive element
-                                interactive_elem = InteractiveElement(
-                                    element_id=elem.get('id', f"{element_type}_{elements_rendered}"),
-                                    element_type=element_type,
-                                    bounds=bounds,
-                                    canvas_id=canvas_id,
-                                    svg_data={
-                                        'element': elem,
-                                        'content': elem.text or '',
-                                        'attributes': dict(elem.attrib)
-                                    }
-                                )
-                                # Ustaw grupę przypisania jeśli istnieje
-                                if assignment_group:
-                                    interactive_elem.assigned_group = assignment_group
-                                
-                                self.interactive_elements[canvas_id] = interactive_elem
-                            
-                            elements_rendered += 1
-                            
-                except Exception as e:
-                    continue
+        # Poziom szczegółów - w oddalonym widoku łańcuchy stringów / prostokąty falowników zamiast segmentów
+        detail = self.get_detail_level()
+        self.detail_level = detail
+        
+        if use_tiles:
+            elements_rendered = self.render_tiles()
+        else:
+            elements_rendered = self.render_primitives(detail, (view_x1, view_y1, view_x2, view_y2))
         
         # Update scroll region
         self.update_scroll_region()
@@ -728,224 +813,605 @@ class EnhancedSVGViewer:
         self.selected_text_element = None
         self.selected_line_element = None
         
+        if use_tiles:
+            # Zaznaczone elementy jako nakładki wektorowe nad kafelkami
+            for key in (selected_text_group, selected_line_segment_id):
+                if key:
+                    for prim in self.svg_model.primitives_for_key(key):
+                        if self.is_primitive_drawn(prim):
+                            self.ensure_overlay(prim)
+        
         if selected_text_group or selected_line_segment_id:
-            for canvas_id, elem in self.interactive_elements.items():
-                # Restore text selection - dopasuj po assigned_group lub content
-                if selected_text_group and elem.element_type == 'text':
-                    if elem.assigned_group == selected_text_group:
-                        self.selected_text_element = elem
-                        self.set_element_style(elem, 'selected')
-                    elif not elem.assigned_group:
-                        # Fallback: dopasuj po content
-                        if elem.svg_data.get('content', '') == selected_text_group:
-                            self.selected_text_element = elem
-                            self.set_element_style(elem, 'selected')
-                
-                # Restore line selection - dopasuj po data-segment-id
-                if selected_line_segment_id and elem.element_type in ['line', 'polyline']:
-                    attrs = elem.svg_data.get('attributes', {})
-                    seg_id = attrs.get('data-segment-id') or attrs.get('data-svg-number')
-                    if seg_id == selected_line_segment_id:
-                        self.selected_line_element = elem
-                        self.set_element_style(elem, 'selected')
+            self.restore_selection(list(self.interactive_elements.values()),
+                                   selected_text_group, selected_line_segment_id)
+            if self.progressive_steps is not None:
+                # Elementy kolejnych porcji renderowania
+                self.pending_selection = (selected_text_group, selected_line_segment_id)
+        
+        # Zaznaczenia niewidoczne w uproszczonym poziomie - przywróć przy kolejnym renderowaniu
+        if detail != LOD_FULL:
+            hidden_text = selected_text_group if self.selected_text_element is None else None
+            hidden_line = selected_line_segment_id if self.selected_line_element is None else None
+            if hidden_text or hidden_line:
+                self.lod_hidden_selection = (hidden_text, hidden_line)
         
         # Display render info
         self.display_render_info(elements_rendered)
     
-    def find_elements(self, root, tag_name: str):
-        """Find elements with specified tag, ignoring namespace"""
-        elements = []
-        for elem in root.iter():
-            local_tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-            if local_tag == tag_name:
-                elements.append(elem)
-        return elements
-    
-    def get_element_bounds(self, elem, element_type: str) -> Optional[Tuple[float, float, float, float]]:
-        """Get element bounds in SVG coordinates with safety margin"""
-        try:
-            margin = 10  # Bezpieczny margines dla lepszego renderowania
-            
-            if element_type == 'line':
-                x1 = float(elem.get('x1', 0))
-                y1 = float(elem.get('y1', 0))
-                x2 = float(elem.get('x2', 0))
-                y2 = float(elem.get('y2', 0))
-                return (min(x1, x2) - margin, min(y1, y2) - margin, 
-                       max(x1, x2) + margin, max(y1, y2) + margin)
-                
-            elif element_type == 'rect':
-                x = float(elem.get('x', 0))
-                y = float(elem.get('y', 0))
-                w = float(elem.get('width', 0))
-                h = float(elem.get('height', 0))
-                return (x - margin, y - margin, x + w + margin, y + h + margin)
-                
-            elif element_type == 'circle':
-                cx = float(elem.get('cx', 0))
-                cy = float(elem.get('cy', 0))
-                r = float(elem.get('r', 0))
-                return (cx - r - margin, cy - r - margin, 
-                       cx + r + margin, cy + r + margin)
-                
-            elif element_type == 'text':
-                x = float(elem.get('x', 0))
-                y = float(elem.get('y', 0))
-                # Estimate text bounds (rough approximation)
-                text_width = len(elem.text or '') * 8
-                text_height = 16
-                return (x - margin, y - text_height - margin, 
-                       x + text_width + margin, y + margin)
+    def restore_selection(self, elements: List[InteractiveElement], selected_text_group: Optional[str],
+                          selected_line_segment_id: Optional[str]):
+        """Re-select rendered elements matching the selection saved before re-rendering"""
+        for elem in elements:
+            # Restore text selection - dopasuj po assigned_group lub content
+            if selected_text_group and elem.element_type == 'text':
+                if elem.assigned_group == selected_text_group:
+                    self.selected_text_element = elem
+                    self.set_element_style(elem, 'selected')
+                elif not elem.assigned_group:
+                    # Fallback: dopasuj po content
+                    if elem.svg_data.get('content', '') == selected_text_group:
+                        self.selected_text_element = elem
+                        self.set_element_style(elem, 'selected')
             
-            elif element_type == 'polyline':
-                # Parse polyline points
-                points_str = elem.get('points', '')
-                if not points_str:
-                    return None
+            # Restore line selection - dopasuj po data-segment-id
+            if selected_line_segment_id and elem.element_type in ['line', 'polyline']:
+                attrs = elem.svg_data.get('attributes', {})
+                seg_id = attrs.get('data-segment-id') or attrs.get('data-svg-number')
+                if seg_id == selected_line_segment_id:
+                    self.selected_line_element = elem
+                    self.set_element_style(elem, 'selected')
+    
+    def start_progressive_render(self, steps: Iterator[int]) -> int:
+        """Run render steps for at most FRAME_BUDGET_MS now; the rest continues in after_idle chunks.
+        
+        Each step yields the number of canvas items it created. Returns the number created now.
+        """
+        self.cancel_progressive_render()
+        self.progressive_steps = steps
+        self.progressive_count = 0
+        return self._run_progressive_chunk()
+    
+    def cancel_progressive_render(self):
+        """Stop an in-flight progressive render (the view changed or a new render started)"""
+        if self.progressive_after_id is not None:
+            self.parent.after_cancel(self.progressive_after_id)
+            self.progressive_after_id = None
+        self.progressive_steps = None
+        self.pending_selection = None
+    
+    def _run_progressive_chunk(self) -> int:
+        self.progressive_after_id = None
+        deadline = time.perf_counter() + FRAME_BUDGET_MS / 1000
+        created = 0
+        for count in self.progressive_steps:
+            created += count
+            if time.perf_counter() >= deadline:
+                # Reszta w kolejnej porcji - najpierw obsługa zdarzeń i odświeżenie okna
+                self.progressive_count += created
+                self.progressive_after_id = self.parent.after_idle(self._run_progressive_chunk)
+                return created
+        self.progressive_count += created
+        finished_later = self.progressive_count != created
+        self.progressive_steps = None
+        self.pending_selection = None
+        if finished_later:
+            self.update_scroll_region()
+            self.canvas.delete("ui_info")
+            self.display_render_info(len(self.tile_items) if self.tile_items else self.progressive_count)
+        return created
+    
+    def render_primitives(self, detail: str, viewport: Tuple[float, float, float, float]) -> int:
+        """Render model primitives in the viewport progressively; returns the number of items created now"""
+        return self.start_progressive_render(self.iter_render_primitives(detail, viewport))
+    
+    def iter_render_primitives(self, detail: str, viewport: Tuple[float, float, float, float]) -> Iterator[int]:
+        """Create canvas items of primitives in the viewport one step at a time.
+        
+        Primitives intersecting the visible area come first (in drawing order), then those in the
+        viewport buffer; the latter are lowered below items of later layers to keep the stacking order.
+        """
+        view_x1, view_y1, view_x2, view_y2 = viewport
+        visible_x1, visible_y1, visible_x2, visible_y2 = self.get_visible_bounds()
+        elements_rendered = 0
+        
+        # Render elements by type with priority (kolejność prymitywów w modelu - RENDER_ORDER)
+        render_funcs = self.get_render_funcs()
+        detail_drawn = detail == LOD_FULL
+        min_font_size = LOD_MIN_TEXT_PX / self.scale if self.lod_enabled else 0
+        
+        # Odrzucanie elementów spoza widoku przez indeks przestrzenny, widoczne najpierw
+        visible = []
+        buffered = []
+        for prim in self.svg_model.query(view_x1, view_y1, view_x2, view_y2):
+            x1, y1, x2, y2 = prim.bounds
+            if x2 < visible_x1 or x1 > visible_x2 or y2 < visible_y1 or y1 > visible_y2:
+                buffered.append(prim)
+            else:
+                visible.append(prim)
+        
+        layer_first = {}  # typ -> pierwszy element canvasu warstwy narysowany w widocznym obszarze
+        for pass_primitives, lower in ((visible, False), (buffered, True)):
+            if lower:
+                if not detail_drawn:
+                    yield self.render_detail_level(detail, viewport)
+                    detail_drawn = True
+                # Element bufora trafia pod pierwszy element późniejszych warstw
+                lod_items = self.canvas.find_withtag(LOD_TAG)[:1] if detail != LOD_FULL else ()
+                below = {}
+                for i, kind in enumerate(RENDER_ORDER):
+                    later = [layer_first[k] for k in RENDER_ORDER[i + 1:] if k in layer_first]
+                    if kind == 'rect':
+                        later.extend(lod_items)
+                    below[kind] = min(later) if later else None
+            
+            for prim in pass_primitives:
+                if elements_rendered >= self.max_elements_per_frame:
+                    return
                 
-                coords = []
-                points = points_str.replace(',', ' ').split()
-                for i in range(0, len(points) - 1, 2):
-                    try:
-                        x, y = float(points[i]), float(points[i + 1])
-                        coords.append((x, y))
-                    except (ValueError, IndexError):
+                kind = prim.kind
+                if not detail_drawn and kind != 'rect':
+                    # Uproszczone elementy w miejscu linii w kolejności rysowania
+                    yield self.render_detail_level(detail, viewport)
+                    detail_drawn = True
+                if detail != LOD_FULL:
+                    if kind in ('line', 'polyline'):
+                        continue
+                    if kind == 'circle' and prim.geometry[2] * self.scale < LOD_MIN_DOT_PX:
                         continue
+                if kind == 'text' and prim.font_size < min_font_size:
+                    continue
                 
-                if not coords:
-                    return None
+                canvas_id = render_funcs[kind](prim)
+                if not canvas_id:
+                    continue
+                if lower:
+                    if below[kind] is not None:
+                        self.canvas.tag_lower(canvas_id, below[kind])
+                else:
+                    layer_first.setdefault(kind, canvas_id)
                 
-                xs = [c[0] for c in coords]
-                ys = [c[1] for c in coords]
-                return (min(xs) - margin, min(ys) - margin, 
-                       max(xs) + margin, max(ys) + margin)
+                # TYLKO line, polyline, rect i text są klikalne (segmenty i teksty) - bez etykiet segmentów
+                if prim.clickable:
+                    element = self.register_element(prim, canvas_id, elements_rendered)
+                    if self.pending_selection:
+                        self.restore_selection([element], *self.pending_selection)
                 
-        except (ValueError, TypeError):
-            return None
+                elements_rendered += 1
+                yield 1
+    
+    def get_render_funcs(self) -> Dict[str, Callable[[SvgPrimitive], Optional[int]]]:
+        """Render method for each primitive kind"""
+        return {
+            'rect': self.render_rectangle,
+            'line': self.render_line,
+            'circle': self.render_circle,
+            'text': self.render_text,
+            'polyline': self.render_polyline
+        }
+    
+    def register_element(self, prim: SvgPrimitive, canvas_id: int, index: int) -> InteractiveElement:
+        """Create the interactive element of a rendered clickable primitive"""
+        interactive_elem = InteractiveElement(
+            element_id=prim.attributes.get('id', f"{prim.kind}_{index}"),
+            element_type=prim.kind,
+            bounds=prim.bounds,
+            canvas_id=canvas_id,
+            svg_data={
+                'element': prim.element,
+                'primitive': prim,
+                'content': prim.text,
+                'attributes': prim.attributes
+            }
+        )
+        # Ustaw grupę przypisania jeśli istnieje
+        if prim.assignment_group:
+            interactive_elem.assigned_group = prim.assignment_group
         
-        return None
+        self.interactive_elements[canvas_id] = interactive_elem
+        self.primitive_elements[prim] = interactive_elem
+        return interactive_elem
     
-    def render_line(self, elem) -> Optional[int]:
-        """Render line element"""
-        try:
-            x1 = float(elem.get('x1', 0))
-            y1 = float(elem.get('y1', 0))
-            x2 = float(elem.get('x2', 0))
-            y2 = float(elem.get('y2', 0))
-            
-            canvas_x1, canvas_y1 = self.transform_point(x1, y1)
-            canvas_x2, canvas_y2 = self.transform_point(x2, y2)
-            
-            stroke = elem.get('stroke', self.colors['line'])
-            stroke_width = max(float(elem.get('stroke-width', 1)) * self.scale, 1)
-            
-            return self.canvas.create_line(
-                canvas_x1, canvas_y1, canvas_x2, canvas_y2,
-                fill=stroke, width=stroke_width, capstyle=tk.ROUND,
-                tags="interactive"
-            )
-            
-        except (ValueError, TypeError):
-            return None
+    def use_tiles(self) -> bool:
+        """Whether the scene is shown as raster tiles (large scenes, unless tile_mode is forced)"""
+        if self.svg_model is None:
+            return False
+        if self.tile_mode is None:
+            return len(self.svg_model) >= TILE_MODE_MIN_PRIMITIVES
+        return self.tile_mode
     
-    def render_rectangle(self, elem) -> Optional[int]:
-        """Render rectangle element"""
-        try:
-            x = float(elem.get('x', 0))
-            y = float(elem.get('y', 0))
-            width = float(elem.get('width', 0))
-            height = float(elem.get('height', 0))
-            
-            canvas_x1, canvas_y1 = self.transform_point(x, y)
-            canvas_x2, canvas_y2 = self.transform_point(x + width, y + height)
-            
-            fill = elem.get('fill', 'white')
-            stroke = elem.get('stroke', 'black')
-            stroke_width = max(float(elem.get('stroke-width', 1)) * self.scale, 1)
-            
-            return self.canvas.create_rectangle(
-                canvas_x1, canvas_y1, canvas_x2, canvas_y2,
-                fill=fill, outline=stroke, width=stroke_width,
-                tags="interactive"
+    def get_tile_renderer(self) -> SvgTileRenderer:
+        """Tile renderer of the current scene model (created on first use)"""
+        if self.tile_renderer is None or self.tile_renderer.model is not self.svg_model:
+            from src.core import config
+            self.tile_renderer = SvgTileRenderer(
+                self.svg_model, self.colors, self.get_detail_level, make_photo=ImageTk.PhotoImage,
+                min_text_px=LOD_MIN_TEXT_PX if self.lod_enabled else 0, min_dot_px=LOD_MIN_DOT_PX,
+                inverter_color=getattr(config, 'ASSIGNED_SEGMENT_COLOR', self.colors['line']),
+                inverter_label_px=LOD_INVERTER_LABEL_PX
             )
-            
-        except (ValueError, TypeError):
-            return None
+        return self.tile_renderer
     
-    def render_circle(self, elem) -> Optional[int]:
-        """Render circle element"""
-        try:
-            cx = float(elem.get('cx', 0))
-            cy = float(elem.get('cy', 0))
-            r = max(float(elem.get('r', 0)) * self.scale, 2)
-            
-            canvas_cx, canvas_cy = self.transform_point(cx, cy)
-            
-            fill = elem.get('fill', 'white')
-            stroke = elem.get('stroke', 'black')
-            
-            return self.canvas.create_oval(
-                canvas_cx - r, canvas_cy - r, canvas_cx + r, canvas_cy + r,
-                fill=fill, outline=stroke, tags="interactive"
-            )
-            
-        except (ValueError, TypeError):
-            return None
+    def snap_to_tile_level(self, scale: float, pan_x: float, pan_y: float,
+                           anchor: Optional[Tuple[float, float]] = None) -> Tuple[float, float, float]:
+        """Snap a requested view to the nearest tile zoom level.
+        
+        The canvas point the zoom is anchored at (given, or derived from the change of the current
+        view) stays in place.
+        """
+        snapped = level_scale(zoom_level(scale))
+        if snapped == scale:
+            return scale, pan_x, pan_y
+        if anchor is None:
+            factor = scale / self.scale
+            if factor == 1.0:
+                return snapped, pan_x, pan_y
+            # pan' = c - (c - pan) * factor  =>  punkt zakotwiczenia c
+            anchor_x = (pan_x - self.pan_x * factor) / (1 - factor)
+            anchor_y = (pan_y - self.pan_y * factor) / (1 - factor)
+            base_scale, base_x, base_y = self.scale, self.pan_x, self.pan_y
+        else:
+            anchor_x, anchor_y = anchor
+            base_scale, base_x, base_y = scale, pan_x, pan_y
+        factor = snapped / base_scale
+        return snapped, anchor_x - (anchor_x - base_x) * factor, anchor_y - (anchor_y - base_y) * factor
     
-    def render_text(self, elem) -> Optional[int]:
-        """Render text element"""
-        try:
-            x = float(elem.get('x', 0))
-            y = float(elem.get('y', 0))
-            
-            canvas_x, canvas_y = self.transform_point(x, y)
-            
-            fill = elem.get('fill', self.colors['text'])
-            font_size = max(int(float(elem.get('font-size', 12)) * self.scale), 8)
-            text_content = elem.text or ''
-            
-            # Don't truncate text as much - let users see more
-            if len(text_content) > 50:
-                text_content = text_content[:47] + "..."
-            
-            return self.canvas.create_text(
-                canvas_x, canvas_y, text=text_content,
-                fill=fill, font=("Arial", font_size), anchor="w",
-                tags="interactive"
-            )
-            
-        except (ValueError, TypeError):
-            return None
+    def render_tiles(self) -> int:
+        """Place raster tiles covering the visible area; tiles already on the canvas are kept.
+        
+        Cached tiles are placed at once, missing ones are drawn progressively from the centre of the view.
+        Returns the number of tiles on the canvas.
+        """
+        renderer = self.get_tile_renderer()
+        level = zoom_level(self.scale)
+        canvas_width = self.canvas.winfo_width() or 800
+        canvas_height = self.canvas.winfo_height() or 600
+        
+        # Piksele poziomu = współrzędne canvasu bez przesunięcia (skala widoku = skala poziomu)
+        tx1, ty1, tx2, ty2 = renderer.tile_range(level, -self.pan_x, -self.pan_y,
+                                                 canvas_width - self.pan_x, canvas_height - self.pan_y)
+        visible = set()
+        missing = []
+        placed = False
+        for ty in range(ty1, ty2 + 1):
+            for tx in range(tx1, tx2 + 1):
+                key = (renderer.version, level, tx, ty)
+                visible.add(key)
+                if key in self.tile_items:
+                    continue
+                photo = renderer.cached_tile(level, tx, ty)
+                if photo is None:
+                    missing.append(key)
+                else:
+                    self.place_tile(key, photo)
+                    placed = True
+        
+        for key in [key for key in self.tile_items if key not in visible]:
+            self.canvas.delete(self.tile_items.pop(key)[0])
+        if placed:
+            # Nakładki wektorowe nad kafelkami
+            self.canvas.tag_lower(TILE_TAG)
+        
+        # Brakujące kafelki od środka widoku
+        center_x = (canvas_width / 2 - self.pan_x) / TILE_SIZE - 0.5
+        center_y = (canvas_height / 2 - self.pan_y) / TILE_SIZE - 0.5
+        missing.sort(key=lambda key: (key[2] - center_x) ** 2 + (key[3] - center_y) ** 2)
+        self.start_progressive_render(self.iter_render_tiles(missing))
+        return len(self.tile_items)
     
-    def render_polyline(self, elem) -> Optional[int]:
-        """Render polyline element"""
-        try:
-            points_str = elem.get('points', '')
-            if not points_str:
-                return None
-            
-            # Parse points
-            coords = []
-            points = points_str.replace(',', ' ').split()
-            for i in range(0, len(points) - 1, 2):
-                x, y = float(points[i]), float(points[i + 1])
-                canvas_x, canvas_y = self.transform_point(x, y)
-                coords.extend([canvas_x, canvas_y])
-            
-            if len(coords) < 4:  # Need at least 2 points
-                return None
-            
-            stroke = elem.get('stroke', self.colors['line'])
-            stroke_width = max(float(elem.get('stroke-width', 1)) * self.scale, 1)
-            fill = elem.get('fill', '')
-            
-            return self.canvas.create_line(
-                *coords, fill=stroke, width=stroke_width,
-                smooth=False, tags="interactive"
+    def iter_render_tiles(self, keys: List[Tuple[int, int, int, int]]) -> Iterator[int]:
+        """Draw and place missing tiles one at a time"""
+        renderer = self.get_tile_renderer()
+        for key in keys:
+            _, level, tx, ty = key
+            self.place_tile(key, renderer.render_tile(level, tx, ty))
+            self.canvas.tag_lower(TILE_TAG)
+            yield 1
+    
+    def place_tile(self, key: Tuple[int, int, int, int], photo: Any):
+        """Create the canvas image of a tile at its position in the current view"""
+        _, level, tx, ty = key
+        canvas_id = self.canvas.create_image(
+            tx * TILE_SIZE + self.pan_x, ty * TILE_SIZE + self.pan_y,
+            image=photo, anchor='nw', tags=(SCENE_TAG, TILE_TAG)
+        )
+        # Referencja do obrazu - kafelek usunięty z pamięci podręcznej zostaje widoczny
+        self.tile_items[key] = (canvas_id, photo)
+    
+    def is_primitive_drawn(self, prim: SvgPrimitive) -> bool:
+        """Whether a clickable primitive is drawn at the current level of detail (tile mode hit-testing)"""
+        if not prim.clickable:
+            return False
+        if self.detail_level != LOD_FULL and prim.kind in ('line', 'polyline'):
+            return False
+        if prim.kind == 'text' and self.lod_enabled and prim.font_size * self.scale < LOD_MIN_TEXT_PX:
+            return False
+        return True
+    
+    def ensure_overlay(self, prim: SvgPrimitive) -> InteractiveElement:
+        """Interactive element of a primitive drawn in tiles - a vector overlay item created on demand"""
+        element = self.primitive_elements.get(prim)
+        if element is None:
+            canvas_id = self.get_render_funcs()[prim.kind](prim)
+            element = self.register_element(prim, canvas_id, prim.order)
+        return element
+    
+    def prune_overlays(self):
+        """Remove vector overlays of the tile mode that are not selected or highlighted"""
+        keep = set(self.selected_elements) | set(self.hovered_group_elements)
+        keep.update(elem for elem in (self.hover_element, self.selected_text_element, self.selected_line_element)
+                    if elem is not None)
+        for prim, element in list(self.primitive_elements.items()):
+            if element not in keep:
+                self.canvas.delete(element.canvas_id)
+                del self.interactive_elements[element.canvas_id]
+                del self.primitive_elements[prim]
+    
+    def get_detail_level(self, scale: Optional[float] = None) -> str:
+        """Choose the level of detail from the on-screen size of a typical segment and string"""
+        if scale is None:
+            scale = self.scale
+        if not self.lod_enabled or self.svg_model is None:
+            return LOD_FULL
+        levels = self.svg_model.detail_levels
+        if not levels.chains:
+            return LOD_FULL
+        if levels.inverter_boxes and levels.median_string_size * scale < LOD_STRING_PX:
+            return LOD_INVERTERS
+        if levels.median_segment_length * scale < LOD_SEGMENT_PX:
+            return LOD_STRINGS
+        return LOD_FULL
+    
+    def render_detail_level(self, detail: str, viewport: Tuple[float, float, float, float]) -> int:
+        """Render simplified items of a zoomed-out view; returns the number of items created"""
+        if detail == LOD_FULL:
+            return 0
+        from src.core import config
+        
+        levels = self.svg_model.detail_levels
+        view_x1, view_y1, view_x2, view_y2 = viewport
+        scale, pan_x, pan_y = self.scale, self.pan_x, self.pan_y
+        count = 0
+        
+        # Łańcuchy segmentów - jeden element na string (w poziomie falowników tylko nieprzypisane)
+        for chain in levels.chains:
+            if detail == LOD_INVERTERS and chain.group:
+                continue
+            x1, y1, x2, y2 = chain.bounds
+            if x2 < view_x1 or x1 > view_x2 or y2 < view_y1 or y1 > view_y2:
+                continue
+            coords = [v * scale + (pan_x if i % 2 == 0 else pan_y) for i, v in enumerate(chain.coords)]
+            stroke = chain.stroke if chain.stroke is not None else self.colors['line']
+            self.canvas.create_line(
+                *coords, fill=stroke, width=max(chain.stroke_width * scale, 1),
+                capstyle=tk.ROUND, tags=(SCENE_TAG, LOD_TAG)
             )
-            
-        except (ValueError, TypeError):
-            return None
+            count += 1
+        
+        # Prostokąty falowników (grupowanie jak w strukturalnym SVG)
+        if detail == LOD_INVERTERS:
+            color = getattr(config, 'ASSIGNED_SEGMENT_COLOR', self.colors['line'])
+            for inverter_id, (x1, y1, x2, y2) in levels.inverter_boxes.items():
+                if x2 < view_x1 or x1 > view_x2 or y2 < view_y1 or y1 > view_y2:
+                    continue
+                canvas_x1, canvas_y1 = self.transform_point(x1, y1)
+                canvas_x2, canvas_y2 = self.transform_point(x2, y2)
+                self.canvas.create_rectangle(
+                    canvas_x1, canvas_y1, canvas_x2, canvas_y2,
+                    fill='', outline=color, width=1, tags=(SCENE_TAG, LOD_TAG)
+                )
+                count += 1
+                if canvas_x2 - canvas_x1 >= LOD_INVERTER_LABEL_PX:
+                    self.canvas.create_text(
+                        canvas_x1, canvas_y1, text=inverter_id, fill=color,
+                        font=("Arial", 8), anchor="sw", tags=(SCENE_TAG, LOD_TAG)
+                    )
+                    count += 1
+        
+        return count
+    
+    def render_line(self, prim: SvgPrimitive) -> Optional[int]:
+        """Render line primitive"""
+        x1, y1, x2, y2 = prim.geometry
+        scale, pan_x, pan_y = self.scale, self.pan_x, self.pan_y
+        
+        stroke = prim.stroke if prim.stroke is not None else self.colors['line']
+        stroke_width = max(prim.stroke_width * scale, 1)
+        
+        return self.canvas.create_line(
+            x1 * scale + pan_x, y1 * scale + pan_y, x2 * scale + pan_x, y2 * scale + pan_y,
+            fill=stroke, width=stroke_width, capstyle=tk.ROUND,
+            tags=SCENE_TAG
+        )
+    
+    def render_rectangle(self, prim: SvgPrimitive) -> Optional[int]:
+        """Render rectangle primitive"""
+        x1, y1, x2, y2 = prim.geometry
+        canvas_x1, canvas_y1 = self.transform_point(x1, y1)
+        canvas_x2, canvas_y2 = self.transform_point(x2, y2)
+        
+        fill = prim.fill if prim.fill is not None else 'white'
+        stroke = prim.stroke if prim.stroke is not None else 'black'
+        stroke_width = max(prim.stroke_width * self.scale, 1)
+        
+        return self.canvas.create_rectangle(
+            canvas_x1, canvas_y1, canvas_x2, canvas_y2,
+            fill=fill, outline=stroke, width=stroke_width,
+            tags=SCENE_TAG
+        )
+    
+    def render_circle(self, prim: SvgPrimitive) -> Optional[int]:
+        """Render circle primitive"""
+        cx, cy, r = prim.geometry
+        r = max(r * self.scale, 2)
+        canvas_cx, canvas_cy = self.transform_point(cx, cy)
+        
+        fill = prim.fill if prim.fill is not None else 'white'
+        stroke = prim.stroke if prim.stroke is not None else 'black'
+        
+        return self.canvas.create_oval(
+            canvas_cx - r, canvas_cy - r, canvas_cx + r, canvas_cy + r,
+            fill=fill, outline=stroke, tags=SCENE_TAG
+        )
+    
+    def render_text(self, prim: SvgPrimitive) -> Optional[int]:
+        """Render text primitive"""
+        canvas_x, canvas_y = self.transform_point(*prim.geometry)
+        
+        fill = prim.fill if prim.fill is not None else self.colors['text']
+        font_size = max(int(prim.font_size * self.scale), 8)
+        
+        # Don't truncate text as much - let users see more (prim.label - skrócony do MAX_TEXT_LENGTH)
+        return self.canvas.create_text(
+            canvas_x, canvas_y, text=prim.label,
+            fill=fill, font=("Arial", font_size), anchor="w",
+            tags=SCENE_TAG
+        )
+    
+    def render_polyline(self, prim: SvgPrimitive) -> Optional[int]:
+        """Render polyline primitive"""
+        scale, pan_x, pan_y = self.scale, self.pan_x, self.pan_y
+        coords = [v * scale + (pan_x if i % 2 == 0 else pan_y) for i, v in enumerate(prim.geometry)]
+        
+        stroke = prim.stroke if prim.stroke is not None else self.colors['line']
+        stroke_width = max(prim.stroke_width * scale, 1)
+        
+        return self.canvas.create_line(
+            *coords, fill=stroke, width=stroke_width,
+            smooth=False, tags=SCENE_TAG
+        )
+    
+    def transform_view(self, scale: float, pan_x: float, pan_y: float):
+        """Move the view by transforming existing canvas items (canvas.scale/move) instead of re-creating them.
+        
+        Line widths, font sizes and culling stay as rendered; a full re-render is scheduled only when
+        they need refreshing (zoom changed, or the visible area left the rendered region).
+        """
+        if self.last_render_params is None or self.rendered_scale is None:
+            # Nic nie narysowano - zwykłe renderowanie
+            self.scale, self.pan_x, self.pan_y = scale, pan_x, pan_y
+            self.needs_full_render = True
+            self.render_svg()
+            return
+        
+        # Porcje renderowania stopniowego rysowałyby według poprzedniego widoku
+        interrupted = self.progressive_steps is not None
+        self.cancel_progressive_render()
+        
+        if self.tile_items:
+            # Kafelki: zoom do sąsiedniego poziomu układa kafelki z pamięci podręcznej od razu,
+            # przesunięcie przesuwa kafelki i dokłada odsłonięte
+            scale, pan_x, pan_y = self.snap_to_tile_level(scale, pan_x, pan_y)
+            if scale != self.scale:
+                self.scale, self.pan_x, self.pan_y = scale, pan_x, pan_y
+                self.needs_full_render = True
+                self.render_svg()
+                return
+            dx, dy = pan_x - self.pan_x, pan_y - self.pan_y
+            if dx or dy:
+                self.canvas.move(SCENE_TAG, dx, dy)
+            self.pan_x, self.pan_y = pan_x, pan_y
+            self.render_tiles()
+            self.last_render_params = (self.scale, self.pan_x, self.pan_y,
+                                       self.canvas.winfo_width(), self.canvas.winfo_height())
+            return
+        
+        # Współrzędne canvasu: c' = c * factor + (pan' - pan * factor)
+        factor = scale / self.scale
+        if factor != 1.0:
+            self.canvas.scale(SCENE_TAG, 0, 0, factor, factor)
+        dx = pan_x - self.pan_x * factor
+        dy = pan_y - self.pan_y * factor
+        if dx or dy:
+            self.canvas.move(SCENE_TAG, dx, dy)
+        self.scale, self.pan_x, self.pan_y = scale, pan_x, pan_y
+        self.update_zoom_label()
+        
+        if interrupted or self.view_needs_rerender():
+            self.schedule_rerender()
+    
+    def view_needs_rerender(self) -> bool:
+        """Check whether transformed items are stale (zoom changed widths/fonts or view left the rendered region)"""
+        if self.rendered_scale is None or self.rendered_region is None:
+            return True
+        if self.scale != self.rendered_scale:
+            return True
+        view_x1, view_y1, view_x2, view_y2 = self.get_visible_bounds()
+        region_x1, region_y1, region_x2, region_y2 = self.rendered_region
+        return (view_x1 < region_x1 or view_y1 < region_y1 or
+                view_x2 > region_x2 or view_y2 > region_y2)
+    
+    def schedule_rerender(self):
+        """(Re)schedule a full re-render after RERENDER_DELAY_MS without view changes"""
+        self.cancel_scheduled_rerender()
+        self.rerender_after_id = self.parent.after(RERENDER_DELAY_MS, self._scheduled_rerender)
+    
+    def cancel_scheduled_rerender(self):
+        """Cancel a pending scheduled re-render"""
+        if self.rerender_after_id is not None:
+            self.parent.after_cancel(self.rerender_after_id)
+            self.rerender_after_id = None
+    
+    def _scheduled_rerender(self):
+        self.rerender_after_id = None
+        self.needs_full_render = True
+        self.render_svg()
+    
+    def get_view(self) -> Tuple[float, float, float]:
+        """Current view (scale, pan_x, pan_y) including input waiting for the next frame"""
+        if self.view_target is not None:
+            return self.view_target
+        return self.scale, self.pan_x, self.pan_y
+    
+    def request_view(self, scale: float, pan_x: float, pan_y: float):
+        """Queue a view change from an input event; a burst of events is applied once per frame"""
+        self.scheduler_stats['events'] += 1
+        if (scale, pan_x, pan_y) == self.get_view():
+            # Zdarzenie bez zmiany widoku (np. zoom na granicy zakresu)
+            self.scheduler_stats['dropped'] += 1
+            return
+        self.view_target = (scale, pan_x, pan_y)
+        self._schedule_frame()
+    
+    def request_render(self):
+        """Queue a full render (canvas resize); a burst of requests gives one render per frame"""
+        self.scheduler_stats['events'] += 1
+        self.frame_render_pending = True
+        self._schedule_frame()
+    
+    def _schedule_frame(self):
+        self.frame_events += 1
+        if self.frame_after_id is not None:
+            self.scheduler_stats['coalesced'] += 1
+            return
+        self.frame_after_id = self.parent.after(FRAME_MS, self._run_frame)
+    
+    def cancel_scheduled_frame(self):
+        """Drop queued input (the view is being set directly, e.g. fit to window or a new document)"""
+        if self.frame_after_id is not None:
+            self.parent.after_cancel(self.frame_after_id)
+            self.frame_after_id = None
+        self.scheduler_stats['dropped'] += self.frame_events
+        self.frame_events = 0
+        self.view_target = None
+        self.frame_render_pending = False
+    
+    def _run_frame(self):
+        """Apply input queued during the frame - a transformed preview, or a full render after a resize"""
+        self.frame_after_id = None
+        self.frame_events = 0
+        self.scheduler_stats['frames'] += 1
+        target, self.view_target = self.view_target, None
+        render, self.frame_render_pending = self.frame_render_pending, False
+        if render:
+            if target is not None:
+                self.scale, self.pan_x, self.pan_y = target
+            self.render_svg()
+        elif target is not None:
+            self.transform_view(*target)
+    
+    def get_scheduler_stats(self) -> Dict[str, int]:
+        """Counts of input events: received, frames applied, coalesced into a pending frame, dropped"""
+        return dict(self.scheduler_stats)
     
     # Event handlers
     def on_mouse_wheel(self, event):
@@ -954,8 +1420,10 @@ class EnhancedSVGViewer:
         mouse_x = event.x
         mouse_y = event.y
         
-        # Convert to SVG coordinates before zoom
-        svg_x, svg_y = self.inverse_transform_point(mouse_x, mouse_y)
+        # Convert to SVG coordinates before zoom (widok z uwzględnieniem zdarzeń czekających na klatkę)
+        scale, pan_x, pan_y = self.get_view()
+        svg_x = (mouse_x - pan_x) / scale
+        svg_y = (mouse_y - pan_y) / scale
         
         # Determine zoom direction
         if event.delta > 0 or event.num == 4:  # Zoom in
@@ -964,19 +1432,36 @@ class EnhancedSVGViewer:
             factor = 0.8
         
         # Calculate new scale with limits
-        new_scale = self.scale * factor
+        new_scale = scale * factor
         new_scale = max(0.05, min(new_scale, 20.0))  # Wider zoom range
         
-        if new_scale != self.scale:
-            # Update scale
-            self.scale = new_scale
-            
-            # Adjust pan to keep the same SVG point under the mouse
-            self.pan_x = mouse_x - svg_x * self.scale
-            self.pan_y = mouse_y - svg_y * self.scale
-            
-            self.needs_full_render = True
-            self.render_svg()
+        # Adjust pan to keep the same SVG point under the mouse
+        self.request_view(new_scale, mouse_x - svg_x * new_scale, mouse_y - svg_y * new_scale)
+    
+    def find_element_at(self, canvas_x: float, canvas_y: float) -> Optional[InteractiveElement]:
+        """Find the interactive element under a canvas point using the spatial index.
+        
+        Returns the nearest rendered element within HIT_HALO pixels (ties go to the element drawn first).
+        """
+        if self.svg_model is None:
+            return None
+        svg_x, svg_y = self.inverse_transform_point(canvas_x, canvas_y)
+        
+        if self.tile_items:
+            # Kafelki nie mają elementów canvasu - trafiony prymityw dostaje nakładkę wektorową
+            prim = self.svg_model.find_at(svg_x, svg_y, self.scale, HIT_RADII, HIT_HALO,
+                                          accept=self.is_primitive_drawn)
+            if prim is None:
+                return None
+            if prim not in self.primitive_elements and len(self.primitive_elements) >= OVERLAY_LIMIT:
+                self.prune_overlays()
+            return self.ensure_overlay(prim)
+        
+        if not self.primitive_elements:
+            return None
+        prim = self.svg_model.find_at(svg_x, svg_y, self.scale, HIT_RADII, HIT_HALO,
+                                      accept=self.primitive_elements.__contains__)
+        return self.primitive_elements[prim] if prim is not None else None
     
     def on_mouse_press(self, event):
         """Handle mouse press for assignment mode using canvas coordinate system"""
@@ -990,31 +1475,8 @@ class EnhancedSVGViewer:
         # DEBUG: Odkomentuj poniższą linię żeby debugować kliknięcia
         # print(f"Click: widget({event.x}, {event.y}) -> canvas({canvas_x}, {canvas_y})")
         
-        # Try to find elements in increasingly larger areas
-        clicked_element = None
-        
-        # First try: small area around click
-        items = self.canvas.find_overlapping(canvas_x - 3, canvas_y - 3, 
-                                             canvas_x + 3, canvas_y + 3)
-        for item in items:
-            if item in self.interactive_elements:
-                clicked_element = self.interactive_elements[item]
-                break
-        
-        # Second try: larger area if nothing found
-        if not clicked_element:
-            items = self.canvas.find_overlapping(canvas_x - 10, canvas_y - 10, 
-                                                 canvas_x + 10, canvas_y + 10)
-            for item in items:
-                if item in self.interactive_elements:
-                    clicked_element = self.interactive_elements[item]
-                    break
-        
-        # Third try: use find_closest as fallback
-        if not clicked_element:
-            closest = self.canvas.find_closest(canvas_x, canvas_y, halo=15)
-            if closest and closest[0] in self.interactive_elements:
-                clicked_element = self.interactive_elements[closest[0]]
+        # Element pod kursorem z indeksu przestrzennego
+        clicked_element = self.find_element_at(canvas_x, canvas_y)
         
         if clicked_element:
             self.handle_element_click(clicked_element)
@@ -1031,12 +1493,9 @@ class EnhancedSVGViewer:
         if abs(dx) > self.drag_threshold or abs(dy) > self.drag_threshold:
             self.is_dragging = True
             
-            # Pan the view
-            self.pan_x += dx
-            self.pan_y += dy
-            
-            self.needs_full_render = True
-            self.render_svg()
+            # Pan the view (przesunięcie istniejących elementów w kolejnej klatce)
+            scale, pan_x, pan_y = self.get_view()
+            self.request_view(scale, pan_x + dx, pan_y + dy)
             
         self.last_click_pos = (event.x, event.y)
     
@@ -1066,7 +1525,7 @@ class EnhancedSVGViewer:
     
     def on_mouse_motion(self, event):
         """Handle mouse motion for hover effects using canvas coordinate system"""
-        if not self.interactive_elements:
+        if not self.interactive_elements and not self.tile_items:
             return
         
         # Convert widget coordinates to canvas coordinates (accounts for scrolling)
@@ -1076,36 +1535,8 @@ class EnhancedSVGViewer:
         # DEBUG: Odkomentuj poniższe linie żeby debugować współrzędne
         # print(f"Mouse: widget({event.x}, {event.y}) -> canvas({canvas_x}, {canvas_y})")
         
-        # Try to find elements in increasingly larger areas
-        found_element = None
-        
-        # First try: small area around cursor
-        items = self.canvas.find_overlapping(canvas_x - 3, canvas_y - 3, 
-                                             canvas_x + 3, canvas_y + 3)
-        # print(f"  Small area: {len(items)} items, interactive: {sum(1 for i in items if i in self.interactive_elements)}")
-        for item in items:
-            if item in self.interactive_elements:
-                found_element = self.interactive_elements[item]
-                # print(f"  Found: {found_element.element_type} id={found_element.element_id}")
-                break
-        
-        # Second try: larger area if nothing found
-        if not found_element:
-            items = self.canvas.find_overlapping(canvas_x - 10, canvas_y - 10, 
-                                                 canvas_x + 10, canvas_y + 10)
-            # print(f"  Large area: {len(items)} items, interactive: {sum(1 for i in items if i in self.interactive_elements)}")
-            for item in items:
-                if item in self.interactive_elements:
-                    found_element = self.interactive_elements[item]
-                    # print(f"  Found: {found_element.element_type} id={found_element.element_id}")
-                    break
-        
-        # Third try: use find_closest as fallback
-        if not found_element:
-            closest = self.canvas.find_closest(canvas_x, canvas_y, halo=15)
-            if closest and closest[0] in self.interactive_elements:
-                found_element = self.interactive_elements[closest[0]]
-                # print(f"  Closest: {found_element.element_type} id={found_element.element_id}")
+        # Element pod kursorem z indeksu przestrzennego
+        found_element = self.find_element_at(canvas_x, canvas_y)
         
         # Handle hover state
         if found_element:
@@ -1239,6 +1670,12 @@ class EnhancedSVGViewer:
         
         self.hovered_group_elements.clear()
         
+        if self.tile_items:
+            # Elementy grupy narysowane w kafelkach - nakładki wektorowe do podświetlenia
+            for prim in self.svg_model.primitives_for_key(group_id):
+                if prim.assignment_group == group_id and self.is_primitive_drawn(prim):
+                    self.ensure_overlay(prim)
+        
         for canvas_id, elem in self.interactive_elements.items():
             if elem.assigned_group == group_id:
                 self.hovered_group_elements.append(elem)
@@ -1284,7 +1721,12 @@ class EnhancedSVGViewer:
     def on_canvas_configure(self, event):
         """Handle canvas resize"""
         if hasattr(self, 'parent'):
-            self.parent.after_idle(self.render_svg)
+            if self.last_render_params is not None and (event.width, event.height) == self.last_render_params[3:]:
+                # Rozmiar bez zmian (np. tylko przesunięcie okna)
+                self.scheduler_stats['events'] += 1
+                self.scheduler_stats['dropped'] += 1
+                return
+            self.request_render()
     
     # Selection and interaction
     def select_element(self, element: InteractiveElement):
@@ -1364,6 +1806,8 @@ class EnhancedSVGViewer:
             content_height = self.original_size[1]
             content_x1, content_y1 = 0, 0
         
+        self.cancel_scheduled_frame()
+        
         # Calculate scale to fit content with padding
         padding_factor = 0.9  # Leave 10% padding
         scale_x = (canvas_width * padding_factor) / content_width
@@ -1392,17 +1836,14 @@ class EnhancedSVGViewer:
         center_y = canvas_height / 2
         
         # Get SVG point at center
-        svg_x, svg_y = self.inverse_transform_point(center_x, center_y)
+        scale, pan_x, pan_y = self.get_view()
+        svg_x = (center_x - pan_x) / scale
+        svg_y = (center_y - pan_y) / scale
         
         # Update scale
-        new_scale = min(self.scale * 1.5, 20.0)
-        if new_scale != self.scale:
-            self.scale = new_scale
-            # Adjust pan to keep center point fixed
-            self.pan_x = center_x - svg_x * self.scale
-            self.pan_y = center_y - svg_y * self.scale
-            self.needs_full_render = True
-            self.render_svg()
+        new_scale = min(scale * 1.5, 20.0)
+        # Adjust pan to keep center point fixed
+        self.request_view(new_scale, center_x - svg_x * new_scale, center_y - svg_y * new_scale)
     
     def zoom_out(self):
         """Zoom out by fixed factor"""
@@ -1413,20 +1854,18 @@ class EnhancedSVGViewer:
         center_y = canvas_height / 2
         
         # Get SVG point at center
-        svg_x, svg_y = self.inverse_transform_point(center_x, center_y)
+        scale, pan_x, pan_y = self.get_view()
+        svg_x = (center_x - pan_x) / scale
+        svg_y = (center_y - pan_y) / scale
         
         # Update scale
-        new_scale = max(self.scale / 1.5, 0.05)
-        if new_scale != self.scale:
-            self.scale = new_scale
-            # Adjust pan to keep center point fixed
-            self.pan_x = center_x - svg_x * self.scale
-            self.pan_y = center_y - svg_y * self.scale
-            self.needs_full_render = True
-            self.render_svg()
+        new_scale = max(scale / 1.5, 0.05)
+        # Adjust pan to keep center point fixed
+        self.request_view(new_scale, center_x - svg_x * new_scale, center_y - svg_y * new_scale)
     
     def reset_view(self):
         """Reset view to default"""
+        self.cancel_scheduled_frame()
         self.scale = 1.0
         self.pan_x = 0
         self.pan_y = 0
@@ -1466,7 +1905,12 @@ class EnhancedSVGViewer:
         canvas_width = self.canvas.winfo_width() or 800
         canvas_height = self.canvas.winfo_height() or 600
         
-        info_text = f"Elements: {elements_count} | Zoom: {int(self.scale * 100)}%"
+        if self.tile_items:
+            info_text = f"Tiles: {elements_count} | Zoom: {int(self.scale * 100)}%"
+        else:
+            info_text = f"Elements: {elements_count} | Zoom: {int(self.scale * 100)}%"
+        if self.detail_level != LOD_FULL:
+            info_text += f" | LOD: {self.detail_level}"
         
         # Display in bottom-right corner
         self.canvas.create_text(
@@ -1507,17 +1951,112 @@ class EnhancedSVGViewer:
         """Force a complete re-render (for compatibility)"""
         self.refresh()
 
+    def apply_svg_patch(self, changes: Dict[str, List]):
+        """Apply incremental changes of the SVG tree (InteractiveSvgPatcher.sync) to canvas items only.
+
+        Elements outside the viewport have no canvas items - the patched tree is used on the next render.
+        """
+        updated = {id(elem) for elem in changes.get('updated', [])}
+        removed = {id(elem) for elem in changes.get('removed', [])}
+        if updated or removed:
+            self.svg_modified = True
+        if self.svg_model is not None:
+            self.svg_model.apply_changes(changes)
+
+        removed_items = 0
+        for canvas_id, element in list(self.interactive_elements.items()):
+            elem = element.svg_data.get('element')
+            if id(elem) in removed:
+                removed_items += 1
+                self.canvas.delete(canvas_id)
+                del self.interactive_elements[canvas_id]
+                self.primitive_elements.pop(element.svg_data.get('primitive'), None)
+                if element in self.selected_elements:
+                    self.selected_elements.remove(element)
+                if element is self.selected_text_element:
+                    self.selected_text_element = None
+                if element is self.hover_element:
+                    self.hover_element = None
+                continue
+            if id(elem) not in updated:
+                continue
+
+            element.svg_data['content'] = elem.text or ''
+            element.svg_data['attributes'] = dict(elem.attrib)
+            element.assigned_group = elem.get('data-assignment-group', None)
+
+            if element.element_type == 'text':
+                text_content = element.svg_data['content']
+                if len(text_content) > 50:
+                    text_content = text_content[:47] + "..."
+                font_size = max(int(float(elem.get('font-size', 12)) * self.scale), 8)
+                self.canvas.itemconfig(canvas_id, text=text_content, font=("Arial", font_size))
+                x, y = self.transform_point(float(elem.get('x', 0)), float(elem.get('y', 0)))
+                self.canvas.coords(canvas_id, x, y)
+                prim = self.svg_model.primitive_for(elem) if self.svg_model is not None else None
+                if prim is not None and prim.bounds is not None:
+                    element.bounds = prim.bounds
+
+            # Zaznaczone elementy zachowują kolor zaznaczenia
+            if element is not self.selected_text_element and element is not self.selected_line_element:
+                self.set_element_style(element, 'normal')
+
+        # Kafelki poprzedniej wersji sceny - widoczne są rysowane od nowa, pozostałe wypadają z pamięci
+        if (updated or removed) and self.tile_renderer is not None:
+            self.tile_renderer.invalidate()
+            if self.tile_items:
+                self.render_tiles()
+                return
+        if removed_items < len(removed):
+            # Usunięte elementy nieklikalne (kropki tekstów) nie mają elementów interaktywnych - rysuj scenę od nowa
+            self.needs_full_render = True
+            self.request_render()
+
+    def save_svg(self, svg_path: Optional[str] = None):
+        """Write the (patched) SVG tree back to file"""
+        if self.svg_root is None:
+            return
+        svg_path = svg_path or self.current_svg_file
+        if self.svg_document is not None:
+            # Ten sam format co generator (zapis w tle)
+            self.svg_document.write_async(svg_path)
+        else:
+            from src.svg.svg_patch import write_svg_tree
+            write_svg_tree(self.svg_root, svg_path)
+        if svg_path == self.current_svg_file:
+            self.svg_modified = False
+            if self.svg_document is None:
+                self.svg_file_mtime = os.stat(svg_path).st_mtime_ns
+
+    def flush_svg_patches(self):
+        """Write patched tree to its file unless the file was regenerated since it was loaded"""
+        if not self.svg_modified or self.svg_root is None:
+            return
+        svg_path = getattr(self, 'current_svg_file', None)
+        if self.svg_document is not None:
+            # Dokument z pamięci - zapisz, jeśli do pliku nie trafił już nowszy dokument
+            if svg_path and latest_document(svg_path) is self.svg_document:
+                self.save_svg(svg_path)
+        elif svg_path:
+            # Plik mógł zostać w międzyczasie wygenerowany od nowa (także zapisem w tle)
+            wait_for_write(svg_path)
+            if os.path.exists(svg_path) and os.stat(svg_path).st_mtime_ns == self.svg_file_mtime:
+                self.save_svg(svg_path)
+        self.svg_modified = False
+
     def get_viewport_state(self) -> Dict[str, float]:
         """Get current viewport state (scale, pan_x, pan_y)"""
+        scale, pan_x, pan_y = self.get_view()
         return {
-            'scale': self.scale,
-            'pan_x': self.pan_x,
-            'pan_y': self.pan_y
+            'scale': scale,
+            'pan_x': pan_x,
+            'pan_y': pan_y
         }
 
     def set_viewport_state(self, state: Dict[str, float]):
         """Set viewport state (scale, pan_x, pan_y)"""
         if state:
+            self.cancel_scheduled_frame()
             self.scale = state.get('scale', 1.0)
             self.pan_x = state.get('pan_x', 0)
             self.pan_y = state.get('pan_y', 0)
@@ -1659,10 +2198,8 @@ class EnhancedSVGViewer:
     
     def on_ctrl_click(self, event):
         """Handle Ctrl+click for multi-selection"""
-        clicked_item = self.canvas.find_closest(event.x, event.y)[0]
-        if clicked_item in self.interactive_elements:
-            element = self.interactive_elements[clicked_item]
-            
+        element = self.find_element_at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        if element:
             # Toggle selection
             if element in self.selected_elements:
                 self.remove_from_selection(element)
@@ -155,6 +155,7 @@ class InteractiveGUI:
         
         # Opcje GUI
         self.auto_refresh_svg = tk.BooleanVar(value=True)  # Domyślnie włączone
+        self.svg_patcher = None  # Łatki przyrostowe wczytanego interaktywnego SVG
         
         # Zmienne dla usuniętej zakładki "Widok SVG" (kompatybilność wsteczna)
         self.current_file_info = tk.StringVar(value="Plik: brak")
@@ -184,6 +185,9 @@ class InteractiveGUI:
         # Interfejs
         self.create_interface()
         
+        # Zamknięcie okna zapisuje niezapisane łatki SVG
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
         # Automatyczne ładowanie domyślnych plików
         self.load_default_files()
     
@@ -850,7 +854,11 @@ class InteractiveGUI:
             'TEXT_LOCATION': self.config_manager.get('TEXT_LOCATION', 'above'),
             'POLYLINE_PROCESSING_MODE': self.config_manager.get('POLYLINE_PROCESSING_MODE', 'individual_segments'),
             'SEGMENT_MERGE_GAP_TOLERANCE': float(self.config_manager.get('SEGMENT_MERGE_GAP_TOLERANCE', 1.0)),
-            'MAX_MERGE_DISTANCE': float(self.config_manager.get('MAX_MERGE_DISTANCE', 5.0))
+            'MAX_MERGE_DISTANCE': float(self.config_manager.get('MAX_MERGE_DISTANCE', 5.0)),
+            'DXF_READ_MODE': self.config_manager.get('DXF_READ_MODE', 'full'),
+            'EXTRACTION_CACHE_ENABLED': self.config_manager.get('EXTRACTION_CACHE_ENABLED', True),
+            'EXTRACTION_CACHE_DIR': self.config_manager.get('EXTRACTION_CACHE_DIR', ''),
+            'EXTRACTION_CACHE_MAX_MB': float(self.config_manager.get('EXTRACTION_CACHE_MAX_MB', 512))
         }
 
     def convert_and_analyze(self):
@@ -1211,6 +1219,10 @@ class InteractiveGUI:
                          self.clear_selected_text,
                          "Czyści aktualnie zapamiętany wybór tekstu i linii.\n" +
                          "Resetuje formularz do stanu początkowego.")
+        create_action_btn(action_frame1, "♻️ Regeneruj SVG",
+                         lambda: self.regenerate_and_refresh_svg(force=True, full=True),
+                         "Generuje interaktywny SVG od nowa z aktualnych przypisań.\n" +
+                         "Po edycji SVG jest aktualizowany przyrostowo - regeneracja odświeża numerację segmentów.")
         
         # Separator
         ttk.Separator(inner_container, orient=tk.HORIZONTAL).pack(fill=tk.X, pady=15)
@@ -1557,50 +1569,33 @@ class InteractiveGUI:
             
             # Usuń stary plik jeśli istnieje
             output_svg = "interactive_assignment.svg"
+            from src.svg.svg_stream import wait_for_write
+            wait_for_write(output_svg)
             if os.path.exists(output_svg):
                 os.remove(output_svg)
                 self.log_message(f"🗑️ Usunięto stary plik SVG")
             
-            # Wygeneruj SVG
-            generate_interactive_svg(
+            # Wygeneruj SVG jako dokument w pamięci (plik zapisywany w tle)
+            document = generate_interactive_svg(
                 assigned_data,      # przypisane dane
                 station_texts,      # wszystkie teksty stacji
                 unassigned_texts,   # nieprzypisane teksty
                 unassigned_segments, # nieprzypisane segmenty
                 output_svg,         # plik wyjściowy
-                station_id          # ID stacji
+                station_id,         # ID stacji
+                return_document=True
             )
             
-            # Walidacja wygenerowanego pliku SVG
-            try:
-                if not os.path.exists(output_svg):
-                    self.log_error(f"❌ Plik SVG nie został utworzony: {output_svg}")
-                    return
-                    
-                file_size = os.path.getsize(output_svg)
-                if file_size < 100:  # Zwiększony próg
-                    self.log_error(f"❌ Plik SVG jest za mały ({file_size} bajtów): {output_svg}")
-                    # Sprawdź zawartość
-                    with open(output_svg, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    self.log_error(f"Zawartość: {content[:200]}...")
-                    return
-                    
-                with open(output_svg, 'rb') as f:
-                    head = f.read(4096)
-                if b'<svg' not in head.lower():
-                    self.log_error(f"❌ Plik nie zawiera <svg> tag: {output_svg}")
-                    return
-                    
-                self.log_success(f"✅ Wygenerowano interaktywny SVG ({file_size} bajtów)")
-                
-            except Exception as ve:
-                self.log_error(f"Błąd walidacji SVG: {ve}")
+            if document is None or not len(document.root):
+                self.log_error(f"❌ Interaktywny SVG nie został wygenerowany: {output_svg}")
                 return
+            self.log_success(f"✅ Wygenerowano interaktywny SVG (dokument w pamięci, zapis pliku w tle)")
             
-            # Jeśli jesteśmy w trybie interactive, odśwież podgląd
+            # Jeśli jesteśmy w trybie interactive, pokaż dokument bez ponownego wczytywania pliku
             if self.current_display_mode.get() == "interactive":
-                self.refresh_svg()
+                self.current_svg_path.set(output_svg)
+                self.svg_viewer.load_svg_document(document, output_svg)
+                self.update_zoom_display()
                 
         except Exception as e:
             self.log_error(f"❌ Błąd automatycznego generowania SVG: {e}")
@@ -1636,6 +1631,10 @@ class InteractiveGUI:
         """Odświeżenie podglądu SVG"""
         svg_path = self.current_svg_path.get()
         
+        # Plik mógł być jeszcze zapisywany w tle (dokument z generate_interactive_svg)
+        from src.svg.svg_stream import wait_for_write
+        wait_for_write(svg_path)
+        
         if os.path.exists(svg_path):
             try:
                 # Validate file size and ensure it contains an <svg ...> element to avoid parse errors
@@ -1960,6 +1959,16 @@ class InteractiveGUI:
         svg_number_map = {}
         svg_counter = 1
         
+        # SVG aktualizowany przyrostowo zachowuje numerację z ostatniej pełnej regeneracji
+        if (self.svg_patcher is not None and hasattr(self, 'svg_viewer')
+                and self.svg_patcher.root is self.svg_viewer.svg_root):
+            displayed_numbers = self.svg_patcher.segment_numbers()
+            for segment in sorted_segments:
+                seg_id = segment.get('id')
+                if str(seg_id) in displayed_numbers:
+                    svg_number_map[seg_id] = displayed_numbers[str(seg_id)]
+            svg_counter = max(svg_number_map.values(), default=0) + 1
+        
         # Najpierw przypisane segmenty (w kolejności jak w assigned_data)
         if hasattr(self, 'assigned_data') and self.assigned_data:
             for inverter_id, strings in self.assigned_data.items():
@@ -2612,13 +2621,46 @@ class InteractiveGUI:
         self.selected_segment_index = None
 
     
-    def regenerate_and_refresh_svg(self, force=False):
-        """Natychmiastowa regeneracja i odświeżenie SVG po zmianie przypisania"""
+    def patch_interactive_svg(self):
+        """Przyrostowa aktualizacja wczytanego interaktywnego SVG - False gdy potrzebna pełna regeneracja"""
+        viewer = getattr(self, 'svg_viewer', None)
+        if (not viewer or viewer.svg_root is None or self.current_display_mode.get() != "interactive"
+                or os.path.basename(getattr(viewer, 'current_svg_file', '')) != "interactive_assignment.svg"):
+            return False
+        
+        from src.svg.svg_patch import InteractiveSvgPatcher
+        from src.svg.svg_stream import wait_for_write
+        # Dokument nie może się zmieniać w trakcie zapisu pliku w tle
+        wait_for_write(viewer.current_svg_file)
+        if self.svg_patcher is None or self.svg_patcher.root is not viewer.svg_root:
+            self.svg_patcher = InteractiveSvgPatcher(viewer.svg_root)
+        
+        changes = self.svg_patcher.sync(self.assigned_data or {}, self.unassigned_texts, self.unassigned_segments)
+        if changes is None:
+            self.log_message("Zmiana wymaga nowych elementów SVG - pełna regeneracja")
+            return False
+        
+        viewer.apply_svg_patch(changes)
+        self.log_message(f"⚡ SVG zaktualizowany przyrostowo: {len(changes['updated'])} zmienionych, "
+                         f"{len(changes['removed'])} usuniętych elementów")
+        return True
+    
+    def regenerate_and_refresh_svg(self, force=False, full=False):
+        """Natychmiastowa regeneracja i odświeżenie SVG po zmianie przypisania
+        
+        Args:
+            force: Odśwież nawet bez nowych przypisań
+            full: Zawsze generuj cały plik (bez łatki przyrostowej)
+        """
         try:
             if not force and not self.assignment_changes['new_assignments']:
                 self.log_message("Brak zmian do zastosowania w SVG")
                 return
             
+            # Łatka przyrostowa - tylko zmienione elementy, bez generowania i ponownego wczytywania pliku
+            if not full and self.config_manager.get('INCREMENTAL_SVG_UPDATES', True) and self.patch_interactive_svg():
+                return
+            
             self.log_message("🔄 Regeneruję SVG z nowymi przypisaniami...")
             
             # ZAPISZ AKTUALNĄ POZYCJĘ VIEWPORTU
@@ -2649,54 +2691,39 @@ class InteractiveGUI:
             config_params = self.get_dxf_config_params()
             station_id = config_params.get('STATION_ID')
             
-            # Wygeneruj nowy SVG z poprawnymi parametrami
+            # Wygeneruj nowy SVG jako dokument w pamięci - podgląd wczytuje go bez zapisu i parsowania pliku,
+            # plik jest zapisywany w tle
             output_svg = "interactive_assignment.svg"
-            generate_interactive_svg(
+            document = generate_interactive_svg(
                 assigned_data,           # inverter_data: Dict
                 station_texts,          # texts: List (wszystkie teksty stacji)
                 remaining_unassigned_texts,  # unassigned_texts: List
                 remaining_unassigned_segments,  # unassigned_segments: List
                 output_svg,             # output_path: str
-                station_id              # station_id: str
+                station_id,             # station_id: str
+                return_document=True
             )
             
-            # Walidacja wygenerowanego pliku
-            try:
-                if not os.path.exists(output_svg) or os.path.getsize(output_svg) < 20:
-                    self.log_error(f"Interaktywny SVG nie został wygenerowany poprawnie: {output_svg}")
-                else:
-                    with open(output_svg, 'rb') as f:
-                        head = f.read(4096)
-                    if b'<svg' not in head.lower():
-                        self.log_error(f"Wygenerowany plik nie zawiera <svg>: {output_svg}")
-            except Exception as ve:
-                self.log_error(f"Walidacja SVG nie powiodła się: {ve}")
-            
             # Przełącz widok na interactive i odśwież ZACHOWUJĄC POZYCJĘ
             self.current_display_mode.set("interactive")
-            svg_path = "interactive_assignment.svg"
+            svg_path = output_svg
             self.current_svg_path.set(svg_path)
-            
-            # Aktualizuj informację o pliku
-            if os.path.exists(svg_path):
-                file_size = os.path.getsize(svg_path) / 1024
-                self.current_file_info.set(f"Plik: {svg_path} ({file_size:.1f}KB)")
-            else:
-                self.current_file_info.set(f"Plik: {svg_path} (brak)")
+            self.current_file_info.set(f"Plik: {svg_path} (zapis w tle)")
             
             # Wczytaj SVG ZACHOWUJĄC VIEWPORT
             if viewport_state and hasattr(self, 'svg_viewer') and self.svg_viewer:
-                self.svg_viewer.load_svg(svg_path, preserve_viewport=True)
+                self.svg_viewer.load_svg_document(document, svg_path, preserve_viewport=True)
                 # Przywróć pozycję natychmiast
                 self.svg_viewer.set_viewport_state(viewport_state)
                 self.log_message(f"🔄 Przywrócono pozycję viewportu: zoom {int(viewport_state['scale']*100)}%")
                 self.update_zoom_display()
             else:
                 # Standardowe wczytanie (pierwsze wczytanie)
-                self.svg_viewer.load_svg(svg_path)
+                self.svg_viewer.load_svg_document(document, svg_path)
                 self.update_zoom_display()
             
-            self.update_svg_info(svg_path)
+            width, height = self.svg_viewer.original_size
+            self.svg_info.set(f"Rozmiar: {width}×{height}px (dokument w pamięci)")
             self.log_message(f"Odświeżono podgląd: {os.path.basename(svg_path)}")
             
             # Aktualizuj listy po regeneracji
@@ -3322,6 +3349,19 @@ class InteractiveGUI:
         # Sprawdź czy istnieją pliki z poprzednich konwersji
         self.update_interactive_info()
     
+    def on_closing(self):
+        """Zamknięcie okna - łatki przyrostowe wczytanego SVG trafiają do pliku przed zakończeniem"""
+        from src.svg.svg_stream import wait_for_write
+        viewer = getattr(self, 'svg_viewer', None)
+        if viewer is not None:
+            try:
+                viewer.flush_svg_patches()
+            except Exception as e:
+                self.log_error(f"Nie udało się zapisać zmian SVG: {e}")
+        # Zapisy w tle działają w wątkach-demonach - dokończ je, zanim program się zakończy
+        wait_for_write()
+        self.root.destroy()
+    
     def run(self):
         """Uruchomienie GUI"""
         try:
@@ -0,0 +1,464 @@
+"""
+Model sceny podglądu SVG - drzewo jest parsowane raz przy wczytaniu do listy prymitywów
+(linie, prostokąty, okręgi, teksty, polilinie) z gotowymi współrzędnymi, stylem i granicami,
+więc renderowanie przy każdym zoomie/przesunięciu nie przechodzi już drzewa ani nie parsuje liczb.
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import math
+import xml.etree.ElementTree as ET
+import src.core.config as config
+
+# Kolejność rysowania typów elementów (wcześniejsze pod spodem)
+RENDER_ORDER = ('rect', 'line', 'circle', 'text', 'polyline')
+
+# Typy elementów klikalnych w podglądzie (okręgi - kropki, trójkąty - są tylko rysowane)
+CLICKABLE_KINDS = ('line', 'polyline', 'rect', 'text')
+
+# Typy elementów rysowanych z grubością obrysu (stroke-width)
+STROKED_KINDS = ('line', 'rect', 'polyline')
+
+# Klasy etykiet tekstowych, które nie są klikalne
+NON_CLICKABLE_TEXT_CLASSES = ('segment-label', 'text-marker')
+
+# Margines granic elementu (bezpieczny zapas przy odrzucaniu elementów spoza widoku)
+BOUNDS_MARGIN = 10
+
+# Przybliżony rozmiar znaku tekstu do szacowania granic
+TEXT_CHAR_WIDTH = 8
+TEXT_HEIGHT = 16
+
+# Maksymalna długość wyświetlanego tekstu (dłuższe są skracane z '...')
+MAX_TEXT_LENGTH = 50
+
+# Szerokość znaku i wysokość linii tekstu na canvasie jako ułamek rozmiaru czcionki (trafienia kursorem)
+CANVAS_CHAR_WIDTH = 0.6
+CANVAS_LINE_HEIGHT = 1.2
+
+# Tolerancja łączenia kolejnych segmentów w jeden łańcuch (jednostki SVG - współrzędne z 4 miejscami)
+CHAIN_JOIN_TOLERANCE = 1e-3
+
+# Rozmiar komórki siatki indeksu przestrzennego jako wielokrotność mediany rozmiaru prymitywów
+# (mediana, a nie obszar rysunku - pojedyncze odległe elementy nie rozciągają komórek)
+GRID_CELL_FACTOR = 2
+
+# Poziomy szczegółów (LOD) oddalonych widoków: pełny, stringi jako łańcuchy, prostokąty falowników
+LOD_FULL = 'full'
+LOD_STRINGS = 'strings'
+LOD_INVERTERS = 'inverters'
+
+
+def _local_tag(elem: ET.Element) -> str:
+    """Nazwa znacznika bez przestrzeni nazw"""
+    return elem.tag.rsplit('}', 1)[-1]
+
+
+def _parse_points(points_str: str) -> List[float]:
+    """Współrzędne polilinii jako płaska lista [x1, y1, x2, y2, ...]"""
+    points = points_str.replace(',', ' ').split()
+    coords = []
+    for i in range(0, len(points) - 1, 2):
+        coords.append(float(points[i]))
+        coords.append(float(points[i + 1]))
+    return coords
+
+
+class SvgPrimitive:
+    """
+    Element SVG przygotowany do rysowania: geometria w układzie SVG, styl i granice z marginesem.
+    Brakujące kolory (None) zastępuje domyślnymi podgląd. bounds = None oznacza element,
+    którego nie da się narysować (błędne liczby, pusta polilinia).
+    """
+
+    __slots__ = ('kind', 'element', 'order', 'geometry', 'bounds', 'fill', 'stroke', 'stroke_width',
+                 'font_size', 'text', 'label', 'attributes', 'assignment_group', 'clickable')
+
+    def __init__(self, kind: str, element: ET.Element, order: int = 0):
+        self.kind = kind
+        self.element = element
+        self.order = order  # Pozycja w kolejności rysowania
+        self.load()
+
+    def load(self):
+        """(Ponownie) odczytaj geometrię i styl z elementu drzewa"""
+        elem = self.element
+        self.text = elem.text or ''
+        self.label = self.text if len(self.text) <= MAX_TEXT_LENGTH else self.text[:MAX_TEXT_LENGTH - 3] + "..."
+        self.attributes = dict(elem.attrib)
+        self.assignment_group = elem.get('data-assignment-group', None)
+        self.fill = elem.get('fill')
+        self.stroke = elem.get('stroke')
+        self.clickable = self.kind in CLICKABLE_KINDS
+        if self.kind == 'text':
+            elem_class = elem.get('class', '')
+            if any(name in elem_class for name in NON_CLICKABLE_TEXT_CLASSES):
+                self.clickable = False
+        try:
+            self.geometry, self.bounds = self._parse_geometry(elem)
+            self.stroke_width = float(elem.get('stroke-width', 1)) if self.kind in STROKED_KINDS else None
+            self.font_size = float(elem.get('font-size', 12)) if self.kind == 'text' else None
+        except (ValueError, TypeError):
+            self.geometry, self.bounds = None, None
+
+    def _parse_geometry(self, elem: ET.Element) -> Tuple[Optional[Tuple[float, ...]], Optional[Tuple]]:
+        margin = BOUNDS_MARGIN
+        kind = self.kind
+        if kind == 'line':
+            x1, y1 = float(elem.get('x1', 0)), float(elem.get('y1', 0))
+            x2, y2 = float(elem.get('x2', 0)), float(elem.get('y2', 0))
+            return (x1, y1, x2, y2), (min(x1, x2) - margin, min(y1, y2) - margin,
+                                      max(x1, x2) + margin, max(y1, y2) + margin)
+        if kind == 'rect':
+            x, y = float(elem.get('x', 0)), float(elem.get('y', 0))
+            w, h = float(elem.get('width', 0)), float(elem.get('height', 0))
+            return (x, y, x + w, y + h), (x - margin, y - margin, x + w + margin, y + h + margin)
+        if kind == 'circle':
+            cx, cy, r = float(elem.get('cx', 0)), float(elem.get('cy', 0)), float(elem.get('r', 0))
+            return (cx, cy, r), (cx - r - margin, cy - r - margin, cx + r + margin, cy + r + margin)
+        if kind == 'text':
+            x, y = float(elem.get('x', 0)), float(elem.get('y', 0))
+            # Szacowane granice tekstu (przybliżenie)
+            return (x, y), (x - margin, y - TEXT_HEIGHT - margin,
+                            x + len(self.text) * TEXT_CHAR_WIDTH + margin, y + margin)
+        if kind == 'polyline':
+            coords = _parse_points(elem.get('points', ''))
+            if len(coords) < 4:  # Potrzebne co najmniej 2 punkty
+                return None, None
+            xs, ys = coords[0::2], coords[1::2]
+            return tuple(coords), (min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin)
+        return None, None
+
+    def canvas_distance(self, x: float, y: float, scale: float) -> float:
+        """
+        Odległość punktu (współrzędne SVG) od narysowanego kształtu w pikselach canvasu przy skali
+        widoku - z grubością linii i rozmiarem czcionki takimi, jak przy rysowaniu w podglądzie
+        """
+        geometry = self.geometry
+        if geometry is None:
+            return math.inf
+        kind = self.kind
+        if kind in ('line', 'polyline'):
+            distance = min(_segment_distance(x, y, *geometry[i:i + 4]) for i in range(0, len(geometry) - 2, 2))
+            return max(distance * scale - max(self.stroke_width * scale, 1) / 2, 0.0)
+        if kind == 'rect':
+            return max(_box_distance(x, y, *geometry) * scale - max(self.stroke_width * scale, 1) / 2, 0.0)
+        if kind == 'circle':
+            cx, cy, r = geometry
+            return max(math.hypot(x - cx, y - cy) * scale - max(r * scale, 2), 0.0)
+        if kind == 'text':
+            # Tekst zakotwiczony 'w' - pionowo wyśrodkowany na y
+            font_size = max(int(self.font_size * scale), 8)
+            width = len(self.label) * font_size * CANVAS_CHAR_WIDTH
+            half_height = font_size * CANVAS_LINE_HEIGHT / 2
+            tx, ty = geometry[0] * scale, geometry[1] * scale
+            return _box_distance(x * scale, y * scale, tx, ty - half_height, tx + width, ty + half_height)
+        return math.inf
+
+
+def _segment_distance(px: float, py: float, x1: float, y1: float, x2: float, y2: float) -> float:
+    """Odległość punktu od odcinka"""
+    dx, dy = x2 - x1, y2 - y1
+    length_sq = dx * dx + dy * dy
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((px - x1) * dx + (py - y1) * dy) / length_sq))
+    return math.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+
+def _box_distance(px: float, py: float, x1: float, y1: float, x2: float, y2: float) -> float:
+    """Odległość punktu od prostokąta (0 wewnątrz)"""
+    return math.hypot(max(x1 - px, 0.0, px - x2), max(y1 - py, 0.0, py - y2))
+
+
+def _intersects(bounds: Tuple, x1: float, y1: float, x2: float, y2: float) -> bool:
+    return not (bounds[2] < x1 or bounds[0] > x2 or bounds[3] < y1 or bounds[1] > y2)
+
+
+class GridIndex:
+    """
+    Indeks przestrzenny - równomierna siatka nad granicami prymitywów. Prymityw jest wpisany do
+    każdej komórki, którą przecinają jego granice; zapytanie przegląda tylko komórki prostokąta.
+    """
+
+    def __init__(self, primitives: Iterable[SvgPrimitive]):
+        bounded = [prim for prim in primitives if prim.bounds is not None]
+        if bounded:
+            self.min_x = min(prim.bounds[0] for prim in bounded)
+            self.min_y = min(prim.bounds[1] for prim in bounded)
+            self.max_x = max(prim.bounds[2] for prim in bounded)
+            self.max_y = max(prim.bounds[3] for prim in bounded)
+        else:
+            self.min_x = self.min_y = self.max_x = self.max_y = 0.0
+        # Rozmiar komórki - typowy prymityw zajmuje jedną-kilka komórek
+        sizes = sorted(max(prim.bounds[2] - prim.bounds[0], prim.bounds[3] - prim.bounds[1]) for prim in bounded)
+        median = sizes[len(sizes) // 2] if sizes else 1.0
+        self.cell_size = max(median * GRID_CELL_FACTOR, 1.0)
+        self.cells: Dict[Tuple[int, int], List[SvgPrimitive]] = {}
+        self._cell_ranges: Dict[SvgPrimitive, Tuple[int, int, int, int]] = {}
+        for prim in bounded:
+            self.insert(prim)
+
+    def _cell_range(self, x1: float, y1: float, x2: float, y2: float) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return (math.floor(x1 / size), math.floor(y1 / size), math.floor(x2 / size), math.floor(y2 / size))
+
+    def insert(self, prim: SvgPrimitive):
+        if prim.bounds is None:
+            return
+        cell_range = self._cell_range(*prim.bounds)
+        cx1, cy1, cx2, cy2 = cell_range
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                self.cells.setdefault((cx, cy), []).append(prim)
+        self._cell_ranges[prim] = cell_range
+        x1, y1, x2, y2 = prim.bounds
+        self.min_x, self.min_y = min(self.min_x, x1), min(self.min_y, y1)
+        self.max_x, self.max_y = max(self.max_x, x2), max(self.max_y, y2)
+
+    def remove(self, prim: SvgPrimitive):
+        cell_range = self._cell_ranges.pop(prim, None)
+        if cell_range is None:
+            return
+        cx1, cy1, cx2, cy2 = cell_range
+        for cx in range(cx1, cx2 + 1):
+            for cy in range(cy1, cy2 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    cell.remove(prim)
+                    if not cell:
+                        del self.cells[(cx, cy)]
+
+    def covers(self, x1: float, y1: float, x2: float, y2: float) -> bool:
+        """Czy prostokąt obejmuje cały zindeksowany obszar"""
+        return x1 <= self.min_x and y1 <= self.min_y and x2 >= self.max_x and y2 >= self.max_y
+
+    def query(self, x1: float, y1: float, x2: float, y2: float, ordered: bool = True) -> List[SvgPrimitive]:
+        """Prymitywy, których granice przecinają prostokąt - w kolejności rysowania (ordered=False - dowolnej)"""
+        # Zapytanie nie wychodzi poza zindeksowany obszar (ogranicza liczbę przeglądanych komórek)
+        cx1, cy1, cx2, cy2 = self._cell_range(max(x1, self.min_x), max(y1, self.min_y),
+                                              min(x2, self.max_x), min(y2, self.max_y))
+        found = {}
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self.cells):
+            # Prostokąt większy niż zajęte komórki (rzadka siatka) - przegląd zajętych komórek
+            cells = [cell for (cx, cy), cell in self.cells.items() if cx1 <= cx <= cx2 and cy1 <= cy <= cy2]
+        else:
+            cells = [self.cells[key] for key in ((cx, cy) for cx in range(cx1, cx2 + 1)
+                                                 for cy in range(cy1, cy2 + 1)) if key in self.cells]
+        for cell in cells:
+            for prim in cell:
+                if prim not in found and _intersects(prim.bounds, x1, y1, x2, y2):
+                    found[prim] = None
+        return sorted(found, key=lambda prim: prim.order) if ordered else list(found)
+
+
+class SegmentChain:
+    """Kolejne, stykające się linie tej samej grupy i stylu połączone w jedną łamaną (poziom szczegółów 'strings')"""
+
+    __slots__ = ('group', 'stroke', 'stroke_width', 'coords', 'bounds')
+
+    def __init__(self, prim: SvgPrimitive):
+        self.group = prim.assignment_group
+        self.stroke = prim.stroke
+        self.stroke_width = prim.stroke_width
+        self.coords = list(prim.geometry)
+        self.bounds = prim.bounds
+
+    def extend(self, prim: SvgPrimitive) -> bool:
+        """Dołącz prymityw, jeśli zaczyna się (lub kończy) w ostatnim punkcie łańcucha"""
+        geometry = prim.geometry
+        end_x, end_y = self.coords[-2], self.coords[-1]
+        if abs(geometry[0] - end_x) <= CHAIN_JOIN_TOLERANCE and abs(geometry[1] - end_y) <= CHAIN_JOIN_TOLERANCE:
+            self.coords.extend(geometry[2:])
+        elif abs(geometry[-2] - end_x) <= CHAIN_JOIN_TOLERANCE and abs(geometry[-1] - end_y) <= CHAIN_JOIN_TOLERANCE:
+            for i in range(len(geometry) - 4, -1, -2):
+                self.coords.extend(geometry[i:i + 2])
+        else:
+            return False
+        x1, y1, x2, y2 = self.bounds
+        self.bounds = (min(x1, prim.bounds[0]), min(y1, prim.bounds[1]),
+                       max(x2, prim.bounds[2]), max(y2, prim.bounds[3]))
+        return True
+
+
+class SceneDetailLevels:
+    """
+    Uproszczone reprezentacje sceny dla oddalonych widoków: łańcuchy segmentów (jeden element
+    na string zamiast jednego na segment) i prostokąty falowników z grupowania strukturalnego SVG
+    (ID falownika - część strukturalnego ID po "/"). Mediany rozmiarów służą do wyboru poziomu szczegółów.
+    """
+
+    def __init__(self, primitives: List[SvgPrimitive]):
+        self.chains: List[SegmentChain] = []
+        open_chains = {}  # (grupa, kolor, grubość) -> ostatni łańcuch
+        segment_lengths = []
+        string_bounds = {}  # grupa -> granice
+        for prim in primitives:
+            if prim.kind not in ('line', 'polyline') or prim.geometry is None:
+                continue
+            geometry = prim.geometry
+            segment_lengths.append(math.hypot(geometry[-2] - geometry[0], geometry[-1] - geometry[1]))
+            key = (prim.assignment_group, prim.stroke, prim.stroke_width)
+            chain = open_chains.get(key)
+            if chain is None or not chain.extend(prim):
+                chain = SegmentChain(prim)
+                open_chains[key] = chain
+                self.chains.append(chain)
+            if prim.assignment_group:
+                bounds = string_bounds.get(prim.assignment_group, prim.bounds)
+                string_bounds[prim.assignment_group] = (min(bounds[0], prim.bounds[0]), min(bounds[1], prim.bounds[1]),
+                                                        max(bounds[2], prim.bounds[2]), max(bounds[3], prim.bounds[3]))
+
+        # Prostokąty falowników - granice stringów grupowane jak w strukturalnym SVG
+        self.inverter_boxes: Dict[str, Tuple[float, float, float, float]] = {}
+        for group, bounds in string_bounds.items():
+            structural_ids = config.get_structural_ids(group)
+            if structural_ids and structural_ids[1] is not None:
+                inverter_id = f"I{structural_ids[1]}"
+            else:
+                inverter_id = group.rsplit('/', 1)[0]  # fallback - ID stringa bez ostatniego członu
+            box = self.inverter_boxes.get(inverter_id, bounds)
+            self.inverter_boxes[inverter_id] = (min(box[0], bounds[0]), min(box[1], bounds[1]),
+                                                max(box[2], bounds[2]), max(box[3], bounds[3]))
+
+        self.median_segment_length = _median(segment_lengths)
+        self.median_string_size = _median([max(b[2] - b[0], b[3] - b[1]) - 2 * BOUNDS_MARGIN
+                                           for b in string_bounds.values()])
+
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+class SvgSceneModel:
+    """
+    Prymitywy dokumentu SVG w kolejności rysowania (RENDER_ORDER, w obrębie typu - kolejność w dokumencie)
+    z indeksem przestrzennym do odrzucania elementów spoza widoku i wyszukiwania elementów pod kursorem
+    """
+
+    def __init__(self, root: ET.Element):
+        by_kind = {kind: [] for kind in RENDER_ORDER}
+        for elem in root.iter():
+            kind = _local_tag(elem)
+            if kind in by_kind:
+                by_kind[kind].append(elem)
+        self.primitives: List[SvgPrimitive] = [SvgPrimitive(kind, elem) for kind in RENDER_ORDER
+                                               for elem in by_kind[kind]]
+        for order, prim in enumerate(self.primitives):
+            prim.order = order
+        self._by_element: Dict[int, SvgPrimitive] = {id(prim.element): prim for prim in self.primitives}
+        self.index = GridIndex(self.primitives)
+        # Osobny indeks tekstów - przy małej skali teksty są rysowane poza szacowanymi granicami
+        # i wyszukiwanie pod kursorem sięga dla nich dalej niż dla linii
+        self.text_index = GridIndex(prim for prim in self.primitives if prim.kind == 'text')
+        # Najdłuższa etykieta i największa czcionka - zasięg tekstów narysowanych poza szacowanymi granicami
+        self.max_label_length = 0
+        self.max_font_size = 0.0
+        for prim in self.primitives:
+            self._track_text_extent(prim)
+        self._detail_levels: Optional[SceneDetailLevels] = None
+        self._by_key: Optional[Dict[str, List[SvgPrimitive]]] = None
+
+    @property
+    def detail_levels(self) -> SceneDetailLevels:
+        """Uproszczone reprezentacje (budowane przy pierwszym oddalonym widoku, od nowa po łatkach)"""
+        if self._detail_levels is None:
+            self._detail_levels = SceneDetailLevels(self.primitives)
+        return self._detail_levels
+
+    def _track_text_extent(self, prim: SvgPrimitive):
+        if prim.kind == 'text' and prim.bounds is not None:
+            self.max_label_length = max(self.max_label_length, len(prim.label))
+            self.max_font_size = max(self.max_font_size, prim.font_size)
+
+    def __len__(self) -> int:
+        return len(self.primitives)
+
+    def primitive_for(self, elem: ET.Element) -> Optional[SvgPrimitive]:
+        """Prymityw odpowiadający elementowi drzewa"""
+        return self._by_element.get(id(elem))
+
+    def primitives_for_key(self, key: str) -> List[SvgPrimitive]:
+        """
+        Prymitywy o danej grupie przypisania, ID segmentu (data-segment-id / data-svg-number)
+        lub treści tekstu - odtwarzanie zaznaczeń i podświetleń bez elementów na canvasie
+        """
+        if self._by_key is None:
+            self._by_key = {}
+            for prim in self.primitives:
+                if prim.bounds is None:
+                    continue
+                keys = {prim.assignment_group, prim.attributes.get('data-segment-id'),
+                        prim.attributes.get('data-svg-number')}
+                if prim.kind == 'text':
+                    keys.add(prim.text)
+                for key_value in keys:
+                    if key_value:
+                        self._by_key.setdefault(key_value, []).append(prim)
+        return self._by_key.get(key, [])
+
+    def query(self, x1: float, y1: float, x2: float, y2: float) -> List[SvgPrimitive]:
+        """Prymitywy przecinające prostokąt (współrzędne SVG) w kolejności rysowania"""
+        if self.index.covers(x1, y1, x2, y2):
+            # Widok obejmuje cały rysunek - przegląd siatki byłby droższy niż lista
+            return [prim for prim in self.primitives if prim.bounds is not None]
+        return self.index.query(x1, y1, x2, y2)
+
+    def find_at(self, x: float, y: float, scale: float, radii: Tuple[float, ...], halo: float,
+                accept: Optional[Callable[[SvgPrimitive], bool]] = None) -> Optional[SvgPrimitive]:
+        """
+        Prymityw najbliższy punktowi (współrzędne SVG) w odległości do halo pikseli przy skali widoku,
+        przy równej odległości - wcześniejszy w kolejności rysowania. Otoczenie jest przeszukiwane
+        stopniowo (radii, potem halo) - trafienie w mniejszym promieniu kończy wyszukiwanie.
+        accept - filtr prymitywów (np. tylko narysowane), stosowany przed liczeniem odległości.
+        """
+        # Tekst sięga w prawo od punktu zakotwiczenia i jest rysowany co najmniej czcionką 8 px -
+        # przy małej skali wychodzi poza szacowane granice
+        font_size = max(int(self.max_font_size * scale), 8)
+        text_width = self.max_label_length * font_size * CANVAS_CHAR_WIDTH / scale
+        text_height = font_size * CANVAS_LINE_HEIGHT / 2 / scale
+        text_reach = text_width > self.max_label_length * TEXT_CHAR_WIDTH or text_height > TEXT_HEIGHT
+
+        # Zapytania o coraz większe otoczenie - zwykle wystarcza pierwsze, najmniejsze
+        seen = set()
+        candidates = []
+        for hit_radius in radii + (halo,):
+            radius = hit_radius / scale
+            primitives = self.index.query(x - radius, y - radius, x + radius, y + radius, ordered=False)
+            if text_reach:
+                primitives += self.text_index.query(x - radius - text_width, y - radius - text_height,
+                                                    x + radius, y + radius + text_height, ordered=False)
+            for prim in primitives:
+                if prim in seen:
+                    continue
+                seen.add(prim)
+                if accept is None or accept(prim):
+                    distance = prim.canvas_distance(x, y, scale)
+                    if distance <= halo:
+                        candidates.append((distance, prim))
+            if candidates:
+                distance, prim = min(candidates, key=lambda candidate: (candidate[0], candidate[1].order))
+                # Wszystko bliżej niż hit_radius leży w przeszukanym otoczeniu
+                if distance <= hit_radius:
+                    return prim
+        return None
+
+    def apply_changes(self, changes: Dict[str, List]):
+        """Uwzględnij łatki drzewa (InteractiveSvgPatcher.sync): zmienione elementy odczytaj ponownie, usunięte pomiń"""
+        self._detail_levels = None
+        self._by_key = None
+        for elem in changes.get('updated', []):
+            prim = self._by_element.get(id(elem))
+            if prim is not None:
+                self.index.remove(prim)
+                prim.load()
+                self.index.insert(prim)
+                if prim.kind == 'text':
+                    self.text_index.remove(prim)
+                    self.text_index.insert(prim)
+                    self._track_text_extent(prim)
+        removed = [self._by_element.pop(id(elem)) for elem in changes.get('removed', [])
+                   if id(elem) in self._by_element]
+        if removed:
+            for prim in removed:
+                self.index.remove(prim)
+                self.text_index.remove(prim)
+            removed_ids = {id(prim) for prim in removed}
+            self.primitives = [prim for prim in self.primitives if id(prim) not in removed_ids]
@@ -0,0 +1,262 @@
+"""
+Rastrowe kafelki podglądu SVG dla bardzo dużych instalacji - scena jest rysowana (Pillow) do obrazów
+TILE_SIZE x TILE_SIZE na dyskretnych poziomach zoomu i trzymana w pamięci podręcznej LRU, więc
+przesunięcie i zoom tylko układają gotowe obrazy na canvasie zamiast tworzyć setki tysięcy elementów.
+Interaktywne nakładki (zaznaczenie, podświetlenie) pozostają elementami wektorowymi podglądu.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import math
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from src.gui.svg_scene_model import (SvgSceneModel, SvgPrimitive, LOD_FULL, LOD_INVERTERS,
+                                     CANVAS_CHAR_WIDTH, CANVAS_LINE_HEIGHT)
+
+# Rozmiar kafelka (piksele)
+TILE_SIZE = 256
+
+# Poziomy zoomu kafelków - skala 2 ** (poziom / ZOOM_LEVELS_PER_OCTAVE) (krok ~1.19, jak zoom kółkiem 1.2)
+ZOOM_LEVELS_PER_OCTAVE = 4
+
+# Liczba kafelków w pamięci podręcznej (256 x 256 RGB - ok. 200 kB na kafelek)
+TILE_CACHE_SIZE = 256
+
+# Zapas wokół kafelka przy wyborze prymitywów (piksele) - obrysy i kropki wychodzące poza granice
+TILE_PADDING_PX = 8
+
+# Minimalny rozmiar czcionki tekstu (piksele, jak render_text podglądu)
+MIN_FONT_PX = 8
+
+
+def zoom_level(scale: float) -> int:
+    """Najbliższy poziom zoomu kafelków dla skali widoku"""
+    return round(math.log2(scale) * ZOOM_LEVELS_PER_OCTAVE)
+
+
+def level_scale(level: int) -> float:
+    """Skala widoku poziomu zoomu kafelków"""
+    return 2 ** (level / ZOOM_LEVELS_PER_OCTAVE)
+
+
+class TileCache:
+    """Pamięć podręczna LRU kafelków: klucz (wersja sceny, poziom zoomu, kafelek x, kafelek y) -> obraz"""
+
+    def __init__(self, max_tiles: int = TILE_CACHE_SIZE):
+        self.max_tiles = max_tiles
+        self.tiles: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        tile = self.tiles.get(key)
+        if tile is None:
+            self.misses += 1
+            return None
+        self.tiles.move_to_end(key)
+        self.hits += 1
+        return tile
+
+    def put(self, key: Hashable, tile: Any):
+        self.tiles[key] = tile
+        self.tiles.move_to_end(key)
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+
+    def clear(self):
+        self.tiles.clear()
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+
+def _color(value: Optional[str], default: Optional[str], cache: Dict) -> Optional[Tuple[int, int, int]]:
+    """Kolor SVG/Tk jako RGB dla Pillow (None - brak lub kolor nierozpoznany, element bez wypełnienia/obrysu)"""
+    if value is None:
+        value = default
+    if not value or value == 'none':
+        return None
+    if value not in cache:
+        try:
+            cache[value] = ImageColor.getrgb(value)[:3]
+        except ValueError:
+            cache[value] = None
+    return cache[value]
+
+
+class SvgTileRenderer:
+    """
+    Kafelki sceny SvgSceneModel rysowane jak wektorowy podgląd (kolejność RENDER_ORDER, te same
+    poziomy szczegółów i progi czcionek). Zmiana sceny (łatki) podbija wersję - stare kafelki
+    przestają pasować do kluczy i wypadają z pamięci podręcznej.
+
+    detail_for_scale - poziom szczegółów (LOD_*) dla skali widoku
+    make_photo - konwersja obrazu Pillow do obrazu canvasu (ImageTk.PhotoImage); przechowywany jest wynik
+    """
+
+    def __init__(self, model: SvgSceneModel, colors: Dict[str, str],
+                 detail_for_scale: Callable[[float], str],
+                 make_photo: Optional[Callable[[Image.Image], Any]] = None,
+                 min_text_px: float = 0, min_dot_px: float = 0,
+                 inverter_color: str = '#34495E', inverter_label_px: float = 24,
+                 max_tiles: int = TILE_CACHE_SIZE):
+        self.model = model
+        self.colors = colors
+        self.detail_for_scale = detail_for_scale
+        self.make_photo = make_photo
+        self.min_text_px = min_text_px
+        self.min_dot_px = min_dot_px
+        self.inverter_color = inverter_color
+        self.inverter_label_px = inverter_label_px
+        self.cache = TileCache(max_tiles)
+        self.version = 0
+        self._colors: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._fonts: Dict[int, Any] = {}
+
+    def invalidate(self):
+        """Scena zmieniona - kafelki poprzedniej wersji nie są już używane"""
+        self.version += 1
+
+    def tile(self, level: int, tx: int, ty: int) -> Any:
+        """Kafelek (obraz canvasu) z pamięci podręcznej, narysowany przy pierwszym użyciu"""
+        tile = self.cached_tile(level, tx, ty)
+        if tile is None:
+            tile = self.render_tile(level, tx, ty)
+        return tile
+
+    def cached_tile(self, level: int, tx: int, ty: int) -> Optional[Any]:
+        """Kafelek bieżącej wersji sceny z pamięci podręcznej (None - jeszcze nie narysowany)"""
+        return self.cache.get((self.version, level, tx, ty))
+
+    def render_tile(self, level: int, tx: int, ty: int) -> Any:
+        """Narysuj kafelek i zapamiętaj go w pamięci podręcznej"""
+        image = self.draw_tile(level, tx, ty)
+        tile = self.make_photo(image) if self.make_photo is not None else image
+        self.cache.put((self.version, level, tx, ty), tile)
+        return tile
+
+    def tile_range(self, level: int, x1: float, y1: float, x2: float, y2: float) -> Tuple[int, int, int, int]:
+        """Zakres kafelków (tx1, ty1, tx2, ty2 włącznie) pokrywających prostokąt w pikselach poziomu"""
+        return (math.floor(x1 / TILE_SIZE), math.floor(y1 / TILE_SIZE),
+                math.floor((x2 - 1) / TILE_SIZE), math.floor((y2 - 1) / TILE_SIZE))
+
+    def draw_tile(self, level: int, tx: int, ty: int) -> Image.Image:
+        """Narysuj kafelek - piksele poziomu [tx * TILE_SIZE, (tx + 1) * TILE_SIZE) x [ty..]"""
+        scale = level_scale(level)
+        offset_x, offset_y = tx * TILE_SIZE, ty * TILE_SIZE
+        image = Image.new('RGB', (TILE_SIZE, TILE_SIZE),
+                          _color(self.colors.get('background'), '#FFFFFF', self._colors))
+        draw = ImageDraw.Draw(image)
+
+        detail = self.detail_for_scale(scale)
+        min_font_size = self.min_text_px / scale
+        pad = TILE_PADDING_PX / scale
+        x1, y1 = offset_x / scale - pad, offset_y / scale - pad
+        x2, y2 = (offset_x + TILE_SIZE) / scale + pad, (offset_y + TILE_SIZE) / scale + pad
+
+        # Teksty są rysowane w prawo od punktu zakotwiczenia - sięgają z kafelków po lewej
+        primitives = self.model.query(x1, y1, x2, y2)
+        if self.model.max_font_size >= min_font_size:
+            font_px = max(int(self.model.max_font_size * scale), MIN_FONT_PX)
+            text_width = self.model.max_label_length * font_px * CANVAS_CHAR_WIDTH / scale
+            text_height = font_px * CANVAS_LINE_HEIGHT / 2 / scale
+            seen = set(primitives)
+            texts = [prim for prim in self.model.text_index.query(x1 - text_width, y1 - text_height,
+                                                                  x2, y2 + text_height, ordered=False)
+                     if prim not in seen]
+            if texts:
+                primitives = sorted(primitives + texts, key=lambda prim: prim.order)
+
+        detail_drawn = detail == LOD_FULL
+        for prim in primitives:
+            kind = prim.kind
+            if not detail_drawn and kind != 'rect':
+                # Uproszczone elementy w miejscu linii w kolejności rysowania (jak render_svg_elements)
+                self._draw_detail_level(draw, detail, scale, offset_x, offset_y, (x1, y1, x2, y2))
+                detail_drawn = True
+            if detail != LOD_FULL:
+                if kind in ('line', 'polyline'):
+                    continue
+                if kind == 'circle' and prim.geometry[2] * scale < self.min_dot_px:
+                    continue
+            if kind == 'text' and prim.font_size < min_font_size:
+                continue
+            self._draw_primitive(draw, prim, scale, offset_x, offset_y)
+        if not detail_drawn:
+            self._draw_detail_level(draw, detail, scale, offset_x, offset_y, (x1, y1, x2, y2))
+        return image
+
+    def _points(self, coords: List[float], scale: float, offset_x: float, offset_y: float) -> List[float]:
+        return [v * scale - (offset_x if i % 2 == 0 else offset_y) for i, v in enumerate(coords)]
+
+    def _font(self, size: int) -> Any:
+        font = self._fonts.get(size)
+        if font is None:
+            try:
+                font = ImageFont.truetype("arial.ttf", size)
+            except OSError:
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    font = ImageFont.load_default()  # Pillow < 10.1 - czcionka bitmapowa bez rozmiaru
+            self._fonts[size] = font
+        return font
+
+    def _draw_primitive(self, draw: ImageDraw.ImageDraw, prim: SvgPrimitive, scale: float,
+                        offset_x: float, offset_y: float):
+        """Prymityw w stylu odpowiedniej metody render_* podglądu"""
+        kind = prim.kind
+        if kind in ('line', 'polyline'):
+            stroke = _color(prim.stroke, self.colors['line'], self._colors)
+            if stroke is not None:
+                width = round(max(prim.stroke_width * scale, 1))
+                draw.line(self._points(prim.geometry, scale, offset_x, offset_y), fill=stroke, width=width,
+                          joint='curve' if kind == 'polyline' else None)
+        elif kind == 'rect':
+            x1, y1, x2, y2 = self._points(prim.geometry, scale, offset_x, offset_y)
+            draw.rectangle((min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)),
+                           fill=_color(prim.fill, 'white', self._colors),
+                           outline=_color(prim.stroke, 'black', self._colors),
+                           width=round(max(prim.stroke_width * scale, 1)))
+        elif kind == 'circle':
+            cx, cy, r = prim.geometry
+            r = max(r * scale, 2)
+            cx, cy = cx * scale - offset_x, cy * scale - offset_y
+            draw.ellipse((cx - r, cy - r, cx + r, cy + r),
+                         fill=_color(prim.fill, 'white', self._colors),
+                         outline=_color(prim.stroke, 'black', self._colors))
+        elif kind == 'text':
+            fill = _color(prim.fill, self.colors['text'], self._colors)
+            if fill is not None:
+                x, y = prim.geometry
+                font = self._font(max(int(prim.font_size * scale), MIN_FONT_PX))
+                draw.text((x * scale - offset_x, y * scale - offset_y), prim.label, fill=fill, font=font, anchor='lm')
+
+    def _draw_detail_level(self, draw: ImageDraw.ImageDraw, detail: str, scale: float,
+                           offset_x: float, offset_y: float, region: Tuple[float, float, float, float]):
+        """Uproszczone elementy oddalonego widoku (jak render_detail_level podglądu)"""
+        if detail == LOD_FULL:
+            return
+        levels = self.model.detail_levels
+        view_x1, view_y1, view_x2, view_y2 = region
+
+        for chain in levels.chains:
+            if detail == LOD_INVERTERS and chain.group:
+                continue
+            x1, y1, x2, y2 = chain.bounds
+            if x2 < view_x1 or x1 > view_x2 or y2 < view_y1 or y1 > view_y2:
+                continue
+            stroke = _color(chain.stroke, self.colors['line'], self._colors)
+            if stroke is not None:
+                draw.line(self._points(chain.coords, scale, offset_x, offset_y), fill=stroke,
+                          width=round(max(chain.stroke_width * scale, 1)), joint='curve')
+
+        if detail == LOD_INVERTERS:
+            color = _color(self.inverter_color, self.colors['line'], self._colors)
+            for inverter_id, bounds in levels.inverter_boxes.items():
+                x1, y1, x2, y2 = bounds
+                if x2 < view_x1 or x1 > view_x2 or y2 < view_y1 or y1 > view_y2:
+                    continue
+                x1, y1, x2, y2 = self._points(bounds, scale, offset_x, offset_y)
+                draw.rectangle((x1, y1, x2, y2), outline=color, width=1)
+                if x2 - x1 >= self.inverter_label_px:
+                    draw.text((x1, y1), inverter_id, fill=color, font=self._font(MIN_FONT_PX), anchor='ls')
@@ -0,0 +1,257 @@
+"""
+Wspólne przygotowanie sceny dla generatorów SVG - punkty, outliers, granice, transformacje
+i podsumowania stringów liczone raz na konwersję (wektorowo, NumPy)
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+from src.utils.console_logger import console, logger
+from src.core.geometry_utils import find_main_cluster
+import src.core.config as config
+from src.core.config import ConfigSnapshot
+
+# Rodzaje rysunków i kategorie punktów, z których liczone są ich granice (kolejność ma znaczenie dla średniej klastra)
+SCENE_KINDS = {
+    'basic': ('assigned', 'unassigned', 'texts', 'unassigned_texts'),
+    'interactive': ('assigned', 'unassigned', 'station_texts', 'unassigned_texts'),
+    'structured': ('assigned',),
+}
+
+# Dodatkowy margines viewBox strukturalnego SVG (stroke, wysokość prostokątów)
+VIEWBOX_PADDING = 20
+
+
+class SceneFrame:
+    """Granice rysunku i transformacja współrzędnych DXF -> SVG (margines, odwrócenie osi Y)"""
+
+    __slots__ = ('min_x', 'max_x', 'min_y', 'max_y', 'margin', 'width', 'height')
+
+    def __init__(self, min_x: float, max_x: float, min_y: float, max_y: float, margin: float):
+        self.min_x = min_x
+        self.max_x = max_x
+        self.min_y = min_y
+        self.max_y = max_y
+        self.margin = margin
+        self.width = max_x - min_x + 2 * margin
+        self.height = max_y - min_y + 2 * margin
+
+    def scale_x(self, x: float) -> float:
+        return x - self.min_x + self.margin
+
+    def scale_y(self, y: float) -> float:
+        return self.height - (y - self.min_y + self.margin)  # Odwrócenie osi Y
+
+
+class StructuredFrame:
+    """
+    Transformacja strukturalnego SVG: skalowanie do SVG_WIDTH x SVG_HEIGHT z zachowaniem proporcji
+    oraz viewBox dopasowany do rzeczywistych granic wyrenderowanych prostokątów
+    """
+
+    __slots__ = ('min_x', 'min_y', 'scale_factor', 'scaled_width', 'scaled_height', 'viewbox_height',
+                 'segment_height', 'rendered_bounds', 'view_box')
+
+    def __init__(self, bounds: Tuple[float, float, float, float], margin: float, svg_width: float,
+                 svg_height: float, mptt_height: float):
+        min_x, max_x, min_y, max_y = bounds
+        # Dodaj margines
+        min_x -= margin
+        max_x += margin
+        min_y -= margin
+        max_y += margin
+        data_width = max_x - min_x
+        data_height = max_y - min_y
+
+        # Użyj mniejszego współczynnika aby zachować proporcje
+        self.scale_factor = min(svg_width / data_width, svg_height / data_height)
+        self.scaled_width = data_width * self.scale_factor
+        self.scaled_height = data_height * self.scale_factor
+        self.viewbox_height = self.scaled_height + VIEWBOX_PADDING * 2
+        self.min_x = min_x
+        self.min_y = min_y
+        self.segment_height = mptt_height * self.scale_factor
+        self.rendered_bounds = None
+        self.view_box = None
+
+    def scale_x(self, x):
+        return (x - self.min_x) * self.scale_factor + VIEWBOX_PADDING
+
+    def scale_y(self, y):
+        return self.viewbox_height - VIEWBOX_PADDING - ((y - self.min_y) * self.scale_factor)
+
+    def segment_rects(self, starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """
+        Prostokąty segmentów w przestrzeni SVG (x, y, width) - przerwa 1% szerokości dla segmentów > 2,
+        pionowo wyśrodkowane na niższym końcu segmentu
+        """
+        x1, y1 = starts[:, 0], starts[:, 1]
+        x2, y2 = ends[:, 0], ends[:, 1]
+        y_val = np.minimum(y1, y2)
+        segment_width = np.abs(x2 - x1)
+        gap = segment_width * 0.01
+        wide = segment_width > 2
+        actual_width = np.where(wide, segment_width - gap, segment_width)
+        x_start = np.where(wide, np.minimum(x1, x2) + gap/2, np.minimum(x1, x2))
+        svg_x = self.scale_x(x_start)
+        svg_y = self.scale_y(y_val) - self.segment_height/2
+        return svg_x, svg_y, actual_width * self.scale_factor
+
+    def fit_view_box(self, starts: np.ndarray, ends: np.ndarray, padding: float = 20):
+        """Rzeczywiste granice wszystkich prostokątów i viewBox (min_x, min_y, width, height) z paddingiem"""
+        if len(starts):
+            svg_x, svg_y, svg_width = self.segment_rects(starts, ends)
+            rendered_min_x = float(svg_x.min())
+            rendered_max_x = float((svg_x + svg_width).max())
+            rendered_min_y = float(svg_y.min())
+            rendered_max_y = float((svg_y + self.segment_height).max())
+        else:
+            rendered_min_x = rendered_min_y = float('inf')
+            rendered_max_x = rendered_max_y = float('-inf')
+        self.rendered_bounds = (rendered_min_x, rendered_max_x, rendered_min_y, rendered_max_y)
+        self.view_box = (rendered_min_x - padding, rendered_min_y - padding,
+                         (rendered_max_x - rendered_min_x) + 2 * padding,
+                         (rendered_max_y - rendered_min_y) + 2 * padding)
+
+
+class Scene:
+    """
+    Scena jednej konwersji (stacji): punkty wszystkich kategorii jako tablice NumPy, maska outlierów,
+    granice i transformacje dla każdego rodzaju SVG oraz podsumowania stringów.
+    Wyniki są liczone leniwie i zapamiętywane - interaktywny i strukturalny SVG korzystają z jednej sceny.
+    Scena opisuje dane z chwili utworzenia - po edycji przypisań należy utworzyć nową; generatory
+    powinny dostać tę samą migawkę konfiguracji (cfg), z którą zbudowano scenę.
+    """
+
+    def __init__(self, inverter_data: Dict, texts: List, unassigned_texts: List, unassigned_segments: List,
+                 station_id: str = None, cfg: ConfigSnapshot = None):
+        if cfg is None:
+            cfg = config.snapshot_config()
+        if station_id is None:
+            station_id = cfg.STATION_ID
+        self.cfg = cfg
+        self.station_id = station_id
+
+        # Przypisane segmenty w kolejności inverter_data + podsumowania stringów
+        starts = []
+        ends = []
+        self.strings = []  # [{'inverter_id', 'string_id', 'start', 'stop', 'segment_count'}]
+        self.string_segments = {}  # string_id -> segmenty z pierwszego falownika, który go zawiera
+        for inverter_id, strings in inverter_data.items():
+            for string_id, segments in strings.items():
+                first = len(starts)
+                for seg in segments:
+                    starts.append(seg['start'])
+                    ends.append(seg['end'])
+                self.strings.append({
+                    'inverter_id': inverter_id,
+                    'string_id': string_id,
+                    'start': first,
+                    'stop': len(starts),
+                    'segment_count': len(starts) - first,
+                })
+                self.string_segments.setdefault(string_id, segments)
+        self.assigned_starts = _points_array(starts)
+        self.assigned_ends = _points_array(ends)
+
+        self.unassigned_starts = _points_array([seg['start'] for seg in unassigned_segments])
+        self.unassigned_ends = _points_array([seg['end'] for seg in unassigned_segments])
+        self.text_points = _points_array([text['pos'] for text in texts])
+        self.unassigned_text_points = _points_array([text['pos'] for text in unassigned_texts])
+
+        # Teksty docelowej stacji (parsowanie raz dla wszystkich generatorów)
+        from src.core.config import parse_text_to_dict
+        mask = []
+        for text in texts:
+            parsed = parse_text_to_dict(text['id'], station_id, cfg)
+            mask.append(bool(parsed) and parsed.get('station') == station_id)
+        self.station_text_mask = np.array(mask, dtype=bool)
+
+        self._points = {}
+        self._outliers = {}
+        self._frames = {}
+
+    @classmethod
+    def from_result(cls, result: Tuple, station_id: str = None, cfg: ConfigSnapshot = None) -> 'Scene':
+        """Scena z wyniku process_dxf (inverter_data, station_texts, unassigned_texts, unassigned_segments, ...)"""
+        inverter_data, station_texts, unassigned_texts, unassigned_segments = result[:4]
+        return cls(inverter_data, station_texts, unassigned_texts, unassigned_segments, station_id, cfg)
+
+    def category_points(self, category: str) -> np.ndarray:
+        """Punkty jednej kategorii (n, 2); segmenty jako przeplecione początki i końce"""
+        if category == 'assigned':
+            return _interleave(self.assigned_starts, self.assigned_ends)
+        if category == 'unassigned':
+            return _interleave(self.unassigned_starts, self.unassigned_ends)
+        if category == 'texts':
+            return self.text_points
+        if category == 'station_texts':
+            return self.text_points[self.station_text_mask]
+        if category == 'unassigned_texts':
+            return self.unassigned_text_points
+        raise ValueError(f"Nieznana kategoria punktów: {category}")
+
+    def points(self, kind: str) -> np.ndarray:
+        """Wszystkie punkty używane do granic danego rodzaju SVG"""
+        if kind not in self._points:
+            self._points[kind] = np.concatenate([self.category_points(c) for c in SCENE_KINDS[kind]])
+        return self._points[kind]
+
+    def outlier_mask(self, kind: str) -> np.ndarray:
+        """Maska punktów odległych od głównego klastra (True = outlier)"""
+        if kind not in self._outliers:
+            points = self.points(kind)
+            threshold = self.cfg.CLUSTER_DISTANCE_THRESHOLD
+            center = find_main_cluster(points, threshold)
+            distance = np.sqrt(np.float_power(points[:, 0] - center[0], 2) +
+                               np.float_power(points[:, 1] - center[1], 2))
+            self._outliers[kind] = ~(distance <= threshold)
+        return self._outliers[kind]
+
+    def bounds(self, kind: str) -> Tuple[float, float, float, float]:
+        """Granice (min_x, max_x, min_y, max_y) punktów po odrzuceniu outlierów"""
+        points = self.points(kind)
+
+        # Usuń outliers przed obliczaniem granic - filtruj odległe elementy
+        console.processing("Filtrowanie odległych elementów (outliers)")
+        logger.info(f"Punktów przed filtrowaniem outlierów: {len(points)}")
+        outliers = self.outlier_mask(kind)
+        outliers_count = int(outliers.sum())
+        if outliers_count > 0:
+            logger.info(f"Usunięto {outliers_count} odległych elementów (outliers)")
+            console.info(f"Usunięto outliers", f"{outliers_count} elementów")
+
+        filtered = points[~outliers]
+        if not len(filtered):
+            logger.warning("Wszystkie punkty zostały uznane za outliers - używam oryginalnych punktów")
+            filtered = points
+        logger.info(f"Punktów po filtrowaniu outlierów: {len(filtered)}")
+
+        return (float(filtered[:, 0].min()), float(filtered[:, 0].max()),
+                float(filtered[:, 1].min()), float(filtered[:, 1].max()))
+
+    def frame(self, kind: str) -> SceneFrame:
+        """Transformacja podstawowego/interaktywnego SVG (kind = 'basic' lub 'interactive')"""
+        if kind not in self._frames:
+            self._frames[kind] = SceneFrame(*self.bounds(kind), self.cfg.MARGIN)
+        return self._frames[kind]
+
+    def structured_frame(self) -> StructuredFrame:
+        """Transformacja i viewBox strukturalnego SVG"""
+        if 'structured' not in self._frames:
+            cfg = self.cfg
+            frame = StructuredFrame(self.bounds('structured'), cfg.MARGIN, cfg.SVG_WIDTH, cfg.SVG_HEIGHT,
+                                    cfg.MPTT_HEIGHT)
+            frame.fit_view_box(self.assigned_starts, self.assigned_ends)
+            self._frames['structured'] = frame
+        return self._frames['structured']
+
+
+def _points_array(points: List) -> np.ndarray:
+    """Lista punktów (x, y) jako tablica float64 (n, 2)"""
+    if not len(points):
+        return np.empty((0, 2), dtype=np.float64)
+    return np.array(points, dtype=np.float64).reshape(-1, 2)
+
+
+def _interleave(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Początki i końce segmentów naprzemiennie: start0, end0, start1, end1, ..."""
+    return np.stack((starts, ends), axis=1).reshape(-1, 2)
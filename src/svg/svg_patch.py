@@ -0,0 +1,214 @@
+"""
+Przyrostowa aktualizacja interaktywnego SVG po edycji przypisań - zamiast ponownego generowania,
+zapisu i parsowania całego pliku zmieniane są tylko elementy, których stan faktycznie się zmienił
+(kolor i grupa przypisania linii i kropek tekstów, treść i styl etykiet tekstów).
+"""
+from typing import Dict, List, Optional
+import xml.etree.ElementTree as ET
+import src.core.config as config
+from src.core.config import ConfigSnapshot
+from src.svg.svg_stream import claim_output
+
+SVG_NAMESPACE = 'http://www.w3.org/2000/svg'
+
+# Kolor linii segmentu przypisanego i jednocześnie nieprzypisanego (jak w generate_interactive_svg)
+DUPLICATE_SEGMENT_COLOR = '#FFFF00'
+
+# Przesunięcie etykiety tekstu względem kropki (wielokrotność DOT_RADIUS, jak w generate_interactive_svg)
+ASSIGNED_LABEL_OFFSET = 1.5
+UNASSIGNED_LABEL_OFFSET = 1.8
+
+
+def _local_tag(elem: ET.Element) -> str:
+    """Nazwa znacznika bez przestrzeni nazw"""
+    return elem.tag.rsplit('}', 1)[-1]
+
+
+def _attribute(value) -> str:
+    """Wartość atrybutu jak w SvgStreamWriter (profil 'tiny' - liczby zaokrąglone do 4 miejsc)"""
+    if isinstance(value, float):
+        value = round(value, 4)
+    return str(value)
+
+
+class InteractiveSvgPatcher:
+    """
+    Łatki interaktywnego SVG (drzewo ElementTree wczytane przez podgląd).
+
+    Stan narysowany w dokumencie jest odczytywany z samego drzewa, więc patcher można utworzyć
+    dla dowolnie wczytanego pliku z generate_interactive_svg. Numeracja segmentów (data-svg-number)
+    pozostaje stabilna między łatkami - pełna regeneracja numeruje od nowa.
+    """
+
+    def __init__(self, root: ET.Element, cfg: ConfigSnapshot = None):
+        self.root = root
+        self.cfg = cfg
+        self.segment_lines = {}  # segment_id -> {'assigned': linia, 'unassigned': linia}
+        self.text_labels = {}  # text_id -> [(etykieta, rodzic)]
+        self.text_markers = {}  # text_id -> [(kropka tekstu 'text-marker', rodzic)]
+
+        for group in root.iter():
+            if _local_tag(group) != 'g':
+                continue
+            group_id = group.get('id')
+            if group_id not in ('assigned_elements', 'unassigned_segments', 'unassigned_texts'):
+                continue
+            role = 'assigned' if group_id == 'assigned_elements' else 'unassigned'
+            marker = None  # Kropka nieprzypisanego tekstu - należy do następnej etykiety
+            for elem in group:
+                tag = _local_tag(elem)
+                if tag == 'line':
+                    segment_id = elem.get('data-segment-id')
+                    if segment_id:
+                        self.segment_lines.setdefault(segment_id, {})[role] = elem
+                elif tag == 'circle' and elem.get('class') == 'text-marker':
+                    # Kropka przypisanego tekstu ma grupę przypisania (także bez etykiety)
+                    text_id = elem.get('data-assignment-group')
+                    if text_id:
+                        self.text_markers.setdefault(text_id, []).append((elem, group))
+                    else:
+                        marker = elem
+                elif tag == 'text' and not elem.get('class'):
+                    # Etykiety tekstów (bez numerów segmentów 'segment-label')
+                    if role == 'assigned':
+                        text_id = elem.get('data-assignment-group')
+                    else:
+                        text_id = elem.text
+                    if text_id:
+                        self.text_labels.setdefault(text_id, []).append((elem, group))
+                        if marker is not None:
+                            self.text_markers.setdefault(text_id, []).append((marker, group))
+                    marker = None
+
+    def sync(self, inverter_data: Dict, unassigned_texts: List, unassigned_segments: List) -> Optional[Dict]:
+        """
+        Doprowadź dokument do stanu przypisań. Zwraca {'updated': [elementy], 'removed': [elementy]}
+        albo None, gdy zmiany nie da się nanieść bez pełnej regeneracji (element nieobecny w dokumencie).
+        """
+        cfg = self.cfg if self.cfg is not None else config.snapshot_config()
+
+        # Stan docelowy (jak w generate_interactive_svg: grupa segmentu - ostatni string,
+        # numery w etykiecie - segmenty z pierwszego falownika zawierającego string)
+        segment_text = {}
+        text_segments = {}
+        for strings in inverter_data.values():
+            for text_id, segments in strings.items():
+                for seg in segments:
+                    if 'id' in seg:
+                        segment_text[str(seg['id'])] = text_id
+                text_segments.setdefault(text_id, segments)
+        unassigned_segment_ids = {str(seg.get('id')) for seg in unassigned_segments if seg.get('id')}
+        unassigned_text_ids = {text['id'] for text in unassigned_texts}
+
+        # Treść etykiet tekstów przypisanych - numery segmentów z dokumentu
+        labels = {}
+        for text_id, segments in text_segments.items():
+            numbers = []
+            for seg in segments:
+                lines = self.segment_lines.get(str(seg.get('id')), {})
+                line = lines.get('assigned', lines.get('unassigned'))
+                if line is not None:
+                    numbers.append(line.get('data-svg-number'))
+            if numbers:
+                labels[text_id] = f"{text_id} ({' '.join(f'#{num}' for num in numbers)})"
+        for text_id in unassigned_text_ids:
+            labels.setdefault(text_id, None)
+
+        # Elementów brakujących w dokumencie nie da się dołożyć bez pełnej regeneracji
+        if any(segment_id not in self.segment_lines for segment_id in segment_text):
+            return None
+        if any(text_id not in self.text_labels for text_id in labels):
+            return None
+
+        updated = []
+        removed = []
+
+        # Linie segmentów - kolor i grupa przypisania
+        for segment_id, lines in self.segment_lines.items():
+            text_id = segment_text.get(segment_id)
+            for role, line in lines.items():
+                if text_id is None:
+                    stroke, group = cfg.UNASSIGNED_SEGMENT_COLOR, None
+                elif role == 'unassigned' and segment_id in unassigned_segment_ids:
+                    stroke, group = DUPLICATE_SEGMENT_COLOR, None
+                else:
+                    stroke, group = cfg.ASSIGNED_SEGMENT_COLOR, text_id
+                if line.get('stroke') != stroke or line.get('data-assignment-group') != group:
+                    line.set('stroke', stroke)
+                    self._set_group(line, group)
+                    updated.append(line)
+
+        # Etykiety tekstów - treść z numerami segmentów i styl (None = etykieta nieprzypisanego tekstu)
+        for text_id, content in labels.items():
+            for label, _ in self.text_labels[text_id]:
+                if content is not None:
+                    changed = self._restyle_label(label, content, text_id, cfg)
+                else:
+                    changed = self._restyle_label(label, text_id, None, cfg)
+                if changed:
+                    updated.append(label)
+            # Kropki tekstu - grupa przypisania (podświetlanie) jak etykieta
+            group = text_id if content is not None else None
+            for marker, _ in self.text_markers.get(text_id, []):
+                if marker.get('data-assignment-group') != group:
+                    self._set_group(marker, group)
+                    updated.append(marker)
+
+        # Teksty, które nie są już ani przypisane, ani nieprzypisane (np. pominięte)
+        for text_id in [t for t in dict.fromkeys([*self.text_labels, *self.text_markers]) if t not in labels]:
+            for label, parent in self.text_labels.pop(text_id, []):
+                parent.remove(label)
+                removed.append(label)
+            for marker, parent in self.text_markers.pop(text_id, []):
+                parent.remove(marker)
+                removed.append(marker)
+
+        return {'updated': updated, 'removed': removed}
+
+    def segment_numbers(self) -> Dict[str, int]:
+        """Numery SVG segmentów widoczne w dokumencie: segment_id (tekst) -> data-svg-number"""
+        numbers = {}
+        for segment_id, lines in self.segment_lines.items():
+            line = lines.get('assigned', lines.get('unassigned'))
+            number = line.get('data-svg-number')
+            if number and number.isdigit():
+                numbers[segment_id] = int(number)
+        return numbers
+
+    @staticmethod
+    def _set_group(elem: ET.Element, group: Optional[str]):
+        if group is None:
+            elem.attrib.pop('data-assignment-group', None)
+        else:
+            elem.set('data-assignment-group', group)
+
+    def _restyle_label(self, label: ET.Element, content: str, group: Optional[str], cfg: ConfigSnapshot) -> bool:
+        """Ustaw treść i styl etykiety (przypisanej gdy group podane); True gdy coś się zmieniło"""
+        was_assigned = label.get('data-assignment-group') is not None
+        if label.text == content and was_assigned == (group is not None):
+            return False
+
+        if group is not None:
+            fill, opacity, font_size, offset = cfg.TEXT_COLOR_ASSIGNED, 0.6, cfg.TEXT_SIZE*0.6, ASSIGNED_LABEL_OFFSET
+        else:
+            fill, opacity, font_size, offset = (cfg.TEXT_COLOR_UNASSIGNED, 0.8, cfg.TEXT_SIZE*0.7,
+                                                UNASSIGNED_LABEL_OFFSET)
+        if was_assigned != (group is not None):
+            # Przesunięcie etykiety względem kropki tekstu zależy od stanu
+            old_offset = ASSIGNED_LABEL_OFFSET if was_assigned else UNASSIGNED_LABEL_OFFSET
+            label.set('x', str(float(label.get('x', 0)) + (offset - old_offset) * cfg.DOT_RADIUS))
+        label.text = content
+        label.set('fill', fill)
+        label.set('opacity', _attribute(opacity))
+        label.set('font-size', _attribute(font_size))
+        self._set_group(label, group)
+        return True
+
+
+def write_svg_tree(root: ET.Element, output_path: str):
+    """Zapisz (zmodyfikowane) drzewo SVG do pliku bez prefiksów przestrzeni nazw"""
+    claim_output(output_path)
+    ET.register_namespace('', SVG_NAMESPACE)
+    ET.register_namespace('xlink', 'http://www.w3.org/1999/xlink')
+    ET.register_namespace('ev', 'http://www.w3.org/2001/xml-events')
+    ET.ElementTree(root).write(output_path, encoding='utf-8', xml_declaration=True)
@@ -0,0 +1,424 @@
+"""
+Strumieniowy zapis SVG - elementy trafiają od razu do buforowanego pliku, bez drzewa obiektów svgwrite.
+Wynik jest identyczny znak w znak z Drawing.save() z svgwrite (kolejność i format atrybutów,
+zaokrąglanie w profilu 'tiny', escapowanie jak w xml.etree.ElementTree).
+
+SvgTreeWriter o tym samym interfejsie buduje zamiast pliku dokument w pamięci (SvgDocument - drzewo
+ElementTree, takie jak po parsowaniu pliku), który podgląd może wczytać bez zapisu i parsowania.
+"""
+import io
+import os
+import atexit
+import threading
+import xml.etree.ElementTree as ET
+from typing import Any, Callable, Dict, Optional, Tuple
+import svgwrite
+
+# Domyślny rozmiar bufora zapisu (bajty)
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+XML_HEADER = '<?xml version="1.0" encoding="utf-8" ?>\n'
+
+SVG_NAMESPACE = 'http://www.w3.org/2000/svg'
+
+# Rejestr zapisów plików SVG (klucz - znormalizowana ścieżka, patrz claim_output):
+# trwające zapisy w tle (wątek, SvgDocument.write_async) i ostatni dokument zapisywany do pliku
+_pending_writes = {}
+_latest_documents = {}
+_pending_lock = threading.Lock()
+
+
+def svg_attribute_name(name: str) -> str:
+    """Nazwa atrybutu SVG z nazwy argumentu (jak svgwrite): 'class_' -> 'class', 'stroke_width' -> 'stroke-width'"""
+    return name.rstrip('_').replace('_', '-')
+
+
+def escape_attribute(text: str) -> str:
+    """Escapowanie wartości atrybutu (jak xml.etree.ElementTree)"""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    if "\"" in text:
+        text = text.replace("\"", "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+
+def escape_text(text: str) -> str:
+    """Escapowanie treści elementu (jak xml.etree.ElementTree)"""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+class SvgStreamWriter:
+    """
+    Zapisuje dokument SVG strumieniowo: nagłówek przy otwarciu, elementy w kolejności wywołań,
+    zamknięcie przy close(). Pamięć nie zależy od liczby elementów.
+
+    Użycie:
+        with SvgStreamWriter(path, size=("100px", "50px"), profile='tiny') as svg:
+            line = svg.template('line', ('x1', 'y1', 'x2', 'y2'), stroke='#000', stroke_width=1)
+            with svg.group('assigned_elements'):
+                line(0.0, 1.0, 2.0, 1.0)
+    """
+
+    def __init__(self, output_path: str, size: Tuple[Any, Any] = ('100%', '100%'), profile: str = 'full',
+                 buffer_size: int = DEFAULT_BUFFER_SIZE, **extra):
+        self.output_path = output_path
+        self.tiny = profile == 'tiny'
+        self.streaming = True
+        self._open_groups = []
+        self._group_has_children = []
+        self._root_start = _render_root_start(output_path, size, profile, extra)
+
+        # Ten sam sposób otwarcia co Drawing.save() (tryb tekstowy, utf-8)
+        claim_output(output_path)
+        self._file = io.open(output_path, mode='w', encoding='utf-8', buffering=buffer_size)
+        self._file.write(XML_HEADER)
+        self._file.write(self._root_start)
+        self.write = self._file.write
+
+    def __enter__(self) -> 'SvgStreamWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Zamknij otwarte grupy, element główny i plik"""
+        if self._file is None:
+            return
+        while self._open_groups:
+            self.end_group()
+        self._file.write('</svg>')
+        self._file.close()
+        self._file = None
+
+    def format_value(self, value: Any) -> str:
+        """Wartość atrybutu jako tekst (jak BaseElement.value_to_string, bez walidacji)"""
+        if isinstance(value, (int, float)):
+            if isinstance(value, float) and self.tiny:
+                value = round(value, 4)
+            return str(value)
+        return escape_attribute(str(value))
+
+    def _child_written(self):
+        """Domknij znacznik otwarcia grupy przed pierwszym dzieckiem"""
+        if self._group_has_children and not self._group_has_children[-1]:
+            self._group_has_children[-1] = True
+            self.write('>')
+
+    def begin_group(self, group_id: str):
+        """Rozpocznij grupę <g id=...>"""
+        self._child_written()
+        self.write(f'<g id="{self.format_value(group_id)}"')
+        self._open_groups.append(group_id)
+        self._group_has_children.append(False)
+
+    def end_group(self):
+        """Zakończ ostatnią grupę (pusta grupa jako <g ... />, jak ElementTree)"""
+        self._open_groups.pop()
+        has_children = self._group_has_children.pop()
+        self.write('</g>' if has_children else ' />')
+
+    def group(self, group_id: str) -> '_GroupContext':
+        """Grupa jako context manager"""
+        return _GroupContext(self, group_id)
+
+    def element(self, tag: str, attribs: Dict[str, Any], text: Optional[str] = None):
+        """
+        Zapisz dowolny element (ścieżka ogólna). Klucze attribs to nazwy SVG ('stroke-width', 'data-*');
+        wartości None i puste są pomijane, atrybuty sortowane jak w svgwrite.
+        """
+        self._child_written()
+        parts = ['<', tag]
+        for name, value in sorted(attribs.items()):
+            if value is None:
+                continue
+            value = self.format_value(value)
+            if value:
+                parts.append(f' {name}="{value}"')
+        text = None if text is None else str(text)
+        if text:
+            parts.append(f'>{escape_text(text)}</{tag}>')
+        else:
+            parts.append(' />')
+        self.write(''.join(parts))
+
+    def template(self, tag: str, dynamic: Tuple[str, ...] = (), text: bool = False, **static) -> 'ElementTemplate':
+        """
+        Prekompilowany szablon elementu. Atrybuty stałe (static, nazwy jak w svgwrite: stroke_width, class_)
+        są formatowane raz; wartości atrybutów dynamicznych (nazwy SVG) podaje się przy każdym wywołaniu.
+        """
+        return ElementTemplate(self, tag, dynamic, text,
+                               {svg_attribute_name(name): value for name, value in static.items()})
+
+
+class ElementTemplate:
+    """
+    Szablon elementu: wywołanie template(*values) lub template(text, *values) dla elementów z treścią.
+    Kolejność values odpowiada kolejności atrybutów dynamicznych.
+    """
+
+    __slots__ = ('writer', 'tag', 'dynamic', 'has_text', 'static', '_format')
+
+    def __init__(self, writer: SvgStreamWriter, tag: str, dynamic: Tuple[str, ...], has_text: bool,
+                 static: Dict[str, Any]):
+        overlap = set(dynamic) & set(static)
+        if overlap:
+            raise ValueError(f"Atrybuty jednocześnie stałe i dynamiczne: {sorted(overlap)}")
+
+        self.writer = writer
+        self.tag = tag
+        self.dynamic = tuple(dynamic)
+        self.has_text = has_text
+        self.static = static
+
+        rendered = {}
+        for name, value in static.items():
+            if value is not None:
+                value = writer.format_value(value)
+                if value:
+                    rendered[name] = value.replace('{', '{{').replace('}', '}}')
+        slots = {name: index for index, name in enumerate(self.dynamic)}
+        for name in self.dynamic:
+            rendered[name] = f'{{{slots[name]}}}'
+
+        parts = ['<', tag]
+        for name in sorted(rendered):
+            parts.append(f' {name}="{rendered[name]}"')
+        if has_text:
+            parts.append(f'>{{{len(self.dynamic)}}}</{tag}>')
+        else:
+            parts.append(' />')
+        self._format = ''.join(parts).format
+
+    def __call__(self, *args):
+        writer = self.writer
+        if self.has_text:
+            text, values = str(args[0]), args[1:]
+        else:
+            text, values = None, args
+
+        formatted = [None if value is None else writer.format_value(value) for value in values]
+        if not writer.streaming or not all(formatted) or (self.has_text and not text):
+            # Dokument w pamięci, brakujące/puste atrybuty lub pusta treść - ścieżka ogólna (pomija je jak svgwrite)
+            attribs = dict(self.static)
+            attribs.update(zip(self.dynamic, values))
+            writer.element(self.tag, attribs, text)
+            return
+
+        writer._child_written()
+        if self.has_text:
+            formatted.append(escape_text(text))
+        writer.write(self._format(*formatted))
+
+
+class _GroupContext:
+    __slots__ = ('writer', 'group_id')
+
+    def __init__(self, writer: SvgStreamWriter, group_id: str):
+        self.writer = writer
+        self.group_id = group_id
+
+    def __enter__(self) -> SvgStreamWriter:
+        self.writer.begin_group(self.group_id)
+        return self.writer
+
+    def __exit__(self, exc_type, exc, tb):
+        self.writer.end_group()
+        return False
+
+
+class SvgTreeWriter(SvgStreamWriter):
+    """
+    Ten sam interfejs co SvgStreamWriter (grupy, element(), template()), ale elementy trafiają do drzewa
+    ElementTree w pamięci. Wartości atrybutów są formatowane jak w pliku, znaczniki mają przestrzeń nazw SVG -
+    drzewo jest takie samo jak po ET.parse() pliku zapisanego strumieniowo. Wynik: self.document po close().
+    """
+
+    def __init__(self, size: Tuple[Any, Any] = ('100%', '100%'), profile: str = 'full', **extra):
+        self.output_path = None
+        self.tiny = profile == 'tiny'
+        self.streaming = False
+        self._open_groups = []
+        self._group_has_children = []
+        self._root_start = _render_root_start(None, size, profile, extra)
+        self._file = None
+        self.document = SvgDocument(ET.fromstring(self._root_start + '</svg>'), self._root_start)
+        self._parents = [self.document.root]
+
+    def close(self):
+        """Zamknij otwarte grupy - dokument jest gotowy"""
+        while self._open_groups:
+            self.end_group()
+
+    def begin_group(self, group_id: str):
+        group = ET.SubElement(self._parents[-1], _qualified('g'), {'id': self.format_value(group_id)})
+        self._parents.append(group)
+        self._open_groups.append(group_id)
+
+    def end_group(self):
+        self._open_groups.pop()
+        self._parents.pop()
+
+    def format_value(self, value: Any) -> str:
+        """Wartość atrybutu jako tekst (bez escapowania - robi je serializacja)"""
+        if isinstance(value, float) and self.tiny:
+            value = round(value, 4)
+        return str(value)
+
+    def element(self, tag: str, attribs: Dict[str, Any], text: Optional[str] = None):
+        attrib = {}
+        for name, value in sorted(attribs.items()):
+            if value is None:
+                continue
+            value = self.format_value(value)
+            if value:
+                attrib[name] = value
+        elem = ET.SubElement(self._parents[-1], _qualified(tag), attrib)
+        text = None if text is None else str(text)
+        if text:
+            elem.text = text
+
+
+class SvgDocument:
+    """
+    Dokument SVG w pamięci: root - drzewo ElementTree (jak po parsowaniu pliku), root_start - znacznik
+    otwarcia elementu głównego w formacie svgwrite. write() zapisuje plik identyczny ze strumieniowym.
+    """
+
+    def __init__(self, root: ET.Element, root_start: str):
+        self.root = root
+        self.root_start = root_start
+        # Elementy zawarte już w root_start (<defs /> z svgwrite) - nie są serializowane ponownie
+        self._header_children = len(root)
+
+    def tostring(self) -> str:
+        """Pełny tekst pliku SVG (nagłówek XML + dokument)"""
+        parts = [XML_HEADER, self.root_start]
+        for child in self.root[self._header_children:]:
+            _serialize(child, parts)
+        parts.append('</svg>')
+        return ''.join(parts)
+
+    def write(self, output_path: str):
+        """Zapisz dokument do pliku"""
+        claim_output(output_path, self)
+        self._write_file(output_path)
+
+    def _write_file(self, output_path: str):
+        with io.open(output_path, mode='w', encoding='utf-8', buffering=DEFAULT_BUFFER_SIZE) as f:
+            f.write(self.tostring())
+
+    def write_async(self, output_path: str, on_done: Callable[[str], None] = None) -> threading.Thread:
+        """
+        Zapis pliku w tle (wątek). Przed odczytem pliku należy wywołać wait_for_write(output_path);
+        dokumentu nie należy modyfikować do końca zapisu. on_done(output_path) jest wołane w wątku zapisu.
+        """
+        key = _path_key(output_path)
+
+        def run():
+            try:
+                self._write_file(output_path)
+                if on_done is not None:
+                    on_done(output_path)
+            finally:
+                with _pending_lock:
+                    if _pending_writes.get(key) is thread:
+                        del _pending_writes[key]
+
+        claim_output(output_path, self)
+        thread = threading.Thread(target=run, name=f"svg-write:{output_path}", daemon=True)
+        with _pending_lock:
+            _pending_writes[key] = thread
+        thread.start()
+        return thread
+
+
+def _path_key(output_path: str) -> str:
+    """Klucz rejestru zapisów - ta sama ścieżka podana względnie i bezwzględnie to jeden plik"""
+    return os.path.normcase(os.path.abspath(output_path))
+
+
+def claim_output(output_path: str, document: Optional[SvgDocument] = None):
+    """
+    Zgłoś nowy zapis pliku SVG (przechodzi przez to każdy zapis: strumieniowy, SvgDocument, drzewo łatek):
+    poczekaj na trwający zapis w tle tej ścieżki i zapamiętaj najnowszy dokument pliku
+    (None - zapis bez dokumentu w pamięci). Łatki starszego dokumentu nie nadpiszą wtedy nowego pliku.
+    """
+    wait_for_write(output_path)
+    with _pending_lock:
+        _latest_documents[_path_key(output_path)] = document
+
+
+def wait_for_write(output_path: str = None):
+    """Poczekaj na zakończenie zapisu w tle danego pliku (lub wszystkich, gdy output_path=None)"""
+    with _pending_lock:
+        if output_path is None:
+            threads = list(_pending_writes.values())
+        else:
+            thread = _pending_writes.get(_path_key(output_path))
+            threads = [thread] if thread is not None else []
+    for thread in threads:
+        if thread is not threading.current_thread():
+            thread.join()
+
+
+# Wątki zapisu są demonami - przy zakończeniu programu dokończ rozpoczęte zapisy (bez uciętych plików)
+atexit.register(wait_for_write)
+
+
+def latest_document(output_path: str) -> Optional[SvgDocument]:
+    """Ostatni dokument zapisywany do danego pliku (None - plik zapisany bez dokumentu w pamięci)"""
+    with _pending_lock:
+        return _latest_documents.get(_path_key(output_path))
+
+
+def open_svg(output_path: Optional[str], size: Tuple[Any, Any] = ('100%', '100%'), profile: str = 'full',
+             document: bool = False, **extra) -> SvgStreamWriter:
+    """Writer SVG: strumieniowy do pliku albo (document=True) budujący SvgDocument w pamięci"""
+    if document:
+        return SvgTreeWriter(size=size, profile=profile, **extra)
+    return SvgStreamWriter(output_path, size=size, profile=profile, **extra)
+
+
+def _render_root_start(output_path: Optional[str], size: Tuple[Any, Any], profile: str, extra: Dict) -> str:
+    """Znacznik otwarcia elementu głównego renderowany przez svgwrite (atrybuty xmlns, profil, wersja)"""
+    root = svgwrite.Drawing(output_path, size=size, profile=profile, debug=False, **extra).tostring()
+    return root[:-len('</svg>')]
+
+
+def _qualified(tag: str) -> str:
+    return f'{{{SVG_NAMESPACE}}}{tag}'
+
+
+def _serialize(elem: ET.Element, parts: list):
+    """Element drzewa jak w SvgStreamWriter (atrybuty sortowane, pusty element jako ' />')"""
+    tag = elem.tag.rsplit('}', 1)[-1]
+    parts.append('<' + tag)
+    for name, value in sorted(elem.attrib.items()):
+        parts.append(f' {name}="{escape_attribute(value)}"')
+    if len(elem):
+        parts.append('>')
+        for child in elem:
+            _serialize(child, parts)
+        parts.append(f'</{tag}>')
+    elif elem.text:
+        parts.append(f'>{escape_text(elem.text)}</{tag}>')
+    else:
+        parts.append(' />')
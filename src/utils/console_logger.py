@@ -4,6 +4,10 @@ Moduł logowania kolorowego do konsoli z emoji i progress barami
 import os
 import time
 import logging
+import multiprocessing
+
+# Zmienna środowiskowa ze ścieżką pliku logu procesu głównego (dla procesów potomnych)
+DEBUG_LOG_ENV = 'DXF2SVG_DEBUG_LOG'
 
 class Colors:
     """ANSI color codes for terminal output"""
@@ -118,16 +122,24 @@ class ConsoleLogger:
 def setup_logging():
     """Konfiguracja systemu logowania - konsola + plik"""
     
-    # Próba usunięcia poprzedniego pliku debug.log
-    try:
-        if os.path.exists('debug.log'):
-            os.remove('debug.log')
-    except PermissionError:
-        # Jeśli plik jest zablokowany, użyj innej nazwy
-        timestamp = int(time.time())
-        debug_filename = f'debug_{timestamp}.log'
+    if multiprocessing.current_process().name != 'MainProcess':
+        # Proces potomny (pula procesów - przy starcie "spawn" moduł jest importowany ponownie,
+        # zanim ustawione zostanie parent_process()): dopisuj do pliku procesu głównego zamiast go usuwać
+        debug_filename = os.environ.get(DEBUG_LOG_ENV, os.path.abspath('debug.log'))
     else:
-        debug_filename = 'debug.log'
+        # Próba usunięcia poprzedniego pliku debug.log
+        try:
+            if os.path.exists('debug.log'):
+                os.remove('debug.log')
+        except PermissionError:
+            # Jeśli plik jest zablokowany, użyj innej nazwy
+            timestamp = int(time.time())
+            debug_filename = f'debug_{timestamp}.log'
+        else:
+            debug_filename = 'debug.log'
+        # Ścieżka dziedziczona przez procesy potomne
+        debug_filename = os.path.abspath(debug_filename)
+        os.environ[DEBUG_LOG_ENV] = debug_filename
     
     # Główny logger
     logger = logging.getLogger()
@@ -0,0 +1,32 @@
+"""Testy przypisywania wielu stacji jednocześnie (assign_stations)"""
+import unittest
+
+from src.core.dxf2svg import assign_stations
+
+
+def _polyline(index, y):
+    return {'id': index, 'polyline_idx': index,
+            'segments': [{'id': index, 'start': (0.0, y), 'end': (10.0, y), 'length': 10.0, 'polyline_idx': index}]}
+
+
+class AssignStationsTest(unittest.TestCase):
+
+    def test_texts_of_different_stations_keep_their_assignments(self):
+        # Oba teksty są pierwsze na listach swoich stacji - rozróżnia je tylko indeks z ekstrakcji
+        texts = {'ZIEA': [{'idx': 0, 'id': 'ZIEA/S01', 'pos': (5.0, 1.0)}],
+                 'ZIEB': [{'idx': 1, 'id': 'ZIEB/S01', 'pos': (5.0, 21.0)}]}
+        polylines = [_polyline(0, 0.0), _polyline(1, 20.0)]
+
+        result = assign_stations(texts, polylines)
+
+        self.assertEqual([(a['text']['id'], a['polyline']['id']) for a in result['ZIEA']], [('ZIEA/S01', 0)])
+        self.assertEqual([(a['text']['id'], a['polyline']['id']) for a in result['ZIEB']], [('ZIEB/S01', 1)])
+
+    def test_text_without_extraction_index_is_rejected(self):
+        texts = {'ZIEA': [{'id': 'ZIEA/S01', 'pos': (5.0, 1.0)}]}
+        with self.assertRaises(ValueError):
+            assign_stations(texts, [_polyline(0, 0.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
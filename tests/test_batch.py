@@ -0,0 +1,50 @@
+"""Testy wsadowej konwersji (src.core.batch)"""
+import multiprocessing
+import os
+import time
+import unittest
+from unittest import mock
+
+from src.core import batch
+
+# Czas przetwarzania plików testowych (s) - zamiast prawdziwej konwersji DXF
+DURATIONS = {'slow_1.dxf': 2.5, 'slow_2.dxf': 2.5, 'fast.dxf': 0.1}
+
+
+def _fake_convert(path, output_dir, kinds=batch.SVG_KINDS, all_stations=False):
+    time.sleep(DURATIONS[os.path.basename(path)])
+    return {'file': path, 'status': 'ok', 'stations': {}, 'timings': {'total': DURATIONS[os.path.basename(path)]}}
+
+
+@unittest.skipUnless(multiprocessing.get_start_method() == 'fork',
+                     "podmieniona konwersja jest dziedziczona tylko przez procesy z fork")
+class RunBatchTimeoutTest(unittest.TestCase):
+
+    def test_queued_file_is_not_timed_out_while_waiting(self):
+        # Jeden proces: slow_2 czeka w kolejce puli za slow_1 (łącznie dłużej niż limit),
+        # ale jego własne przetwarzanie mieści się w limicie
+        files = list(DURATIONS)
+        with mock.patch.object(batch, 'convert_file', _fake_convert), mock.patch.object(batch, '_report'):
+            entries = batch.run_batch(files, None, 'unused', workers=1, timeout=3)
+
+        self.assertEqual([entry['status'] for entry in entries], ['ok', 'ok', 'ok'])
+
+
+class OutputDirsTest(unittest.TestCase):
+
+    def test_same_name_in_different_directories_gets_separate_outputs(self):
+        files = [os.path.join('archiwum', 'a', 'plan.dxf'), os.path.join('archiwum', 'b', 'plan.dxf'),
+                 os.path.join('archiwum', 'b', 'inny.dxf')]
+        dirs = batch.output_dirs_for(files, 'svg')
+
+        self.assertEqual(dirs[files[0]], os.path.join('svg', 'a'))
+        self.assertEqual(dirs[files[1]], os.path.join('svg', 'b'))
+        self.assertEqual(dirs[files[2]], os.path.join('svg', 'b'))
+
+    def test_files_from_one_directory_go_to_output_dir(self):
+        files = [os.path.join('archiwum', 'plan.dxf'), os.path.join('archiwum', 'inny.dxf')]
+        self.assertEqual(set(batch.output_dirs_for(files, 'svg').values()), {'svg'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import logging
+import multiprocessing
+import os
+import unittest
+
+from src.utils.console_logger import DEBUG_LOG_ENV
+
+
+def _log_in_child(message):
+    # Import w procesie "spawn" ponownie wykonuje setup_logging
+    from src.utils.console_logger import logger
+    logger.info(message)
+    for handler in logger.handlers:
+        handler.flush()
+
+
+class SetupLoggingChildProcessTest(unittest.TestCase):
+    def test_spawned_child_appends_to_parent_log(self):
+        parent_message = f"parent-{os.getpid()}"
+        child_message = f"child-{os.getpid()}"
+        logging.getLogger().info(parent_message)
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+
+        process = multiprocessing.get_context('spawn').Process(target=_log_in_child, args=(child_message,))
+        process.start()
+        process.join(60)
+        self.assertEqual(process.exitcode, 0)
+
+        with open(os.environ[DEBUG_LOG_ENV], encoding='utf-8') as f:
+            content = f.read()
+        self.assertIn(parent_message, content)
+        self.assertIn(child_message, content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+"""Testy katalogu cache ekstrakcji"""
+import os
+import unittest
+from unittest import mock
+
+from src.core import extraction_cache
+
+
+class ResolveCacheDirTest(unittest.TestCase):
+
+    def test_default_is_user_cache_dir_not_cwd(self):
+        with mock.patch.dict(os.environ, {'XDG_CACHE_HOME': os.path.join(os.sep, 'cache'),
+                                          'LOCALAPPDATA': os.path.join(os.sep, 'cache')}):
+            resolved = extraction_cache.resolve_cache_dir('', os.path.join('rysunki', 'plan.dxf'))
+        self.assertEqual(resolved, os.path.join(os.sep, 'cache', 'dxf2svg', 'extraction_cache'))
+
+    def test_relative_dir_is_next_to_input_file(self):
+        input_file = os.path.join(os.sep, 'dane', 'rysunki', 'plan.dxf')
+        self.assertEqual(extraction_cache.resolve_cache_dir('.extraction_cache', input_file),
+                         os.path.join(os.sep, 'dane', 'rysunki', '.extraction_cache'))
+
+    def test_absolute_dir_is_kept(self):
+        cache_dir = os.path.join(os.sep, 'tmp', 'cache')
+        self.assertEqual(extraction_cache.resolve_cache_dir(cache_dir, 'plan.dxf'), cache_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""Testy łączenia segmentów polilinii (merge_segments_in_polylines) - zgodność z poprzednią implementacją"""
+import os
+import random
+import tempfile
+import unittest
+
+import ezdxf
+
+from src.core.dxf2svg import extract_polylines_from_dxf, merge_segments_in_polylines
+
+LAYER_LINE = "@IDE_KABLE_DC_B"
+
+# Polilinie testowe: poziome odcinki łączone pionowymi krokami (odrzucanymi przy ekstrakcji)
+POLYLINES = [
+    # Stykające się, współliniowe odcinki
+    [(0, 0), (10, 0), (20, 0), (30, 0)],
+    # Rysowane od prawej do lewej, z krokiem Y w tolerancji
+    [(30, 10), (20, 10), (10, 10), (10, 10.5), (0, 10.5)],
+    # Rozłączne w X (przerwa większa niż max_merge_distance) i w Y
+    [(0, 20), (10, 20), (10, 30), (25, 30), (25, 20), (40, 20)],
+    # Nakładające się odcinki w przeciwnych kierunkach z małymi przerwami
+    [(0, 40), (8, 40), (8, 40.3), (3, 40.3), (3, 41), (20, 41), (20, 44), (23, 44)],
+    # Pojedynczy odcinek odwrócony
+    [(15, 50), (5, 50)],
+]
+
+
+def _reference_merge(segments, gap_tolerance, max_merge_distance):
+    """Poprzednia implementacja (zachłanne porównanie każdego segmentu z kolejnymi) - wzorzec wyniku"""
+    sorted_segments = sorted(segments, key=lambda s: min(s['start'][0], s['end'][0]))
+    merged_segments = []
+    i = 0
+    while i < len(sorted_segments):
+        current_segment = sorted_segments[i].copy()
+        current_segment['merged_from'] = [current_segment['id']]
+        j = i + 1
+        while j < len(sorted_segments):
+            next_segment = sorted_segments[j]
+            can_merge = False
+            current_y = (current_segment['start'][1] + current_segment['end'][1]) / 2
+            next_y = (next_segment['start'][1] + next_segment['end'][1]) / 2
+            if abs(current_y - next_y) <= gap_tolerance:
+                current_right = max(current_segment['start'][0], current_segment['end'][0])
+                next_left = min(next_segment['start'][0], next_segment['end'][0])
+                x_gap = next_left - current_right
+                if x_gap <= max_merge_distance and x_gap >= -max_merge_distance:
+                    can_merge = True
+            if can_merge:
+                new_left = min(current_segment['start'][0], current_segment['end'][0],
+                               next_segment['start'][0], next_segment['end'][0])
+                new_right = max(current_segment['start'][0], current_segment['end'][0],
+                                next_segment['start'][0], next_segment['end'][0])
+                current_segment['start'] = (new_left, current_segment['start'][1])
+                current_segment['end'] = (new_right, current_segment['end'][1])
+                current_segment['length'] += next_segment['length'] + abs(x_gap)
+                current_segment['merged_from'].append(next_segment['id'])
+                sorted_segments.pop(j)
+            else:
+                j += 1
+        merged_segments.append(current_segment)
+        i += 1
+    return merged_segments
+
+
+def _rows(segments):
+    return [(s['id'], tuple(s['start']), tuple(s['end']), s['length'], list(s['merged_from'])) for s in segments]
+
+
+class MergeSegmentsRegressionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        doc = ezdxf.new()
+        msp = doc.modelspace()
+        rng = random.Random(7)
+        point_lists = list(POLYLINES)
+        # Losowe polilinie schodkowe - odcinki w obu kierunkach, na zbliżonych wysokościach
+        for _ in range(40):
+            x, y = rng.uniform(0, 50), rng.choice([60, 70, 80])
+            points = [(x, y)]
+            for _ in range(rng.randint(1, 8)):
+                x += rng.choice([-1, 1]) * rng.uniform(0.5, 12)
+                points.append((x, y))
+                y += rng.choice([0.0, 0.2, 0.7, 1.5, 4.0])
+                points.append((x, y))
+            point_lists.append(points)
+        for points in point_lists:
+            msp.add_lwpolyline(points, dxfattribs={'layer': LAYER_LINE})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'merge.dxf')
+            doc.saveas(path)
+            cls.polylines = extract_polylines_from_dxf(ezdxf.readfile(path), LAYER_LINE)
+
+    def test_merged_segments_match_previous_implementation(self):
+        self.assertEqual(len(self.polylines), len(POLYLINES) + 40)
+        for gap_tolerance, max_merge_distance in [(1.0, 5.0), (0.5, 1.0), (0.0, 0.0), (2.0, 20.0)]:
+            merged = merge_segments_in_polylines(self.polylines, gap_tolerance, max_merge_distance)
+            for polyline, merged_polyline in zip(self.polylines, merged):
+                with self.subTest(polyline=polyline['id'], gap=gap_tolerance, distance=max_merge_distance):
+                    expected = _reference_merge(list(polyline['segments']), gap_tolerance, max_merge_distance)
+                    self.assertEqual(_rows(merged_polyline['segments']), _rows(expected))
+                    self.assertEqual(merged_polyline['segment_count'], len(expected))
+
+    def test_fixture_covers_touching_reversed_and_disjoint_pieces(self):
+        merged = {p['id']: p['segments'] for p in merge_segments_in_polylines(self.polylines, 1.0, 5.0)}
+        self.assertEqual([list(s['merged_from']) for s in merged[1]], [[1, 2, 3]])  # stykające się
+        self.assertEqual(len(merged[2]), 1)  # odwrócone, krok Y w tolerancji
+        self.assertEqual(len(merged[3]), 3)  # rozłączne
+
+
+if __name__ == '__main__':
+    unittest.main()
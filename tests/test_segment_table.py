@@ -0,0 +1,29 @@
+import unittest
+
+from src.core.segment_table import SegmentTable
+
+
+def _records(merged):
+    records = [
+        {'id': 1, 'start': (0.0, 0.0), 'end': (3.0, 4.0), 'length': 5.0, 'polyline_idx': 0},
+        {'id': 2, 'start': (3.0, 4.0), 'end': (3.0, 8.0), 'length': 4.0, 'polyline_idx': 0},
+    ]
+    if merged:
+        records[0]['merged_from'] = [10, 11]
+        records[1]['merged_from'] = [12]
+    return records
+
+
+class SegmentViewHashTest(unittest.TestCase):
+    def test_equal_views_from_different_tables_hash_equal(self):
+        for merged in (False, True):
+            first = SegmentTable.from_records(_records(merged)).rows(0, 2)
+            second = SegmentTable.from_records(_records(merged)).rows(0, 2)
+            for a, b in zip(first, second):
+                self.assertEqual(a, b)
+                self.assertEqual(hash(a), hash(b))
+            self.assertEqual(len(set(first) | set(second)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
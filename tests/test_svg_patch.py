@@ -0,0 +1,55 @@
+"""Testy przyrostowych łatek interaktywnego SVG (InteractiveSvgPatcher)"""
+import unittest
+
+from src.core.config import snapshot_config
+from src.svg.svg_generator import generate_interactive_svg
+from src.svg.svg_patch import InteractiveSvgPatcher
+
+
+def _segment(segment_id, y):
+    return {'id': segment_id, 'start': (0.0, y), 'end': (10.0, y), 'length': 10.0, 'polyline_idx': segment_id}
+
+
+def _markers(root):
+    """Kropki tekstów: pozycja -> grupa przypisania"""
+    return {(elem.get('cx'), elem.get('cy')): elem.get('data-assignment-group')
+            for elem in root.iter() if elem.tag.endswith('circle') and elem.get('class') == 'text-marker'}
+
+
+class InteractiveSvgPatcherMarkersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cfg = snapshot_config(SHOW_ELEMENT_POINTS=True, STATION_ID='ZIEB')
+        self.texts = [{'idx': 0, 'id': 'ZIEB/F01/MPPT01/S01', 'pos': (5.0, 1.0)},
+                      {'idx': 1, 'id': 'ZIEB/F01/MPPT01/S02', 'pos': (5.0, 21.0)}]
+        self.segments = [_segment(1, 0.0), _segment(2, 20.0)]
+
+    def _document(self, inverter_data, unassigned_texts, unassigned_segments):
+        return generate_interactive_svg(inverter_data, self.texts, unassigned_texts, unassigned_segments, None,
+                                        'ZIEB', self.cfg, return_document=True)
+
+    def test_markers_follow_assignment_changes(self):
+        assigned = {'F01': {text['id']: [segment] for text, segment in zip(self.texts, self.segments)}}
+        document = self._document(assigned, [], [])
+        patcher = InteractiveSvgPatcher(document.root, self.cfg)
+
+        # Drugi tekst traci przypisanie - jego kropka nie może zostać w grupie poprzedniego przypisania
+        after = {'F01': {self.texts[0]['id']: [self.segments[0]]}}
+        changes = patcher.sync(after, [self.texts[1]], [self.segments[1]])
+
+        self.assertIsNotNone(changes)
+        regenerated = self._document(after, [self.texts[1]], [self.segments[1]])
+        self.assertEqual(_markers(document.root), _markers(regenerated.root))
+
+    def test_unassigned_marker_gets_group_when_text_is_assigned(self):
+        document = self._document({}, list(self.texts), list(self.segments))
+        patcher = InteractiveSvgPatcher(document.root, self.cfg)
+
+        assigned = {'F01': {self.texts[0]['id']: [self.segments[0]]}}
+        self.assertIsNotNone(patcher.sync(assigned, [self.texts[1]], [self.segments[1]]))
+
+        self.assertEqual(sorted(_markers(document.root).values(), key=str), [None, self.texts[0]['id']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Testy rejestru zapisów plików SVG (svg_stream)"""
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src.svg import svg_stream
+from src.svg.svg_patch import write_svg_tree
+from src.svg.svg_stream import SvgTreeWriter, latest_document, open_svg, wait_for_write
+
+
+def _document(group_id):
+    writer = SvgTreeWriter(size=('10px', '10px'))
+    writer.begin_group(group_id)
+    writer.close()
+    return writer.document
+
+
+class SvgWriteRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'interactive_assignment.svg')
+
+    def tearDown(self):
+        wait_for_write()
+        self.tmp.cleanup()
+
+    def _slow_background_write(self, document):
+        """Zapis w tle wstrzymany do release.set() - symuluje trwający zapis dużego pliku"""
+        release = threading.Event()
+        write_file = svg_stream.SvgDocument._write_file
+
+        def slow_write(doc, output_path):
+            release.wait(10)
+            write_file(doc, output_path)
+
+        with mock.patch.object(svg_stream.SvgDocument, '_write_file', slow_write):
+            document.write_async(self.path)
+        return release
+
+    def _read(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_streaming_write_waits_for_background_write_and_replaces_latest_document(self):
+        stale = _document('stale')
+        release = self._slow_background_write(stale)
+        threading.Timer(0.2, release.set).start()
+
+        with open_svg(self.path, size=('10px', '10px')) as svg:
+            svg.begin_group('fresh')
+            svg.end_group()
+        wait_for_write(self.path)
+
+        self.assertIn('fresh', self._read())
+        self.assertIsNone(latest_document(self.path))
+
+    def test_tree_write_replaces_latest_document(self):
+        stale = _document('stale')
+        stale.write_async(self.path)
+        write_svg_tree(_document('fresh').root, self.path)
+
+        self.assertIn('fresh', self._read())
+        self.assertIsNone(latest_document(self.path))
+
+    def test_relative_and_absolute_path_share_registry_entry(self):
+        document = _document('doc')
+        document.write_async(self.path)
+        wait_for_write(self.path)
+
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        try:
+            self.assertIs(latest_document('interactive_assignment.svg'), document)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == '__main__':
+    unittest.main()